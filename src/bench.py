@@ -0,0 +1,57 @@
+import json
+import sys
+import tempfile
+
+from argparse import ArgumentParser, RawDescriptionHelpFormatter, Namespace
+
+from lib.bench import PROFILES, Bench, CaseResult, compare, parse_size, to_json
+
+def define_flags():
+    parser = ArgumentParser(description='End-to-end throughput benchmark', formatter_class=RawDescriptionHelpFormatter)
+
+    parser.add_argument('--sizes', required=False, type=str, default='64K,1M,8M', metavar='LIST', help='comma-separated file sizes (K, M or G suffix)')
+    parser.add_argument('--protocols', required=False, type=str, default='SW,GBN,SR', metavar='LIST', help='comma-separated error recovery protocols')
+    parser.add_argument('--profiles', required=False, type=str, default='clean,lossy', metavar='LIST', help=f'comma-separated link profiles ({", ".join(PROFILES)})')
+    parser.add_argument('--repeat', required=False, type=int, default=1, metavar='N', help='runs per case, the median goodput is kept')
+    parser.add_argument('--seed', required=False, type=int, default=1, metavar='N', help='impairment proxy seed')
+    parser.add_argument('--server-args', required=False, type=str, default='', metavar='ARGS', help='extra start-server.py arguments (e.g. "-e event")')
+    parser.add_argument('--client-args', required=False, type=str, default='', metavar='ARGS', help='extra upload.py/download.py arguments (e.g. "--streams 4")')
+    parser.add_argument('--timeout', required=False, type=float, default=600.0, metavar='SECONDS', help='timeout of each transfer')
+    parser.add_argument('-o', '--output', required=False, type=str, default='bench_results.json', metavar='PATH', help='JSON results file')
+    parser.add_argument('--baseline', required=False, type=str, metavar='PATH', help='results file to compare against')
+    parser.add_argument('--threshold', required=False, type=float, default=0.1, metavar='FRACTION', help='goodput drop or CPU/MB increase flagged as regression')
+
+    return parser
+
+def report(case: CaseResult) -> None:
+    status = 'ok' if case.ok else 'FAILED'
+    print(f"{case.key:<32} {case.goodput_mbps:>9.2f} Mbit/s {case.retransmissions:>7} rtx  p50/p99 {case.rtt_p50_ms:.2f}/{case.rtt_p99_ms:.2f} ms  {case.cpu_s_per_mb:.3f} CPU s/MB  {status}", flush=True)
+
+if __name__ == '__main__':
+
+    parser = define_flags()
+    args = parser.parse_args()
+
+    profiles = args.profiles.split(',')
+    for profile in profiles:
+        if profile not in PROFILES:
+            parser.error(f"unknown profile: {profile}")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        bench = Bench(workdir=workdir, seed=args.seed, server_args=tuple(args.server_args.split()), client_args=tuple(args.client_args.split()), timeout=args.timeout)
+        results = bench.run(args.protocols.split(','), profiles, [parse_size(size) for size in args.sizes.split(',')], args.repeat, report)
+
+    output = to_json(results)
+    with open(args.output, 'w') as f:
+        json.dump(output, f, indent=2)
+    print(f"\nResults saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(output['results'], json.load(f)['results'], args.threshold)
+
+        for regression in regressions:
+            print(f"[REGRESSION] {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
@@ -0,0 +1,49 @@
+from dataclasses import dataclass
+
+from lib.config import *
+
+@dataclass
+class AckPolicy:
+    """
+    ACK retardado y acumulado del receptor (estilo RFC 1122 / RFC 5681): los DATA en orden se
+    confirman de a `every` o cuando vence un timer de `delay` segundos desde el primero pendiente.
+    Se confirma al instante un DATA fuera de orden o duplicado (el emisor lo usa como ACK
+    duplicado), el primero en orden despues de un hueco y el ultimo fragmento (MF apagado).
+    Con every=1 se confirma cada paquete, como espera Stop-and-Wait.
+    """
+
+    every: int = ACK_EVERY
+    delay: float = ACK_DELAY
+    pending: int = 0                  # DATA en orden todavia sin confirmar
+    deadline: float | None = None     # Vencimiento del ACK retardado
+    gap: bool = False                 # Llego algo fuera de orden: el proximo en orden cierra el hueco
+
+    def on_data(self, in_order: bool, last: bool, now: float) -> bool:
+        """Registra un DATA recibido. True => hay que enviar el ACK ya."""
+
+        if not in_order:
+            self.gap = True
+            return True
+
+        if self.every <= 1 or last or self.gap:
+            self.gap = False
+            return True
+
+        self.pending += 1
+        if self.pending >= self.every:
+            return True
+
+        if self.deadline is None:
+            self.deadline = now + self.delay
+        return False
+
+    def due(self, now: float) -> bool:
+        """Vencio el timer con DATA pendientes de confirmar."""
+
+        return self.deadline is not None and now >= self.deadline
+
+    def reset(self) -> None:
+        """Se envio un ACK: cubre todo lo pendiente."""
+
+        self.pending = 0
+        self.deadline = None
@@ -0,0 +1,134 @@
+"""
+Recepcion de datagramas en lote. En Linux se usa recvmmsg(2) via ctypes: una sola syscall
+trae hasta `batch` datagramas a un anillo de buffers preasignado. Donde no esta disponible
+se cae a recvfrom, un datagrama por llamada.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import sys
+
+from socket import AF_INET, inet_ntoa, ntohs, socket
+
+from lib.config import RECV_BATCH
+from lib.protocolo_amcgf import MTU
+
+MSG_DONTWAIT = 0x40
+MSG_WAITFORONE = 0x10000   # Bloquea hasta el primer datagrama; el resto solo si ya estan en cola
+
+class _iovec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+class _sockaddr_in(ctypes.Structure):
+    _fields_ = [
+        ("sin_family", ctypes.c_ushort),
+        ("sin_port", ctypes.c_ushort),      # Orden de red
+        ("sin_addr", ctypes.c_ubyte * 4),
+        ("sin_zero", ctypes.c_ubyte * 8),
+    ]
+
+class _msghdr(ctypes.Structure):
+    _fields_ = [
+        ("msg_name", ctypes.c_void_p),
+        ("msg_namelen", ctypes.c_uint),
+        ("msg_iov", ctypes.POINTER(_iovec)),
+        ("msg_iovlen", ctypes.c_size_t),
+        ("msg_control", ctypes.c_void_p),
+        ("msg_controllen", ctypes.c_size_t),
+        ("msg_flags", ctypes.c_int),
+    ]
+
+class _mmsghdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", _msghdr), ("msg_len", ctypes.c_uint)]
+
+def _load_recvmmsg():
+    if not sys.platform.startswith("linux"):
+        return None
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fn = libc.recvmmsg
+    except (OSError, AttributeError):
+        return None
+
+    fn.argtypes = [ctypes.c_int, ctypes.POINTER(_mmsghdr), ctypes.c_uint, ctypes.c_int, ctypes.c_void_p]
+    fn.restype = ctypes.c_int
+    return fn
+
+_recvmmsg = _load_recvmmsg()
+
+class BatchReceiver:
+    """Lee datagramas de `sock` de a lotes. `enabled` indica si se usa recvmmsg o el fallback."""
+
+    def __init__(self, sock: socket, batch: int = RECV_BATCH, size: int = MTU):
+        self.sock = sock
+        self.batch = batch
+        self.size = size
+        self.enabled = _recvmmsg is not None and sock.family == AF_INET
+
+        if self.enabled:
+            self._setup()
+
+    def _setup(self) -> None:
+        """Arma una vez los buffers, direcciones, iovecs y mmsghdr que recvmmsg reutiliza en cada llamada."""
+
+        self.buffer = bytearray(self.size * self.batch)
+        self.view = memoryview(self.buffer)
+        self.names = (_sockaddr_in * self.batch)()
+        self.iovecs = (_iovec * self.batch)()
+        self.msgs = (_mmsghdr * self.batch)()
+
+        base = ctypes.addressof((ctypes.c_char * len(self.buffer)).from_buffer(self.buffer))
+        for i in range(self.batch):
+            self.iovecs[i].iov_base = base + i * self.size
+            self.iovecs[i].iov_len = self.size
+
+            hdr = self.msgs[i].msg_hdr
+            hdr.msg_name = ctypes.addressof(self.names[i])
+            hdr.msg_namelen = ctypes.sizeof(_sockaddr_in)
+            hdr.msg_iov = ctypes.pointer(self.iovecs[i])
+            hdr.msg_iovlen = 1
+
+    def recv_batch(self, block: bool = True) -> list[tuple[bytes, tuple[str, int]]]:
+        """
+        Devuelve los datagramas disponibles como (data, addr). Con block=True espera al menos uno;
+        con block=False devuelve [] si no hay nada en cola.
+        """
+
+        if not self.enabled:
+            return self._recv_fallback(block)
+
+        flags = MSG_WAITFORONE if block else MSG_DONTWAIT
+        n = _recvmmsg(self.sock.fileno(), self.msgs, self.batch, flags, None)
+        if n < 0:
+            err = ctypes.get_errno()
+            if err in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                return []
+            raise OSError(err, os.strerror(err))
+
+        size = self.size
+        received = []
+        for i in range(n):
+            msg = self.msgs[i]
+            name = self.names[i]
+            start = i * size
+
+            received.append((bytes(self.view[start:start + msg.msg_len]), (inet_ntoa(bytes(name.sin_addr)), ntohs(name.sin_port))))
+            msg.msg_hdr.msg_namelen = ctypes.sizeof(_sockaddr_in)
+
+        return received
+
+    def _recv_fallback(self, block: bool) -> list[tuple[bytes, tuple[str, int]]]:
+        if block:
+            return [self.sock.recvfrom(self.size)]
+
+        received = []
+        while len(received) < self.batch:
+            try:
+                received.append(self.sock.recvfrom(self.size))
+            except (BlockingIOError, InterruptedError):
+                break
+
+        return received
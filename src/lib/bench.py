@@ -0,0 +1,240 @@
+"""
+Benchmark de punta a punta. Para cada combinacion de protocolo, perfil de enlace y tamaño de
+archivo levanta un start-server.py propio (opcionalmente detras del proxy de lib/impair.py),
+sube y baja el archivo con upload.py/download.py y registra goodput, retransmisiones,
+percentiles de RTT y CPU por MB. Los resultados se guardan en JSON y se comparan contra un
+baseline guardado con el mismo formato.
+
+Del lado emisor salen las retransmisiones y el RTT: en el upload del resumen del cliente
+(logs/*_metrics.txt) y en el download del STATS del servidor, que es nuevo en cada caso.
+"""
+
+import filecmp
+import os
+import platform
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from dataclasses import asdict, dataclass
+from socket import AF_INET, SOCK_DGRAM, socket
+
+from lib.client import Client
+from lib.impair import Impairment, ImpairmentProxy
+from lib.logger import Logger
+
+SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HOST = '127.0.0.1'
+
+# Perfiles de enlace (los dos sentidos); None = sin proxy
+PROFILES = {
+    'clean': None,
+    'lossy': Impairment(loss=0.05, delay=0.001),
+    'bursty': Impairment(ge_p=0.01, ge_r=0.2, delay=0.001),
+    'mininet': Impairment(loss=0.1, delay=0.001, rate=5_000_000),   # Enlace del servidor en net.py
+}
+
+_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+def parse_size(text: str) -> int:
+    """'64K', '16M', '1500' -> bytes."""
+
+    match = re.fullmatch(r'(\d+)([KMG]?)B?', text.strip().upper())
+    if not match:
+        raise ValueError(f"Invalid size: {text}")
+    return int(match.group(1)) * _UNITS[match.group(2)]
+
+@dataclass
+class CaseResult:
+    direction: str        # upload / download
+    protocol: str
+    profile: str
+    size: int
+    ok: bool
+    seconds: float        # Duracion del proceso cliente (incluye su arranque)
+    goodput_mbps: float   # Bytes del archivo por segundo, en Mbit/s
+    retransmissions: int
+    rtt_p50_ms: float
+    rtt_p90_ms: float
+    rtt_p99_ms: float
+    cpu_s_per_mb: float   # CPU de cliente y servidor por MB de archivo
+
+    @property
+    def key(self) -> str:
+        return f"{self.direction}/{self.protocol}/{self.profile}/{self.size}"
+
+def _free_port() -> int:
+    with socket(AF_INET, SOCK_DGRAM) as sock:
+        sock.bind((HOST, 0))
+        return sock.getsockname()[1]
+
+def _proc_cpu(pid: int) -> float:
+    """CPU (s) consumida por un proceso vivo; 0 si no hay /proc."""
+
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+    except OSError:
+        return 0.0
+    return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+
+def _children_cpu() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+def _client_metrics(path: str) -> dict:
+    """Retransmisiones y percentiles de RTT (ms) del resumen que escribe Logger.log_final."""
+
+    try:
+        with open(path) as f:
+            text = f.read()
+    except OSError:
+        return {}
+
+    out = {}
+    match = re.search(r'Retransmisiones: (\d+)', text)
+    if match:
+        out['retransmissions'] = int(match.group(1))
+    match = re.search(r'RTT p50/p90/p99/max: ([\d.]+) / ([\d.]+) / ([\d.]+)', text)
+    if match:
+        out.update(zip(('rtt_p50_ms', 'rtt_p90_ms', 'rtt_p99_ms'), map(float, match.groups())))
+    return out
+
+def _same(src: str, path: str) -> bool:
+    return os.path.exists(path) and filecmp.cmp(src, path, shallow=False)
+
+def make_file(path: str, size: int) -> None:
+    with open(path, 'wb') as f:
+        for offset in range(0, size, 1024 * 1024):
+            f.write(os.urandom(min(1024 * 1024, size - offset)))
+
+@dataclass
+class Bench:
+    workdir: str
+    seed: int = 1
+    server_args: tuple[str, ...] = ()
+    client_args: tuple[str, ...] = ()
+    timeout: float = 600.0
+
+    def _client(self, script: str, args: list[str]) -> tuple[bool, float, float]:
+        """Corre upload.py/download.py. Devuelve (termino bien, segundos, CPU s)."""
+
+        cpu = _children_cpu()
+        start = time.perf_counter()
+        try:
+            done = subprocess.run([sys.executable, os.path.join(SRC_DIR, script), *args, *self.client_args],
+                                  cwd=self.workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=self.timeout)
+            ok = done.returncode == 0
+        except subprocess.TimeoutExpired:
+            ok = False
+        return ok, time.perf_counter() - start, _children_cpu() - cpu
+
+    def _result(self, direction: str, protocol: str, profile: str, size: int, ok: bool, seconds: float, cpu: float, metrics: dict) -> CaseResult:
+        return CaseResult(
+            direction=direction, protocol=protocol, profile=profile, size=size, ok=ok,
+            seconds=round(seconds, 4),
+            goodput_mbps=round(size * 8 / seconds / 1e6, 3) if ok and seconds else 0.0,
+            retransmissions=metrics.get('retransmissions', 0),
+            rtt_p50_ms=metrics.get('rtt_p50_ms', 0.0),
+            rtt_p90_ms=metrics.get('rtt_p90_ms', 0.0),
+            rtt_p99_ms=metrics.get('rtt_p99_ms', 0.0),
+            cpu_s_per_mb=round(cpu / (size / 1024 ** 2), 4) if size else 0.0,
+        )
+
+    def run_case(self, protocol: str, profile: str, size: int) -> list[CaseResult]:
+        """Upload y download de un archivo de `size` bytes con un servidor nuevo."""
+
+        name = f"bench_{size}.bin"
+        src = os.path.join(self.workdir, name)
+        if not os.path.exists(src) or os.path.getsize(src) != size:
+            make_file(src, size)
+
+        storage = tempfile.mkdtemp(dir=self.workdir)
+        downloads = tempfile.mkdtemp(dir=self.workdir)
+
+        port = _free_port()
+        server = subprocess.Popen([sys.executable, os.path.join(SRC_DIR, 'start-server.py'), '-H', HOST, '-p', str(port), '-s', storage, '-q', *self.server_args],
+                                  cwd=self.workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        proxy = None
+        try:
+            stats = Client(host=HOST, port=port, logger=Logger(output_dir=os.path.join(self.workdir, 'logs')))
+            if stats.stats() is None:
+                raise RuntimeError("The server did not start")
+
+            if PROFILES[profile]:
+                proxy = ImpairmentProxy(listen=(HOST, 0), server=(HOST, port), up=PROFILES[profile], down=PROFILES[profile], seed=self.seed)
+                proxy.start()
+            client_port = str(proxy.address[1] if proxy else port)
+            common = ['-H', HOST, '-p', client_port, '-n', name, '-r', protocol]
+
+            server_cpu = _proc_cpu(server.pid)
+            ok, seconds, cpu = self._client('upload.py', ['-s', src, *common])
+            ok = ok and _same(src, os.path.join(storage, name))
+            cpu += _proc_cpu(server.pid) - server_cpu
+            upload = self._result('upload', protocol, profile, size, ok, seconds, cpu, _client_metrics(os.path.join(self.workdir, 'logs', f"{name}_metrics.txt")))
+
+            server_cpu = _proc_cpu(server.pid)
+            ok, seconds, cpu = self._client('download.py', ['-d', downloads, *common])
+            ok = ok and _same(src, os.path.join(downloads, name))
+            cpu += _proc_cpu(server.pid) - server_cpu
+
+            counters = stats.stats() or {}
+            metrics = {'retransmissions': counters.get('retransmissions', 0)}
+            metrics.update({f"rtt_p{p}_ms": counters.get(f"rtt_p{p}_us", 0) / 1000 for p in (50, 90, 99)})
+            download = self._result('download', protocol, profile, size, ok, seconds, cpu, metrics)
+        finally:
+            if proxy:
+                proxy.stop()
+            server.kill()
+            server.wait()
+
+        return [upload, download]
+
+    def run(self, protocols: list[str], profiles: list[str], sizes: list[int], repeat: int = 1, report=None) -> list[CaseResult]:
+        """Corre la matriz; con repeat > 1 se queda, por caso, con la corrida de goodput mediano."""
+
+        results = []
+        for profile in profiles:
+            for protocol in protocols:
+                for size in sizes:
+                    runs = [self.run_case(protocol, profile, size) for _ in range(repeat)]
+                    for i in range(2):
+                        case = sorted((r[i] for r in runs), key=lambda r: r.goodput_mbps)[len(runs) // 2]
+                        results.append(case)
+                        if report:
+                            report(case)
+        return results
+
+def to_json(results: list[CaseResult]) -> dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SRC_DIR, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ''
+
+    return {
+        'meta': {'date': time.strftime('%Y-%m-%dT%H:%M:%S'), 'commit': commit, 'python': platform.python_version(), 'platform': platform.platform()},
+        'results': [{'key': r.key, **asdict(r)} for r in results],
+    }
+
+def compare(results: list[dict], baseline: list[dict], threshold: float = 0.1) -> list[str]:
+    """Regresiones contra el baseline: casos que dejan de andar, o con goodput o CPU/MB peor que `threshold`."""
+
+    base = {r['key']: r for r in baseline}
+    out = []
+    for r in results:
+        b = base.get(r['key'])
+        if not b or not b['ok']:
+            continue
+
+        if not r['ok']:
+            out.append(f"{r['key']}: failed")
+            continue
+        if r['goodput_mbps'] < b['goodput_mbps'] * (1 - threshold):
+            out.append(f"{r['key']}: goodput {b['goodput_mbps']:.2f} -> {r['goodput_mbps']:.2f} Mbit/s ({r['goodput_mbps'] / b['goodput_mbps'] - 1:+.1%})")
+        if b['cpu_s_per_mb'] and r['cpu_s_per_mb'] > b['cpu_s_per_mb'] * (1 + threshold):
+            out.append(f"{r['key']}: CPU {b['cpu_s_per_mb']:.3f} -> {r['cpu_s_per_mb']:.3f} s/MB ({r['cpu_s_per_mb'] / b['cpu_s_per_mb'] - 1:+.1%})")
+
+    return out
@@ -0,0 +1,132 @@
+"""
+Checksum estilo Internet (RFC 1071) con varios backends intercambiables.
+
+Todos los backends devuelven exactamente lo mismo que la implementacion de referencia
+(suma en complemento a uno de palabras de 16 bits big-endian, con padding de un byte 0
+si el largo es impar). Al importar el modulo se verifica cada backend contra la referencia
+y se elige el mas rapido en `inet_checksum`.
+"""
+
+import sys
+import time
+
+from array import array
+from typing import Callable, Iterable
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional
+    np = None
+
+ChecksumFn = Callable[[bytes | bytearray | memoryview], int]
+
+def _finish(s: int) -> int:
+    """Pliega los acarreos por encima de 16 bits y devuelve el complemento a uno."""
+    while s >> 16:
+        s = (s & 0xFFFF) + (s >> 16)
+    return (~s) & 0xFFFF
+
+def checksum_reference(data: bytes) -> int:
+    """Implementacion original: recorre el buffer de a dos bytes."""
+    # Si el largo es impar, agregar un byte 0
+    if len(data) % 2:
+        data = bytes(data) + b"\x00"
+    s = 0
+    for i in range(0, len(data), 2):
+        s += (data[i] << 8) | data[i + 1]
+        s = (s & 0xFFFF) + (s >> 16)
+    return (~s) & 0xFFFF
+
+def checksum_array(data: bytes | bytearray | memoryview) -> int:
+    """Suma las palabras con array('H') sobre el buffer (sin loop en Python)."""
+    words = array("H")
+    if len(data) % 2:
+        words.frombytes(data[:-1])
+        words.append(data[-1] << 8 if sys.byteorder == "big" else data[-1])
+    else:
+        words.frombytes(data)
+    if sys.byteorder == "little":
+        words.byteswap()
+    return _finish(sum(words))
+
+def checksum_int(data: bytes | bytearray | memoryview) -> int:
+    """Interpreta el buffer como un entero big-endian: 2**16 = 1 (mod 0xFFFF)."""
+    n = int.from_bytes(data, "big")
+    if len(data) % 2:
+        n <<= 8
+    s = n % 0xFFFF
+    if s == 0 and n:
+        # En complemento a uno una suma no nula congruente con 0 vale 0xFFFF
+        s = 0xFFFF
+    return (~s) & 0xFFFF
+
+def checksum_numpy(data: bytes | bytearray | memoryview) -> int:
+    """Suma vectorizada con NumPy (conviene para buffers grandes o lotes)."""
+    if len(data) % 2:
+        data = bytes(data) + b"\x00"
+    return _finish(int(np.frombuffer(data, dtype=">u2").sum(dtype=np.uint64)))
+
+def checksum_batch(frames: Iterable[bytes | bytearray | memoryview]) -> list[int]:
+    """Calcula el checksum de varios buffers. Con NumPy los suma en una sola matriz."""
+    frames = list(frames)
+    if np is None or not frames:
+        return [inet_checksum(f) for f in frames]
+
+    width = max(len(f) for f in frames)
+    width += width % 2
+    matrix = np.zeros((len(frames), width), dtype=np.uint8)
+    for row, f in enumerate(frames):
+        matrix[row, :len(f)] = np.frombuffer(f, dtype=np.uint8)
+
+    sums = matrix.view(">u2").sum(axis=1, dtype=np.uint64)
+    return [_finish(int(s)) for s in sums]
+
+def _fold_word(value: int) -> int:
+    """Reduce un campo de 16 o 32 bits a su suma en complemento a uno de 16 bits."""
+    value = (value & 0xFFFF) + (value >> 16)
+    return (value & 0xFFFF) + (value >> 16)
+
+def checksum_update(ck: int, old: int, new: int) -> int:
+    """
+    Actualizacion incremental (RFC 1624, ec. 3): HC' = ~(~HC + ~m + m').
+    `old`/`new` son el valor anterior y nuevo de un campo de 16 o 32 bits alineado a 16 bits.
+    """
+    s = ((~ck) & 0xFFFF) + ((~_fold_word(old)) & 0xFFFF) + _fold_word(new)
+    return _finish(s)
+
+BACKENDS: dict[str, ChecksumFn] = {
+    "array": checksum_array,
+    "int": checksum_int,
+    "reference": checksum_reference,
+}
+if np is not None:
+    BACKENDS["numpy"] = checksum_numpy
+
+def _self_test(rounds: int = 50) -> str:
+    """Verifica cada backend contra la referencia y devuelve el nombre del mas rapido."""
+    vectors = [b"", b"\x01", b"\xff" * 3, bytes(16), b"\xff" * 16, bytes(range(256)) * 4 + b"\x7f"]
+    vectors += [bytes((i * 37 + n) & 0xFF for i in range(n)) for n in (15, 16, 17, 1040, 1041)]
+    sample = vectors[-2]
+
+    best, best_time = "reference", float("inf")
+    for name, fn in BACKENDS.items():
+        if name == "reference":
+            continue
+        try:
+            if any(fn(v) != checksum_reference(v) for v in vectors):
+                continue
+        except Exception:
+            continue
+
+        t0 = time.perf_counter()
+        for _ in range(rounds):
+            fn(sample)
+        elapsed = time.perf_counter() - t0
+
+        if elapsed < best_time:
+            best, best_time = name, elapsed
+
+    return best
+
+BACKEND = _self_test()
+inet_checksum: ChecksumFn = BACKENDS[BACKEND]
@@ -0,0 +1,75 @@
+import threading
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from lib.config import *
+
+# Memoria que se cuenta por entrada ademas del payload (clave, tupla, nodo del OrderedDict)
+ENTRY_OVERHEAD = 128
+
+@dataclass
+class ChunkCache:
+    """
+    Cache LRU de payloads de DATA listos para enviar, compartido por todas las descargas del
+    servidor. La clave es (ruta, mtime, tamaño, mss, codec, seq): un archivo sobrescrito tiene
+    otro mtime y no acierta, e `invalidate` libera enseguida lo que quedo de la version vieja.
+    Con compresion se guarda el payload ya comprimido, asi un archivo popular se comprime una vez.
+    """
+
+    budget: int = CHUNK_CACHE_BYTES
+    entries: OrderedDict = field(default_factory=OrderedDict)   # clave -> (payload, comprimido, bytes del chunk)
+    files: dict[str, set] = field(default_factory=dict)         # ruta -> claves guardadas de ese archivo
+    used: int = 0
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def get(self, key: tuple) -> tuple[bytes, bool, int] | None:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: tuple, entry: tuple[bytes, bool, int]) -> None:
+        cost = len(entry[0]) + ENTRY_OVERHEAD
+        if cost > self.budget:
+            return
+
+        with self.lock:
+            if key in self.entries:
+                return
+
+            while self.used + cost > self.budget:
+                self._drop(next(iter(self.entries)))
+                self.evictions += 1
+
+            self.entries[key] = entry
+            self.files.setdefault(key[0], set()).add(key)
+            self.used += cost
+
+    def _drop(self, key: tuple) -> None:
+        entry = self.entries.pop(key)
+        self.used -= len(entry[0]) + ENTRY_OVERHEAD
+
+        keys = self.files[key[0]]
+        keys.discard(key)
+        if not keys:
+            del self.files[key[0]]
+
+    def invalidate(self, path: str) -> None:
+        """Descarta los chunks de un archivo (por ejemplo, porque un upload lo reemplazo)."""
+
+        with self.lock:
+            for key in list(self.files.get(path, ())):
+                self._drop(key)
+
+    def counters(self) -> dict[str, int]:
+        with self.lock:
+            return {'cache_hits': self.hits, 'cache_misses': self.misses, 'cache_evictions': self.evictions, 'cache_bytes': self.used}
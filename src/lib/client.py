@@ -1,10 +1,17 @@
 import os
+import secrets
+import threading
 
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
+from socket import socket, timeout as SocketTimeout
 
+from lib.compression import CODECS
 from lib.connection import Connection
+from lib.file_handler import MmapChunkSource
 from lib.config import *
-from lib.protocolo_amcgf import FLAG_MF, MSS, MsgType, make_data, make_req_download, make_req_upload
+from lib.protocolo_amcgf import *
+from lib.sw import StopAndWait
+from lib.transfer import Transfer
 
 DEFAULT_NAME = "file.txt"
 DEFAULT_SRC = "./storage_personal"
@@ -15,98 +22,272 @@ class ClientError(Exception): ...
 class Client(Connection):
     src: str | None = None
     name: str | None = None
+    resume: bool = False   # Pedir que se reanude una transferencia cortada
+    streams: int = 1       # Cantidad de flujos UDP en paralelo (cada uno mueve un rango de bytes)
+    compress: bool = False # Pedir compresion de los DATA (el servidor elige el codec)
 
-    def _check_path(self, path: str) -> None: 
+    def _check_path(self, path: str) -> None:
         """Valida que exista el archivo antes de usarlo."""
 
-        if not path or not os.path.isfile(path): 
+        if not path or not os.path.isfile(path):
             raise ClientError(f"No se encontró el archivo de origen: {path}")
 
-    def upload(self):
-        try: 
-            self._check_path(self.src) 
-        except ClientError as e: 
+    def _stream_client(self) -> 'Client':
+        """Copia del cliente para un stream: socket, respuesta y logger propios."""
+
+        return replace(self, streams=1, resume=False, response={}, logger=self.logger.stream_logger())
+
+    def _run_streams(self, target, clients: list['Client']) -> None:
+        """Corre target(i) en un hilo por stream y suma las metricas de cada uno al logger principal."""
+
+        threads = [threading.Thread(target=target, args=(i,)) for i in range(len(clients))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for i, client in enumerate(clients):
+            self.logger.merge_stream(i, client.logger)
+
+    def _request_extra(self, stream: dict | None = None) -> dict:
+        """Campos extra del REQUEST: el rango del stream, el MSS y la ventana que se piden y las opciones que se ofrecen."""
+
+        extra = {**(stream or {}), PAYLOAD_MSS_KEY: self.mss, PAYLOAD_WINDOW_KEY: self.window}
+
+        features = 0
+        if self.sack and self.protocol == VER_SR:
+            features |= FEATURE_SACK
+        if self.fec_group and self.protocol != VER_SW:
+            features |= FEATURE_FEC
+            extra.update({PAYLOAD_FEC_GROUP_KEY: self.fec_group, PAYLOAD_FEC_PARITY_KEY: self.fec_parity})
+        if self.compress:
+            features |= FEATURE_ZIP
+            extra[PAYLOAD_ZIP_KEY] = ','.join(CODECS)
+        extra[PAYLOAD_FEATURES_KEY] = features
+
+        return extra
+
+    @staticmethod
+    def _stream_payload(transfer_id: int, stream: int, streams: int) -> dict:
+        return {PAYLOAD_TRANSFER_ID_KEY: transfer_id, PAYLOAD_STREAM_KEY: stream, PAYLOAD_STREAMS_KEY: streams}
+
+    def upload(self) -> bool:
+        try:
+            self._check_path(self.src)
+        except ClientError as e:
             self.logger.log(f"[ERROR]: {e}")
-            return
-        
+            return False
+
         # Comienza la transferencia
         self.logger.start_transfer()
 
+        size = os.path.getsize(self.src)
+        if self.streams > 1:
+            ok = self._upload_streams(size)
+        else:
+            engine = self._request_upload(size)
+            ok = bool(engine) and self._send_range(*engine, size)
+
+        if not ok:
+            self.logger.log("[ERROR] El upload no se completo", quiet=True)
+            return False
+
+        self.logger.log_final(filename=f"{self.name}_metrics.txt")
+        self.logger.log("[INFO] Archivo enviado completo, espero BYE")
+        return True
+
+    def _upload_streams(self, size: int) -> bool:
+        """Sube cada rango del archivo por su propio socket; los rangos los arma el server segun el MSS acordado."""
+
+        transfer_id = secrets.randbits(63)
+        clients = [self._stream_client() for _ in range(self.streams)]
+
+        # El primer stream averigua en cuantos rangos divide el server el archivo
+        first = clients[0]._request_upload(size, self._stream_payload(transfer_id, 0, self.streams))
+        if not first:
+            return False
+
+        clients = clients[:clients[0].response.get(PAYLOAD_STREAMS_KEY, 1)]
+        results = [False] * len(clients)
+
+        def run(i: int) -> None:
+            engine = first if i == 0 else clients[i]._request_upload(size, self._stream_payload(transfer_id, i, len(clients)))
+            results[i] = bool(engine) and clients[i]._send_range(*engine, size)
+
+        self._run_streams(run, clients)
+
+        return all(results)
+
+    def _request_upload(self, size: int, stream: dict | None = None) -> tuple[StopAndWait, socket] | None:
         try:
-            encoded = make_req_upload(self.name, self.protocol, os.path.getsize(self.src)).encode()
+            encoded = make_req_upload(self.name, self.protocol, size, resume=self.resume, extra=self._request_extra(stream), tlv=self.tlv).encode()
         except Exception as e:
             self.logger.log(f"[ERROR] No se pudo crear el datagrama de solicitud: {e}")
-            return
+            return None
 
         sw, _, sock = self._send_control_and_prepare_sw(req_bytes=encoded, timeout=TIMEOUT_MAX + 0.1)
         if not sw:
-            return
-        
-        seq_number = 0
-        with open(self.src, 'rb') as file:
-            while True:
-                chunk = file.read(MSS)
-                if not chunk:
-                    break
-
-                more_fragments = file.peek(1) != b''
-                
-                datagram = make_data(seq=seq_number, chunk=chunk, ver=self.protocol, mf=more_fragments)
+            return None
+
+        return sw, sock
+
+    def _send_range(self, sw: StopAndWait, sock: socket, size: int) -> bool:
+        """Sube el rango anunciado en el OK: desde `offset` (inicio del rango, o lo ya recibido al reanudar) hasta `range_end`."""
+
+        offset = self.response.get(PAYLOAD_OFFSET_KEY, 0)
+        start, stop = chunk_span(offset, self.response.get(PAYLOAD_RANGE_END_KEY, size), sw.mss)
+        if offset and self.resume:
+            self.logger.log(f"[INFO] Reanudando upload desde el byte {offset}")
+
+        with MmapChunkSource(self.src, sw.mss) as chunks:
+            for seq_number, (chunk, more_fragments) in enumerate(chunks.iter_from(start, stop), start):
+                datagram = sw.data_frame(seq_number, chunk, more_fragments)
                 sw.send_data(datagram, self.logger)
 
                 self.logger.add_bytes(len(chunk))
 
-                seq_number += 1
+        # Con ventana deslizante puede quedar datos en vuelo sin confirmar
+        sw.flush(self.logger)
+        if sw.codec:
+            self.logger.add_compression(sw.codec)
 
         sw.send_bye_with_retry(retries=8, quiet_time=0.2)
 
-        self.logger.log_final(filename=f"{self.name}_metrics.txt")
-        self.logger.log("[INFO] Archivo enviado completo, espero BYE")
-        
         sock.close()
 
-    def download(self):
+        return True
+
+    def stats(self) -> dict | None:
+        """Pide al servidor sus contadores con un STATS (reintenta si se pierde el pedido o la respuesta)."""
+
+        sock = self._make_udp_socket(timeout=TIMEOUT_MAX + 0.1)
+        request = make_stats(self.protocol or VER_SW).encode()
+
+        try:
+            for _ in range(REQUEST_RETRIES):
+                sock.sendto(request, (self.host, self.port))
+
+                try:
+                    datagram = Datagram.decode(sock.recvfrom(MTU)[0])
+                except (SocketTimeout, ProtoError):
+                    continue
+
+                if datagram.typ == MsgType.STATS and datagram.flags & FLAG_ACK:
+                    return payload_decode(datagram.payload)
+        finally:
+            sock.close()
+
+        self.logger.log(f"[ERROR] Sin respuesta del servidor {self.host}:{self.port}", quiet=True)
+        return None
+
+    def download(self) -> bool:
         self.logger.log(f"[INFO] Solicitando descarga de '{self.name}' desde {self.host}:{self.port}")
 
         # Comienza la transferencia
         self.logger.start_transfer()
 
+        ok = self._download_streams() if self.streams > 1 else self._download_single()
+        if not ok:
+            return False
+
+        filename = os.path.basename(self.name) + "_metrics.txt"
+        self.logger.log_final(filename=filename)
+        self.logger.log("[INFO] Descarga finalizada correctamente")
+        return True
+
+    def _request_download(self, offset: int | None = None, size: int | None = None, stream: dict | None = None) -> tuple[StopAndWait, socket] | None:
         try:
-            encoded = make_req_download(self.name, self.protocol).encode()
+            encoded = make_req_download(self.name, self.protocol, offset, size, extra=self._request_extra(stream), tlv=self.tlv).encode()
         except Exception as e:
             self.logger.log(f"[ERROR] No se pudo crear el datagrama de solicitud: {e}")
-            return
+            return None
 
         sw, _, sock = self._send_control_and_prepare_sw(encoded, timeout=TIMEOUT_MAX + 0.1)
         if not sw:
-            return
+            return None
+
+        return sw, sock
+
+    def _download_single(self) -> bool:
+        # Con resume se pide seguir desde lo que registro el journal local
+        offset = size = None
+        if self.resume:
+            journal = self.file_handler.read_journal(self.name)
+            if journal:
+                size = journal.get("size")
+                offset = self.file_handler.resume_offset(self.name, size, self.mss)
+
+        engine = self._request_download(offset, size)
+        if not engine:
+            return False
+
+        offset = self.response.get(PAYLOAD_OFFSET_KEY, 0)
+        writer = self.file_handler.open_writer(self.name, size=self.response.get(PAYLOAD_FILE_SIZE_KEY), chunk_size=engine[0].mss, offset=offset)
+        if writer.offset != offset:
+            self.logger.log(f"[ERROR] No se pudo reanudar la descarga de '{self.name}' desde el byte {offset}")
+            writer.abort()
+            engine[1].close()
+            return False
+
+        if offset:
+            self.logger.log(f"[INFO] Reanudando descarga desde el byte {offset}")
+
+        self._receive_range(*engine, Transfer(writer=writer))
+
+        return True
+
+    def _download_streams(self) -> bool:
+        """Pide cada rango del archivo por su propio socket y los escribe en un unico archivo."""
 
-        seq_number = 0
-        while True:
+        transfer_id = secrets.randbits(63)
+        clients = [self._stream_client() for _ in range(self.streams)]
+
+        # El primer stream averigua el tamaño y en cuantos rangos lo divide el server
+        first = clients[0]._request_download(stream=self._stream_payload(transfer_id, 0, self.streams))
+        if not first:
+            return False
+
+        response = clients[0].response
+        clients = clients[:response.get(PAYLOAD_STREAMS_KEY, 1)]
+        writer = self.file_handler.open_writer(self.name, size=response.get(PAYLOAD_FILE_SIZE_KEY), chunk_size=first[0].mss, resumable=False)
+        transfer = Transfer(writer=writer, streams=len(clients))
+
+        def run(i: int) -> None:
+            engine = first if i == 0 else clients[i]._request_download(stream=self._stream_payload(transfer_id, i, len(clients)))
+            if engine:
+                clients[i]._receive_range(*engine, transfer)
+            else:
+                transfer.end_stream(0, ok=False)
+
+        self._run_streams(run, clients)
+
+        return transfer.committed
+
+    def _receive_range(self, sw: StopAndWait, sock: socket, transfer: Transfer) -> None:
+        """Recibe el rango anunciado en el OK (desde `offset`) y cierra el stream."""
+
+        sw.start_at(self.response.get(PAYLOAD_OFFSET_KEY, 0) // sw.mss)
+
+        done = False
+        while not done:
             datagram = sw.receive_data()
-            
-            if not datagram:
-                continue
-            
-            if datagram.typ == MsgType.DATA and datagram.seq < seq_number:
-                sw.send_ack(datagram.seq + 1)
+
+            if not datagram or datagram.typ not in (MsgType.DATA, MsgType.PARITY):
                 continue
-            
-            if datagram.typ == MsgType.DATA and datagram.seq == seq_number:
-                self.file_handler.save_datagram(self.name, datagram)
-                
-                self.logger.add_bytes(len(datagram.payload))
-                
-                seq_number += 1
-                sw.send_ack(seq_number)
-                
-                if not (datagram.flags & FLAG_MF):
-                    break
-                
-        sw.await_bye_and_linger(linger_factor=1, quiet_time=0.2) 
-        
-        filename = os.path.basename(self.name) + "_metrics.txt"
-        self.logger.log_final(filename=filename)
-        self.logger.log("[INFO] Descarga finalizada correctamente")
-        
+
+            # El motor decide que DATA son nuevos (con FEC, tambien los reconstruidos) y envia el ACK;
+            # se escriben directo en su offset
+            for data in sw.deliver(datagram):
+                transfer.write_chunk(data.seq, data.payload)
+                self.logger.add_bytes(len(data.payload))
+            transfer.checkpoint(sw.expected_seq)
+
+            done = sw.complete
+
+        self.logger.add_recovered(sw.recovered)
+        if sw.codec:
+            self.logger.add_compression(sw.codec)
+        transfer.end_stream(sw.expected_seq)
+        sw.await_bye_and_linger(linger_factor=1, quiet_time=0.2)
+
         sock.close()
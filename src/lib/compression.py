@@ -0,0 +1,109 @@
+"""
+Compresion de los payloads DATA. El receptor escribe cada seq en su offset (seq * MSS), aun fuera
+de orden, reanudando o con varios streams, asi que cada DATA tiene que poder descomprimirse solo:
+cada chunk se comprime por separado y el que no achica viaja crudo (sin FLAG_ZIP). lz4 se ofrece
+solo si esta instalado; zlib siempre esta.
+"""
+
+import time
+import zlib
+
+from dataclasses import dataclass
+
+from lib.config import *
+from lib.protocolo_amcgf import MSS
+
+try:
+    import lz4.block as lz4_block
+except ImportError:
+    lz4_block = None
+
+# Errores con los que los codecs rechazan un payload invalido
+CODEC_ERRORS = (zlib.error, lz4_block.LZ4BlockError) if lz4_block else (zlib.error,)
+
+class DecompressError(Exception):
+    """Payload comprimido invalido, o que descomprimido se pasa del MSS."""
+
+# Codecs soportados, en orden de preferencia
+CODECS = ('lz4', 'zlib') if lz4_block else ('zlib',)
+
+def pick_codec(offered) -> str | None:
+    """Primer codec de la lista ofrecida por el peer ("lz4,zlib") que este proceso soporta."""
+
+    if not isinstance(offered, str):
+        return None
+    return next((name for name in offered.split(',') if name in CODECS), None)
+
+@dataclass
+class ChunkCodec:
+    """Comprime o descomprime chunks con el codec acordado y lleva sus metricas."""
+
+    name: str
+    level: int = ZIP_LEVEL
+    raw_bytes: int = 0       # Bytes de archivo que pasaron por el codec
+    wire_bytes: int = 0      # Bytes de esos chunks en los payloads
+    cpu_time: float = 0.0    # Segundos de CPU del hilo comprimiendo o descomprimiendo
+
+    @property
+    def ratio(self) -> float:
+        return self.raw_bytes / self.wire_bytes if self.wire_bytes else 1.0
+
+    def compress(self, chunk: bytes | memoryview) -> tuple[bytes | memoryview, bool]:
+        """(payload, comprimido). Si el chunk no achica se devuelve tal cual."""
+
+        t0 = time.thread_time()
+        if self.name == 'lz4':
+            packed = lz4_block.compress(chunk)
+        else:
+            packed = zlib.compress(chunk, self.level)
+        self.cpu_time += time.thread_time() - t0
+
+        zipped = len(packed) < len(chunk)
+        payload = packed if zipped else chunk
+
+        self.raw_bytes += len(chunk)
+        self.wire_bytes += len(payload)
+        return payload, zipped
+
+    def count(self, raw: int, wire: int) -> None:
+        """Suma un chunk a las metricas sin pasarlo por el codec (ya comprimido en el cache, o ya descomprimido)."""
+
+        self.raw_bytes += raw
+        self.wire_bytes += wire
+
+    def inflate(self, payload: bytes, zipped: bool = True, limit: int = MSS) -> bytes:
+        """
+        Chunk original de un payload recibido (crudo si vino sin FLAG_ZIP), sin sumarlo a las metricas.
+        El payload viene del peer: nunca se descomprimen mas de `limit` bytes y cualquier error
+        del codec sale como DecompressError.
+        """
+
+        if not zipped:
+            chunk = payload
+        else:
+            t0 = time.thread_time()
+            try:
+                if self.name == 'lz4':
+                    # Se ignora el tamaño que trae el bloque: el buffer de salida lo acota `limit`
+                    chunk = lz4_block.decompress(payload[4:], uncompressed_size=limit)
+                else:
+                    # Un byte de mas para distinguir un chunk de justo `limit` de uno que se pasa
+                    inflater = zlib.decompressobj()
+                    chunk = inflater.decompress(payload, limit + 1)
+                    if not inflater.eof:
+                        raise DecompressError("Payload zlib truncado o de mas de un chunk")
+            except CODEC_ERRORS as e:
+                raise DecompressError(str(e)) from e
+            finally:
+                self.cpu_time += time.thread_time() - t0
+
+        if len(chunk) > limit:
+            raise DecompressError(f"Chunk de {len(chunk)} bytes, mas que el MSS ({limit})")
+        return chunk
+
+    def decompress(self, payload: bytes, zipped: bool = True, limit: int = MSS) -> bytes:
+        """Como inflate, sumando el chunk a las metricas."""
+
+        chunk = self.inflate(payload, zipped, limit)
+        self.count(len(chunk), len(payload))
+        return chunk
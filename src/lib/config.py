@@ -1,3 +1,32 @@
 RTO = 0.025 # Retraso de transmision 25 ms
 TIMEOUT_MAX = 0.05 # Timeout maximo 50 ms
-MAX_FILE_SIZE = 256 * 1024 * 1024  # Tamaño máximo de archivo 256 MB
\ No newline at end of file
+MAX_FILE_SIZE = 256 * 1024 * 1024  # Tamaño máximo de archivo 256 MB
+WINDOW_SIZE = 32 # Tamaño de ventana (en paquetes) de los emisores con ventana deslizante
+
+RTO_MIN = 0.005 # RTO minimo del estimador adaptativo 5 ms
+RTO_MAX = 1.0 # Tope del backoff exponencial del RTO 1 s
+
+CC_ALGORITHM = 'newreno' # Control de congestion de los emisores con ventana (None = ventana fija)
+CWND_INITIAL = 4 # Ventana de congestion inicial (en paquetes)
+RECV_BATCH = 32 # Datagramas por syscall en la recepcion en lote del servidor (recvmmsg)
+
+JOURNAL_INTERVAL = 1024 * 1024 # Cada cuantos bytes contiguos recibidos se actualiza el journal de reanudacion
+IDLE_TIMEOUT = 10.0 # Sin datagramas del peer durante este tiempo el servidor corta la sesion (un upload queda reanudable)
+MAX_STREAMS = 16 # Streams paralelos maximos por transferencia (--streams)
+REQUEST_RETRIES = 10 # Reenvios del REQUEST si no llega el OK del servidor
+ACK_EVERY = 2 # Con ventana deslizante el receptor confirma de a ACK_EVERY paquetes en orden (1 = ACK por paquete)
+ACK_DELAY = 0.002 # Tope de espera de un ACK retardado 2 ms (debe quedar por debajo de RTO_MIN)
+SACK = True # Selective Repeat ofrece/acepta bloques SACK en los ACK (se negocia en el handshake)
+SACK_DUPTHRESH = 3 # Con SACK, un hueco con esta cantidad de paquetes confirmados por encima se da por perdido
+FEC_GROUP = 0 # DATA por grupo de FEC (0 = sin FEC); solo con GBN y SR
+FEC_PARITY = 1 # PARITY por grupo: 1 = XOR (recupera una perdida), mas = Reed-Solomon (recupera hasta esa cantidad)
+ZIP_LEVEL = 1 # Nivel de zlib para la compresion de DATA (--compress); lz4 no usa nivel
+CONTROL_TLV = True # El cliente envia los REQUEST en TLV binario (False = formato texto k=v, para servidores viejos)
+HISTORY_MAX = 4096 # Puntos maximos de cada historial del logger (RTO, cwnd); al llenarse se submuestrea
+METRICS_INTERVAL = 5.0 # Cada cuantos segundos el servidor reescribe el archivo de metricas (--metrics-file)
+CHUNK_CACHE_BYTES = 64 * 1024 * 1024 # Memoria del cache de chunks de las descargas del servidor (--cache; 0 = sin cache)
+MAX_TRANSFER_TIME = 3600.0 # Duracion maxima de una sesion del servidor; al vencer se corta como por inactividad (0 = sin tope)
+PARTIAL_TTL = 24 * 3600.0 # Temporales y journals de recepciones abandonadas que el servidor borra pasado este tiempo
+PARTIAL_SWEEP = 600.0 # Cada cuanto, como minimo, el servidor busca temporales vencidos (al abrir un upload)
+WHEEL_TICK = 0.001 # Resolucion de la rueda de timers del servidor de eventos 1 ms
+WHEEL_SLOTS = 1024 # Casilleros de la rueda de timers (una vuelta = WHEEL_SLOTS * WHEEL_TICK)
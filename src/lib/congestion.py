@@ -0,0 +1,102 @@
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+from lib.config import *
+
+@dataclass
+class CongestionControl(ABC):
+    """
+    Interfaz de control de congestion para los emisores con ventana. Las unidades son paquetes:
+    el emisor usa como ventana efectiva min(window configurada, window()).
+    """
+
+    cwnd: float = CWND_INITIAL
+    ssthresh: float = WINDOW_SIZE
+
+    def window(self) -> int:
+        """Cantidad de paquetes que se pueden tener en vuelo."""
+        return max(1, int(self.cwnd))
+
+    @abstractmethod
+    def on_ack(self, acked: int, ack: int) -> bool:
+        """ACK con avance de `acked` paquetes (acumulado `ack`). True => reenviar ya el primer paquete sin ACK."""
+
+    @abstractmethod
+    def on_dup_ack(self, in_flight: int, next_seq: int) -> bool:
+        """ACK duplicado. True => disparar fast retransmit del primer paquete sin ACK."""
+
+    @abstractmethod
+    def on_timeout(self, in_flight: int) -> None:
+        """Vencio el timer de retransmision."""
+
+@dataclass
+class NewReno(CongestionControl):
+    """
+    NewReno (RFC 5681 / RFC 6582): slow start, congestion avoidance (AIMD), fast retransmit
+    con 3 ACK duplicados y fast recovery que sigue reenviando ante ACKs parciales.
+    """
+
+    dup_threshold: int = 3
+    dup_acks: int = 0
+    in_recovery: bool = False
+    recover: int = 0
+
+    def on_ack(self, acked: int, ack: int) -> bool:
+        self.dup_acks = 0
+
+        if self.in_recovery:
+            if ack >= self.recover:
+                # ACK completo: fin de fast recovery, se desinfla la ventana
+                self.in_recovery = False
+                self.cwnd = self.ssthresh
+                return False
+
+            # ACK parcial: hay otro hueco, se reenvia y se desinfla lo confirmado
+            self.cwnd = max(self.cwnd - acked + 1, 1)
+            return True
+
+        if self.cwnd < self.ssthresh:
+            # Slow start: +1 paquete por paquete confirmado
+            self.cwnd += acked
+        else:
+            # Congestion avoidance: +1 paquete por ventana
+            self.cwnd += acked / self.cwnd
+
+        return False
+
+    def on_dup_ack(self, in_flight: int, next_seq: int) -> bool:
+        if self.in_recovery:
+            # Cada duplicado indica un paquete que salio de la red: se infla la ventana
+            self.cwnd += 1
+            return False
+
+        self.dup_acks += 1
+        if self.dup_acks < self.dup_threshold:
+            return False
+
+        # Fast retransmit: decremento multiplicativo y entrada a fast recovery
+        self.ssthresh = max(in_flight / 2, 2)
+        self.cwnd = self.ssthresh + self.dup_threshold
+        self.recover = next_seq
+        self.in_recovery = True
+
+        return True
+
+    def on_timeout(self, in_flight: int) -> None:
+        self.ssthresh = max(in_flight / 2, 2)
+        self.cwnd = 1
+        self.dup_acks = 0
+        self.in_recovery = False
+
+# Algoritmos disponibles, por nombre
+CONGESTION_CONTROLS: dict[str, type[CongestionControl]] = {
+    "newreno": NewReno,
+}
+
+def make_congestion_control(name: str | None = CC_ALGORITHM, window: int = WINDOW_SIZE) -> CongestionControl | None:
+    """Crea el control de congestion pedido; None desactiva el control (ventana fija)."""
+
+    if not name:
+        return None
+
+    return CONGESTION_CONTROLS[name](ssthresh=window)
@@ -1,9 +1,13 @@
-from dataclasses import dataclass
+import time
+
+from dataclasses import dataclass, field
 from logging import FileHandler, Logger
-from socket import socket, AF_INET, SOCK_DGRAM
+from socket import socket, AF_INET, SOCK_DGRAM, timeout as SocketTimeout
 
-from lib.protocolo_amcgf import MTU, PAYLOAD_ERR_MSG_KEY, Datagram, MsgType, make_ok
+from lib.protocolo_amcgf import FEATURE_FEC, FEATURE_SACK, FEATURE_ZIP, MSS, MTU, PAYLOAD_ERR_MSG_KEY, PAYLOAD_FEATURES_KEY, PAYLOAD_FEC_GROUP_KEY, PAYLOAD_FEC_PARITY_KEY, PAYLOAD_MSS_KEY, PAYLOAD_WINDOW_KEY, PAYLOAD_ZIP_KEY, VER_GBN, VER_SR, VER_SW, BadChecksum, Datagram, MsgType, Truncated, control_decode, make_ok
 from lib.sw import StopAndWait
+from lib.gbn import GoBackN
+from lib.sr import SelectiveRepeat
 from lib.config import *
 
 @dataclass
@@ -15,6 +19,13 @@ class Connection:
     protocol: int | None = None
     logger: Logger | None = None
     file_handler: FileHandler | None = None
+    window: int = WINDOW_SIZE                      # Ventana que se pide (client) o tope que se acepta (server)
+    mss: int = MSS                                 # MSS que se pide (client) o tope que se acepta (server)
+    response: dict = field(default_factory=dict)   # Payload del ultimo OK recibido (client side)
+    sack: bool = SACK                              # Ofrecer/aceptar SACK con Selective Repeat
+    fec_group: int = FEC_GROUP                     # FEC que se propone (client side; 0 = sin FEC)
+    fec_parity: int = FEC_PARITY
+    tlv: bool = CONTROL_TLV                        # REQUEST en TLV binario (client side; False = texto para servidores viejos)
 
     def _make_udp_socket(self, timeout: float | None = None, bind_addr: tuple[str, int] | None = None) -> socket:
         """Create a UDP socket with optional timeout and optional bind address."""
@@ -27,44 +38,100 @@ class Connection:
         
         return sock
 
+    def _engine_options(self, features: dict) -> dict:
+        """Engine keyword arguments for the values and features agreed in the handshake (the OK payload)."""
+
+        bits = features.get(PAYLOAD_FEATURES_KEY, 0)
+        return {
+            'mss': features.get(PAYLOAD_MSS_KEY, MSS),
+            'window': features.get(PAYLOAD_WINDOW_KEY, self.window),
+            'sack': bool(bits & FEATURE_SACK),
+            'fec_group': features.get(PAYLOAD_FEC_GROUP_KEY, 0) if bits & FEATURE_FEC else 0,
+            'fec_parity': features.get(PAYLOAD_FEC_PARITY_KEY, 1),
+            'zip': features.get(PAYLOAD_ZIP_KEY) if bits & FEATURE_ZIP else None,
+        }
+
+    def _make_rdt(self, ver: int, sock: socket, peer: tuple[str, int], rto: float = RTO, rcv = None, features: dict | None = None) -> StopAndWait:
+        """Build the reliable-transfer engine that matches the protocol version, configured with the agreed `features`."""
+
+        options = self._engine_options(features or {})
+        if ver == VER_SR:
+            return SelectiveRepeat(rto=rto, sock=sock, peer=peer, recv_fn=rcv, **options)
+        options.pop('sack')
+        if ver == VER_GBN:
+            return GoBackN(rto=rto, sock=sock, peer=peer, recv_fn=rcv, **options)
+
+        return StopAndWait(rto=rto, sock=sock, peer=peer, recv_fn=rcv, ver=ver, zip=options['zip'], mss=options['mss'])
+
     def _send_control_and_prepare_sw(self, req_bytes: bytes, timeout: float = TIMEOUT_MAX, rto: float = RTO) -> tuple[StopAndWait | None, tuple[str, int] | None, socket | None]:
         """
         Client-side helper.
-        Sends a control request (already encoded), waits for response, handles ERR, and returns a configured StopAndWait instance,
+        Sends a control request (already encoded), waits for response, handles ERR, and returns a configured engine (StopAndWait, GoBackN or SelectiveRepeat),
         the peer address, and the underlying control socket. Returns (None, None, None) on ERR.
         """
 
         sock = self._make_udp_socket(timeout=timeout)
-        sock.sendto(req_bytes, (self.host, self.port))
 
-        bytes, addr = sock.recvfrom(MTU)
-        
-        try:
-            ok = Datagram.decode(bytes)
-        except Exception:
-            raise
+        # El REQUEST o el OK pueden perderse: se reenvia el pedido hasta obtener respuesta
+        ok = None
+        for _ in range(REQUEST_RETRIES):
+            sock.sendto(req_bytes, (self.host, self.port))
+
+            try:
+                ok, addr = self._await_control_reply(sock)
+            except SocketTimeout:
+                continue
+            break
+
+        if ok is None:
+            self.logger.log(f"[ERROR] Sin respuesta del servidor {self.host}:{self.port}", quiet=True)
+            sock.close()
+            return None, None, None
         
         if ok.typ == MsgType.ERR:
-            print(f"[ERROR] {ok.payload.decode().replace(f'{PAYLOAD_ERR_MSG_KEY}=', '')}")
+            self.logger.log(f"[ERROR] {control_decode(ok).get(PAYLOAD_ERR_MSG_KEY, '')}", quiet=True)
             sock.close()
             return None, None, None
 
-        sw = StopAndWait(sock=sock, peer=addr, rto=rto)
+        self.response = control_decode(ok)
+        sw = self._make_rdt(ver=self.protocol, sock=sock, peer=addr, rto=rto, features=self.response)
         
         return sw, addr, sock
 
-    def _send_ok_and_prepare_sw(self, sock: socket, peer_addr: tuple[str, int], rto: float = RTO, rcv = None) -> StopAndWait:
+    def _await_control_reply(self, sock: socket) -> tuple[Datagram, tuple[str, int]]:
+        """Waits for the OK/ERR of a request, skipping corrupt datagrams and DATA that raced ahead of a lost OK."""
+
+        deadline = time.time() + sock.gettimeout()
+        while True:
+            if time.time() >= deadline:
+                raise SocketTimeout()
+
+            data, addr = sock.recvfrom(MTU)
+
+            try:
+                datagram = Datagram.decode(data)
+            except ProtoError:
+                continue
+
+            if datagram.typ in (MsgType.OK, MsgType.ERR):
+                return datagram, addr
+
+    def _send_ok_and_prepare_sw(self, sock: socket, peer_addr: tuple[str, int], rto: float = RTO, rcv = None, ver: int = VER_SW, extra: dict | None = None, features: dict | None = None, tlv: bool = True) -> StopAndWait:
         """
-        Server-side helper. Sends OK to the peer and returns a configured StopAndWait instance.
+        Server-side helper. Sends OK (with optional `extra` payload fields) to the peer and returns the engine for the requested protocol version.
+        `features` are the accepted handshake options: they are confirmed in the OK and configure the engine.
+        `tlv` picks the OK payload format, the same one the request came in.
         """
 
-        ok = make_ok()
+        extra = {**(extra or {}), **(features or {})}
+
+        ok = make_ok(extra=extra, ver=ver, tlv=tlv)
         
-        try:
-            encoded = ok.encode()
-        except Exception:
-            raise
+        encoded = ok.encode()
         
         sock.sendto(encoded, peer_addr)
         
-        return StopAndWait(sock=sock, peer=peer_addr, rto=rto, recv_fn=rcv)
\ No newline at end of file
+        sw = self._make_rdt(ver=ver, sock=sock, peer=peer_addr, rto=rto, rcv=rcv, features=features)
+        sw.ok_frame = encoded
+
+        return sw
\ No newline at end of file
@@ -0,0 +1,391 @@
+import selectors
+import time
+
+from dataclasses import dataclass, field
+from enum import Enum
+from socket import socket
+
+from lib.batch_recv import BatchReceiver
+from lib.config import *
+from lib.file_handler import MmapChunkSource
+from lib.timer_wheel import Timer, TimerWheel
+from lib.transfer import Transfer
+from lib.protocolo_amcgf import *
+from lib.server import Server
+from lib.sw import StopAndWait
+from lib.gbn import GoBackN
+from lib.sr import SelectiveRepeat
+
+# Tiempos del cierre, iguales a los del servidor con hilos
+BYE_RETRIES = 8
+QUIET_TIME = 0.2
+LINGER_FACTOR = 3
+
+class State(Enum):
+    RECEIVING = 1   # upload: recibiendo DATA
+    WAIT_BYE = 2    # upload: archivo completo, esperando BYE del cliente
+    SENDING = 3     # download: enviando DATA
+    BYE_SENT = 4    # download: BYE enviado, esperando OK
+    LINGER = 5      # ambos: se absorben reenvios del peer antes de cerrar
+    CLOSED = 6
+
+class _NonBlockingSender:
+    """Envuelve el socket no bloqueante: si el buffer de envio esta lleno se descarta el paquete
+    (equivale a una perdida y la recupera la retransmision)."""
+
+    def __init__(self, sock: socket):
+        self.sock = sock
+
+    def sendto(self, data, addr) -> int:
+        try:
+            return self.sock.sendto(data, addr)
+        except BlockingIOError:
+            return 0
+
+@dataclass
+class Session:
+    """Transferencia de un cliente como maquina de estados no bloqueante."""
+
+    server: 'EventServer'
+    addr: tuple[str, int]
+    ver: int
+    filename: str
+    engine: StopAndWait
+    state: State
+    deadline: float | None = None     # Timer propio del estado (BYE, linger)
+    timer: Timer | None = None        # Vencimiento cargado en la rueda del servidor
+    last_seen: float = 0.0            # Ultimo datagrama del peer
+    expires: float = float('inf')     # Tope de duracion de la sesion
+    reap_at: float = 0.0              # Proximo control de inactividad y duracion
+    bye_retries: int = 0
+    source: MmapChunkSource | None = None   # Archivo a enviar (download)
+    chunks: object = None             # Iterador de (DATA, bytes de archivo) sobre source
+    eof: bool = False                 # Ya se leyo el ultimo chunk
+    transfer: Transfer | None = None  # Archivo en recepcion (upload), quizas compartido con otros streams
+    transferred: int = 0              # Bytes de payload recibidos o enviados
+    last_range: bool = True           # El rango enviado llega al final del archivo (download)
+
+    def next_deadline(self) -> float:
+        if self.state == State.SENDING:
+            deadlines = (self.reap_at, self.engine.deadline)
+        else:
+            # Un ACK retardado pendiente vence antes que el timer de inactividad
+            deadlines = (self.reap_at, self.deadline, self.engine.acks.deadline)
+
+        return min(deadline for deadline in deadlines if deadline is not None)
+
+    def start_lease(self, now: float) -> None:
+        self.last_seen = now
+        if self.server.max_transfer_time:
+            self.expires = now + self.server.max_transfer_time
+        self.reap_at = min(now + self.server.idle_timeout, self.expires)
+
+    def _reap(self, now: float) -> bool:
+        """Controla inactividad y duracion; True si la sesion vencio (y ya se cerro)."""
+
+        if now >= self.expires or now - self.last_seen >= self.server.idle_timeout:
+            self.expire()
+            return True
+
+        # El timer de inactividad no se mueve con cada datagrama: al vencer se recalcula desde el ultimo
+        self.reap_at = min(self.last_seen + self.server.idle_timeout, self.expires)
+        return False
+
+    def expire(self) -> None:
+        """El peer dejo de responder o la sesion duro demasiado: se corta y se liberan sus recursos."""
+
+        self.server.metrics.add(expired=1)
+        self.abort()
+
+    def abort(self) -> None:
+        """Corta la sesion. Un upload en curso con un unico stream queda en disco para reanudar."""
+
+        if self.state == State.RECEIVING and self.transfer:
+            self.server._end_upload_stream(self.transfer, self.engine, self.transferred, ok=False)
+        self.close()
+
+    def close(self) -> None:
+        self.state = State.CLOSED
+        self.server.queues.pop(self.addr, None)
+
+        if self.timer:
+            self.server.wheel.cancel(self.timer)
+            self.timer = None
+
+        if self.source:
+            self.source.close()
+
+    # -------------------- upload --------------------
+
+    def _on_upload_datagram(self, datagram: Datagram, now: float) -> None:
+        if datagram.typ in (MsgType.DATA, MsgType.PARITY):
+            for data in self.engine.deliver(datagram):
+                if self.state == State.RECEIVING:
+                    self.transferred += self.transfer.write_chunk(data.seq, data.payload)
+            if self.state == State.RECEIVING:
+                self.transfer.checkpoint(self.engine.expected_seq)
+
+            if self.state == State.RECEIVING and self.engine.complete:
+                self.server._end_upload_stream(self.transfer, self.engine, self.transferred)
+                self.state = State.WAIT_BYE
+                self.deadline = None
+
+        elif datagram.typ == MsgType.BYE and self.state in (State.WAIT_BYE, State.LINGER):
+            self.engine.send_ok()
+            self.state = State.LINGER
+            self.deadline = now + max(LINGER_FACTOR * self.engine.rto, QUIET_TIME)
+
+    # -------------------- download --------------------
+
+    def _pump(self) -> None:
+        """Llena la ventana con los proximos chunks; al terminar y confirmar todo, envia BYE."""
+
+        engine = self.engine
+        while not self.eof and engine.can_send():
+            frame = next(self.chunks, None)
+            if frame is None:
+                self.eof = True
+                break
+
+            datagram, nbytes = frame
+            engine.transmit(datagram)
+            self.transferred += nbytes
+            self.eof = not datagram.flags & FLAG_MF
+
+        if self.eof and not engine.in_flight():
+            self.server.metrics.add(downloads=int(self.last_range), bytes_out=self.transferred, **self.server._engine_counters(engine))
+            self.state = State.BYE_SENT
+            self._send_bye(time.time())
+
+    def _send_bye(self, now: float) -> None:
+        if self.bye_retries >= BYE_RETRIES:
+            self.close()
+            return
+
+        self.bye_retries += 1
+        self.engine.send_bye()
+        self.deadline = now + self.engine.rto
+
+    def _on_download_datagram(self, datagram: Datagram, now: float) -> None:
+        if self.state == State.SENDING and datagram.typ == MsgType.ACK:
+            self.engine.on_ack(datagram)
+            self._pump()
+
+        elif self.state == State.BYE_SENT and datagram.typ == MsgType.OK:
+            self.state = State.LINGER
+            self.deadline = now + QUIET_TIME
+
+    # -------------------- eventos --------------------
+
+    def on_datagram(self, datagram: Datagram, now: float) -> None:
+        self.last_seen = now
+        if self.engine.answer_request(datagram):
+            return
+
+        if self.chunks is None:
+            self._on_upload_datagram(datagram, now)
+        else:
+            self._on_download_datagram(datagram, now)
+
+    def on_timer(self, now: float) -> None:
+        if now >= self.reap_at and self._reap(now):
+            return
+
+        # Pudo vencer el control de inactividad y no el timer del estado
+        due = self.deadline is not None and now >= self.deadline
+
+        if self.state == State.SENDING:
+            if self.engine.deadline and now >= self.engine.deadline:
+                self.engine.on_timeout()
+            self._pump()
+
+        elif self.state == State.RECEIVING:
+            self.engine.ack_timer(now)
+
+        elif self.state == State.BYE_SENT and due:
+            self._send_bye(now)
+
+        elif self.state == State.LINGER and due:
+            self.close()
+
+@dataclass
+class EventServer(Server):
+    """
+    Servidor de un solo hilo: un selector sobre el socket UDP, cada transferencia es una maquina
+    de estados no bloqueante y todos sus timers (retransmision, ACK retardado, cierre, inactividad
+    y duracion maxima) se reducen a un unico vencimiento por sesion en una rueda de timers.
+    Mismo protocolo en el cable que el servidor con un hilo por cliente.
+    """
+
+    wheel: TimerWheel = field(default_factory=TimerWheel)
+
+    def _make_session_rdt(self, sock: socket, addr: tuple[str, int], ver: int, features: dict | None = None) -> StopAndWait:
+        """Motor no bloqueante: Stop-and-Wait se modela como Go-Back-N de ventana 1 (mismo cable)."""
+
+        recv_fn = lambda _: None
+        options = self._engine_options(features or {})
+        if ver == VER_SR:
+            return SelectiveRepeat(sock=sock, peer=addr, recv_fn=recv_fn, **options)
+        options.pop('sack')
+        if ver == VER_GBN:
+            return GoBackN(sock=sock, peer=addr, recv_fn=recv_fn, **options)
+
+        return GoBackN(sock=sock, peer=addr, recv_fn=recv_fn, window=1, congestion=None, ver=VER_SW, zip=options['zip'], mss=options['mss'])
+
+    def _queue_depths(self) -> list[int]:
+        """Sin colas por cliente: cada datagrama se procesa al salir del lote, el backlog queda en el socket."""
+
+        return []
+
+    def _arm(self, session: Session) -> None:
+        """Carga en la rueda el proximo vencimiento de la sesion; si cambio, el anterior se cancela en O(1)."""
+
+        if session.state == State.CLOSED:
+            return
+
+        deadline = session.next_deadline()
+        if session.timer:
+            if session.timer.deadline == deadline:
+                return
+            self.wheel.cancel(session.timer)
+
+        session.timer = self.wheel.schedule(deadline, session)
+
+    def _open_session(self, sock: socket, addr: tuple[str, int], data: bytes) -> None:
+        try:
+            datagram = Datagram.decode(buf=data)
+        except Exception:
+            self._send_err(sock, addr, "Error: Error al decodificar datagrama")
+            return
+
+        if datagram.typ not in (MsgType.REQUEST_UPLOAD, MsgType.REQUEST_DOWNLOAD):
+            return
+
+        tlv = bool(datagram.flags & FLAG_TLV)
+        error = self._check_request(datagram)
+        if error:
+            self._send_err(sock, addr, error, tlv)
+            return
+
+        ver = datagram.ver
+        payload = control_decode(datagram)
+        filename = payload.get(PAYLOAD_FILENAME_KEY)
+        features = self._accept_features(ver, payload)
+        engine = self._make_session_rdt(_NonBlockingSender(sock), addr, ver, features)
+        engine.rtt_observer = self.metrics.record_rtt
+
+        session = Session(server=self, addr=addr, ver=ver, filename=filename, engine=engine, state=State.RECEIVING)
+        session.start_lease(time.time())
+        self.queues[addr] = session
+
+        if datagram.typ == MsgType.REQUEST_DOWNLOAD:
+            size = self.file_handler.file_size(filename)
+            start, end, streams = self._download_range(datagram, filename, payload, engine.mss)
+            engine.send_ok(extra={PAYLOAD_FILE_SIZE_KEY: size, PAYLOAD_OFFSET_KEY: start, PAYLOAD_RANGE_END_KEY: end, PAYLOAD_STREAMS_KEY: streams, **features}, tlv=tlv)
+
+            first, stop = chunk_span(start, end, engine.mss)
+            engine.start_at(first)
+
+            session.state = State.SENDING
+            session.last_range = end == size
+            session.source = self.file_handler.get_file_chunks(filename, engine.mss)
+            session.chunks = session.source.frames(engine, first, stop)
+            session._pump()
+        else:
+            session.transfer = self._open_transfer(addr, datagram, payload, engine.mss)
+            start, end = self._upload_range(session.transfer, payload, engine.mss)
+            engine.send_ok(extra={PAYLOAD_OFFSET_KEY: start, PAYLOAD_RANGE_END_KEY: end, PAYLOAD_STREAMS_KEY: session.transfer.streams, **features}, tlv=tlv)
+            engine.start_at(start // engine.mss)
+
+        self._arm(session)
+
+    def _drop(self, addr: tuple[str, int], error: Exception) -> None:
+        """Un error inesperado en una sesion la corta solo a ella: el loop sigue atendiendo al resto."""
+
+        self.metrics.add(errors=1)
+        if self.logger:
+            self.logger.log(f"[ERROR] - Sesion de {addr[0]}:{addr[1]} cortada: {error!r}", quiet=True)
+
+        session = self.queues.get(addr)
+        if session is None or session.state == State.CLOSED:
+            return
+
+        try:
+            session.abort()
+        except Exception:
+            session.close()
+
+    def _on_packet(self, sock: socket, data: bytes, addr: tuple[str, int]) -> None:
+        if len(data) < HDR_SIZE:
+            return
+
+        try:
+            session = self.queues.get(addr)
+            if session is None:
+                if not self._answer_stats(sock, addr, data):
+                    self._open_session(sock, addr, data)
+                return
+
+            try:
+                datagram = Datagram.decode(buf=data)
+            except ProtoError:
+                return
+
+            session.on_datagram(datagram, time.time())
+            self._arm(session)
+        except Exception as e:
+            self._drop(addr, e)
+
+    def _watch_transfer(self, transfer: Transfer) -> None:
+        """Sin hilos: la espera de los streams de un upload vence en la rueda, dentro del loop."""
+
+        self.wheel.schedule(time.time() + self.idle_timeout, transfer)
+
+    def _fire_timers(self) -> None:
+        now = time.time()
+        for item in self.wheel.advance(now):
+            if isinstance(item, Transfer):
+                try:
+                    self._expire_transfer(item)
+                except Exception as e:
+                    self.metrics.add(errors=1)
+                    if self.logger:
+                        self.logger.log(f"[ERROR] - No se pudo descartar el upload en varios streams: {e!r}", quiet=True)
+                continue
+
+            session = item
+            session.timer = None
+            if session.state == State.CLOSED:
+                continue
+
+            try:
+                session.on_timer(now)
+                self._arm(session)
+            except Exception as e:
+                self._drop(session.addr, e)
+
+    def run(self):
+        sock = self._make_server_socket()
+        sock.setblocking(False)
+        receiver = BatchReceiver(sock)
+
+        selector = selectors.DefaultSelector()
+        selector.register(sock, selectors.EVENT_READ)
+
+        print(f"Server (event loop) listening at {self.host}:{self.port}")
+        self._start_exporter()
+
+        while True:
+            expiry = self.wheel.next_expiry()
+            timeout = None if expiry is None else max(expiry - time.time(), 0)
+
+            if selector.select(timeout):
+                while True:
+                    batch = receiver.recv_batch(block=False)
+                    for data, addr in batch:
+                        self._on_packet(sock, data, addr)
+
+                    if len(batch) < receiver.batch:
+                        break
+
+            self._fire_timers()
@@ -0,0 +1,233 @@
+"""
+FEC por grupos de paquetes. Los DATA se agrupan por bloques de `group` seqs (seq // group) y al
+cerrar cada grupo el emisor envia `parity` datagramas PARITY. Con una sola paridad es el XOR de
+los paquetes del grupo; con mas, un codigo Reed-Solomon sistematico sobre GF(2^8) con matriz de
+Cauchy, que reconstruye hasta `parity` paquetes perdidos del grupo sin esperar la retransmision.
+
+Cada paquete entra al codigo como una unidad `meta (2 bytes) + payload`, donde meta lleva el largo
+del payload, si es el ultimo fragmento (MF apagado) y si va comprimido (FLAG_ZIP). Las unidades
+mas cortas se completan con ceros. Multiplicar un payload por una constante de GF(2^8) es un
+`bytes.translate` con la tabla de esa constante y sumar es un XOR de enteros, asi que no hay
+bucles por byte en Python.
+"""
+
+import struct
+
+from dataclasses import dataclass, field
+
+from lib.protocolo_amcgf import *
+
+_META_LAST = 0x8000   # En meta: el paquete es el ultimo fragmento (MF apagado)
+_META_ZIP = 0x4000    # En meta: el payload va comprimido (FLAG_ZIP)
+
+# Tablas de GF(2^8) con el polinomio 0x11d (el usual de Reed-Solomon)
+_EXP = [0] * 512
+_LOG = [0] * 256
+
+def _init_tables() -> None:
+    x = 1
+    for i in range(255):
+        _EXP[i] = x
+        _LOG[x] = i
+        x <<= 1
+        if x & 0x100:
+            x ^= 0x11D
+    for i in range(255, 512):
+        _EXP[i] = _EXP[i - 255]
+
+_init_tables()
+
+def gf_mul(a: int, b: int) -> int:
+    if a == 0 or b == 0:
+        return 0
+    return _EXP[_LOG[a] + _LOG[b]]
+
+def gf_inv(a: int) -> int:
+    return _EXP[255 - _LOG[a]]
+
+_MUL_TABLES: dict[int, bytes] = {}
+
+def _scale(unit: bytes, c: int) -> bytes:
+    """Multiplica cada byte de la unidad por c en GF(2^8)."""
+
+    if c == 1:
+        return unit
+
+    table = _MUL_TABLES.get(c)
+    if table is None:
+        table = _MUL_TABLES[c] = bytes(gf_mul(c, b) for b in range(256))
+    return unit.translate(table)
+
+def coefficient(row: int, col: int, parity: int) -> int:
+    """Coeficiente de la paridad `row` para el paquete `col` del grupo (XOR con una sola paridad)."""
+
+    if parity == 1:
+        return 1
+    # Cauchy: 1 / (x_row + y_col) con x_row = FEC_MAX_GROUP + row e y_col = col, todos distintos
+    return gf_inv((FEC_MAX_GROUP + row) ^ col)
+
+def _combine(units: list[bytes], coefs: list[int], length: int) -> bytes:
+    """Suma en GF(2^8) de coef * unidad, con las unidades completadas con ceros hasta `length`."""
+
+    acc = 0
+    for unit, c in zip(units, coefs):
+        if c:
+            acc ^= int.from_bytes(_scale(unit, c), 'big') << (8 * (length - len(unit)))
+    return acc.to_bytes(length, 'big')
+
+def _invert(matrix: list[list[int]]) -> list[list[int]]:
+    """Inversa de una matriz cuadrada sobre GF(2^8) por Gauss-Jordan (las submatrices de Cauchy son invertibles)."""
+
+    n = len(matrix)
+    m = [row[:] + [int(i == j) for j in range(n)] for i, row in enumerate(matrix)]
+
+    for col in range(n):
+        pivot = next(r for r in range(col, n) if m[r][col])
+        m[col], m[pivot] = m[pivot], m[col]
+
+        inv = gf_inv(m[col][col])
+        m[col] = [gf_mul(v, inv) for v in m[col]]
+
+        for r in range(n):
+            if r != col and m[r][col]:
+                f = m[r][col]
+                m[r] = [v ^ gf_mul(f, p) for v, p in zip(m[r], m[col])]
+
+    return [row[n:] for row in m]
+
+def _unit(datagram: Datagram) -> bytes:
+    meta = len(datagram.payload) | (0 if datagram.flags & FLAG_MF else _META_LAST) | (_META_ZIP if datagram.flags & FLAG_ZIP else 0)
+    return struct.pack("!H", meta) + bytes(datagram.payload)
+
+def _from_unit(seq: int, unit: bytes, ver: int) -> Datagram:
+    meta = struct.unpack_from("!H", unit)[0]
+    length = meta & ~(_META_LAST | _META_ZIP)
+    return make_data(seq=seq, chunk=unit[2:2 + length], ver=ver, mf=not meta & _META_LAST, zipped=bool(meta & _META_ZIP))
+
+@dataclass
+class FecEncoder:
+    """Emisor: junta las unidades del grupo en curso y al cerrarlo arma sus PARITY."""
+
+    group: int
+    parity: int = 1
+    first: int | None = None                         # Primer seq del grupo en curso
+    units: list[bytes] = field(default_factory=list)
+    sent: int = 0                                    # PARITY enviados en total
+
+    def add(self, datagram: Datagram) -> list[Datagram]:
+        """Suma un DATA nuevo (no reenvios). Devuelve los PARITY a enviar si con este se cerro el grupo."""
+
+        seq = datagram.seq
+        if self.first is not None and seq // self.group != self.first // self.group:
+            # Salto de grupo sin cierre (no deberia pasar con seqs consecutivos): se descarta el anterior
+            self.first, self.units = None, []
+
+        if self.first is None:
+            self.first = seq
+        self.units.append(_unit(datagram))
+
+        if (seq + 1) % self.group and datagram.flags & FLAG_MF:
+            return []
+
+        return self._close(datagram.ver)
+
+    def _close(self, ver: int) -> list[Datagram]:
+        units, first = self.units, self.first
+        self.first, self.units = None, []
+
+        length = max(len(unit) for unit in units)
+        parities = []
+        for row in range(self.parity):
+            coded = _combine(units, [coefficient(row, col, self.parity) for col in range(len(units))], length)
+            parities.append(make_parity(first, ver, index=row, members=len(units), parities=self.parity, coded=coded))
+
+        self.sent += len(parities)
+        return parities
+
+@dataclass
+class _Group:
+    first: int = 0
+    members: int = 0
+    units: dict[int, bytes] = field(default_factory=dict)                  # seq -> unidad recibida
+    parities: dict[int, tuple[int, bytes]] = field(default_factory=dict)   # fila -> (cantidad de paridades, codificado)
+
+@dataclass
+class FecDecoder:
+    """
+    Receptor: guarda las unidades de los grupos abiertos y reconstruye los faltantes al llegar sus PARITY.
+    Los grupos ya entregados enteros se descartan con prune y nunca hay mas de `max_groups` abiertos.
+    """
+
+    group: int
+    max_groups: int = 0         # Grupos abiertos a partir del primero sin entregar (0 = sin tope)
+    groups: dict[int, _Group] = field(default_factory=dict)
+    floor: int = 0              # Primer grupo sin entregar entero (los anteriores ya no se guardan)
+    recovered: int = 0          # Paquetes reconstruidos en total
+
+    def _open(self, gid: int) -> _Group | None:
+        """Grupo donde guardar una unidad o un PARITY; None si ya se entrego o cae fuera del tope."""
+
+        if gid < self.floor or (self.max_groups and gid >= self.floor + self.max_groups):
+            return None
+        return self.groups.setdefault(gid, _Group())
+
+    def on_data(self, datagram: Datagram) -> None:
+        g = self._open(datagram.seq // self.group)
+        if g is not None:
+            g.units.setdefault(datagram.seq, _unit(datagram))
+
+    def on_parity(self, datagram: Datagram) -> list[Datagram]:
+        """Registra un PARITY y, si alcanza, reconstruye los paquetes que faltan del grupo."""
+
+        row, members, parities, coded = parse_parity(datagram)
+        g = self._open(datagram.seq // self.group)
+        if g is None:
+            return []
+
+        g.first, g.members = datagram.seq, members
+        g.parities[row] = (parities, coded)
+
+        missing = [seq for seq in range(g.first, g.first + g.members) if seq not in g.units]
+        if not missing or len(missing) > len(g.parities):
+            return []
+
+        rows = sorted(g.parities)[:len(missing)]
+        length = len(g.parities[rows[0]][1])
+        cols = {seq: seq - g.first for seq in range(g.first, g.first + g.members)}
+
+        # Sindromes: cada paridad menos el aporte de los paquetes recibidos
+        syndromes = []
+        for r in rows:
+            n, parity = g.parities[r]
+            known = [seq for seq in cols if seq in g.units]
+            received = _combine([g.units[seq] for seq in known], [coefficient(r, cols[seq], n) for seq in known], length)
+            syndromes.append(_combine([parity, received], [1, 1], length))
+
+        inverse = _invert([[coefficient(r, cols[seq], g.parities[r][0]) for seq in missing] for r in rows])
+
+        out = []
+        for i, seq in enumerate(missing):
+            unit = _combine(syndromes, inverse[i], length)
+            g.units[seq] = unit
+            out.append(_from_unit(seq, unit, datagram.ver))
+
+        self.recovered += len(out)
+        return out
+
+    def stored(self, seq: int, ver: int) -> Datagram | None:
+        """DATA ya recibido o reconstruido con ese seq, si sigue guardado."""
+
+        g = self.groups.get(seq // self.group)
+        unit = g.units.get(seq) if g else None
+        return _from_unit(seq, unit, ver) if unit else None
+
+    def prune(self, expected_seq: int) -> None:
+        """Descarta los grupos que quedaron enteros por debajo del proximo seq esperado."""
+
+        floor = expected_seq // self.group
+        if floor <= self.floor:
+            return
+
+        self.floor = floor
+        for gid in [gid for gid in self.groups if gid < floor]:
+            del self.groups[gid]
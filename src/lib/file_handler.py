@@ -1,20 +1,266 @@
 import os
 import io
+import json
+import mmap
+import fcntl
+import itertools
+import time
 
-from io import BufferedRandom
 from dataclasses import dataclass, field
+from typing import Callable
 
-from lib.protocolo_amcgf import Datagram, FLAG_MF
+from lib.chunk_cache import ChunkCache
+from lib.config import JOURNAL_INTERVAL, PARTIAL_SWEEP
+from lib.protocolo_amcgf import MSS, make_data
+
+# Sufijo unico por escritor: varios workers (o hilos) pueden recibir el mismo nombre a la vez
+_writer_ids = itertools.count()
+
+# Bytes contiguos que se acumulan antes de escribirlos con una sola syscall
+WRITE_COALESCE = 256 * 1024
+
+@dataclass
+class FileWriter:
+    """
+    Archivo en recepcion. Se escribe en un temporal del mismo directorio y recien al terminar
+    se publica con un rename atomico: un lector nunca ve un archivo a medias y, si dos
+    transferencias escriben el mismo nombre, gana la ultima en terminar sin mezclar contenidos.
+
+    Cada chunk va a su offset (seq * chunk_size) con pwrite, asi los receptores con ventana pueden
+    escribir datos fuera de orden sin guardarlos en memoria. Los chunks contiguos se juntan en
+    una sola escritura (pwritev) y, si se conoce el tamaño final, se preasigna con posix_fallocate.
+
+    Con journal, el temporal tiene nombre fijo y el journal guarda el prefijo contiguo ya en disco:
+    si la transferencia se corta, se puede reanudar desde `offset` (incluso tras reiniciar el server).
+    """
+
+    final_path: str
+    tmp_path: str
+    fd: int
+    chunk_size: int = MSS
+    size: int | None = None           # Tamaño anunciado por el emisor
+    journal_path: str | None = None   # None => no reanudable
+    offset: int = 0                   # Bytes conservados de un intento anterior (se reanuda desde aca)
+    on_commit: Callable[[str], None] | None = None   # Aviso de que final_path cambio (invalida el cache)
+
+    def __post_init__(self):
+        self.end = self.offset              # Mayor offset escrito (largo final del archivo)
+        self.pending: list[bytes] = []      # Chunks contiguos todavia sin escribir
+        self.pending_offset = 0
+        self.pending_bytes = 0
+        self.journaled = self.offset        # Ultimo offset registrado en el journal
+
+        if self.size and hasattr(os, "posix_fallocate"):
+            try:
+                os.posix_fallocate(self.fd, 0, self.size)
+            except OSError:
+                pass  # El filesystem no lo soporta: el archivo crece con las escrituras
+
+        if self.journal_path:
+            self._write_journal(self.offset)
+
+    def _flush(self) -> None:
+        if not self.pending:
+            return
+
+        if len(self.pending) == 1:
+            os.pwrite(self.fd, self.pending[0], self.pending_offset)
+        elif hasattr(os, "pwritev"):
+            os.pwritev(self.fd, self.pending, self.pending_offset)
+        else:
+            os.pwrite(self.fd, b"".join(self.pending), self.pending_offset)
+
+        self.pending = []
+        self.pending_bytes = 0
+
+    def write_at(self, offset: int, payload: bytes) -> int:
+        """Escribe `payload` en `offset`; si sigue a lo pendiente se acumula para una sola escritura."""
+
+        if self.pending and (offset != self.pending_offset + self.pending_bytes or self.pending_bytes >= WRITE_COALESCE):
+            self._flush()
+
+        if not self.pending:
+            self.pending_offset = offset
+
+        self.pending.append(payload)
+        self.pending_bytes += len(payload)
+        self.end = max(self.end, offset + len(payload))
+
+        return len(payload)
+
+    def write_chunk(self, seq: int, payload: bytes) -> int:
+        return self.write_at(seq * self.chunk_size, payload)
+
+    def write(self, payload: bytes) -> int:
+        """Escritura secuencial: agrega al final de lo escrito."""
+        return self.write_at(self.end, payload)
+
+    def _write_journal(self, offset: int) -> None:
+        tmp = self.journal_path + ".tmp"
+        with open(tmp, "w") as file:
+            json.dump({"size": self.size, "chunk_size": self.chunk_size, "offset": offset}, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp, self.journal_path)
+
+        self.journaled = offset
+
+    def checkpoint(self, seq: int, force: bool = False) -> None:
+        """`seq` es el proximo seq esperado: todo lo anterior ya se recibio. Cada JOURNAL_INTERVAL
+        bytes se baja a disco lo escrito y se registra ese prefijo en el journal."""
+
+        offset = seq * self.chunk_size
+        if not self.journal_path or offset <= self.journaled:
+            return
+        if not force and offset - self.journaled < JOURNAL_INTERVAL:
+            return
+
+        self._flush()
+        os.fdatasync(self.fd)
+        self._write_journal(offset)
+
+    def _remove(self, *paths: str | None) -> None:
+        for path in paths:
+            try:
+                if path:
+                    os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def commit(self) -> None:
+        self._flush()
+        # Si el tamaño anunciado era mayor que lo recibido se recorta lo preasignado
+        os.ftruncate(self.fd, self.end)
+        os.close(self.fd)
+        os.replace(self.tmp_path, self.final_path)
+        self._remove(self.journal_path)
+
+        if self.on_commit:
+            self.on_commit(self.final_path)
+
+    def suspend(self, seq: int) -> None:
+        """Cierra sin publicar: el temporal y el journal quedan para reanudar desde `seq`."""
+
+        if not self.journal_path:
+            self.abort()
+            return
+
+        self.checkpoint(seq, force=True)
+        self._flush()
+        os.close(self.fd)
+
+    def abort(self) -> None:
+        os.close(self.fd)
+        self._remove(self.tmp_path, self.journal_path)
+
+class MmapChunkSource:
+    """
+    Archivo mapeado en memoria que se entrega de a chunks como memoryview (sin copiar ni leer
+    de a pedazos). MF sale del offset del chunk y `chunk(seq)` permite volver a cortar cualquier
+    seq, por ejemplo para retransmitir, sin tocar de nuevo el archivo. Un archivo vacio es un
+    unico chunk vacio con MF apagado.
+    """
+
+    def __init__(self, path: str, chunk_size: int):
+        self.chunk_size = chunk_size
+        self.file = open(path, "rb")
+        self.size = os.fstat(self.file.fileno()).st_size
+        self.map: mmap.mmap | None = None
+        self.view = memoryview(b"")
+
+        if self.size:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            if hasattr(mmap, "MADV_SEQUENTIAL"):
+                # Lectura anticipada agresiva: el archivo se recorre en orden
+                self.map.madvise(mmap.MADV_SEQUENTIAL)
+            self.view = memoryview(self.map)
+
+    def __len__(self) -> int:
+        return max(1, -(-self.size // self.chunk_size))
+
+    def chunk(self, seq: int) -> tuple[memoryview, bool]:
+        """Payload del chunk `seq` y si quedan mas fragmentos despues de el."""
+
+        start = seq * self.chunk_size
+        end = min(start + self.chunk_size, self.size)
+        return self.view[start:end], end < self.size
+
+    def iter_from(self, start: int = 0, stop: int | None = None):
+        """Chunks de los seqs [start, stop) (para reanudar o mandar un rango). El ultimo va sin MF."""
+
+        stop = len(self) if stop is None else min(stop, len(self))
+        for seq in range(start, stop):
+            payload, mf = self.chunk(seq)
+            yield payload, mf and seq + 1 < stop
+
+    def __iter__(self):
+        return self.iter_from(0)
+
+    def frames(self, engine, start: int = 0, stop: int | None = None):
+        """DATA armados por `engine` para los seqs [start, stop), con los bytes de archivo que lleva cada uno."""
+
+        for seq, (payload, mf) in enumerate(self.iter_from(start, stop), start):
+            yield engine.data_frame(seq, payload, mf), len(payload)
+
+    def close(self) -> None:
+        self.view.release()
+        if self.map is not None:
+            try:
+                self.map.close()
+            except BufferError:
+                # Todavia hay slices vivos (p. ej. en un datagrama): el mapeo se libera con ellos
+                pass
+        self.file.close()
+
+    def __enter__(self) -> 'MmapChunkSource':
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+class CachedChunkSource(MmapChunkSource):
+    """
+    MmapChunkSource que arma los DATA pasando por un ChunkCache: en un hit no se corta el
+    archivo ni se vuelve a comprimir. La clave sale del archivo ya abierto (mtime y tamaño),
+    asi que no se mezclan chunks de una version anterior.
+    """
+
+    def __init__(self, path: str, chunk_size: int, cache: ChunkCache):
+        super().__init__(path, chunk_size)
+        self.cache = cache
+
+        st = os.fstat(self.file.fileno())
+        self.ident = (path, st.st_mtime_ns, st.st_size, chunk_size)
+
+    def frames(self, engine, start: int = 0, stop: int | None = None):
+        codec = engine.codec
+        for seq, (chunk, mf) in enumerate(self.iter_from(start, stop), start):
+            key = (*self.ident, codec.name if codec else None, seq)
+            entry = self.cache.get(key)
+
+            if entry is None:
+                payload, zipped = codec.compress(chunk) if codec else (chunk, False)
+                entry = (bytes(payload), zipped, len(chunk))
+                self.cache.put(key, entry)
+            elif codec:
+                codec.count(entry[2], len(entry[0]))
+
+            payload, zipped, nbytes = entry
+            yield make_data(seq=seq, chunk=payload, ver=engine.ver, mf=mf, zipped=zipped), nbytes
 
 """Clase para manejar operaciones de archivos en el servidor"""
 @dataclass
 class FileHandler:
     path: str | None = None
-    open_files: dict[str, BufferedRandom] | None = None
+    cache: ChunkCache | None = None     # Chunks de las descargas, compartidos entre clientes (server side)
+    partial_ttl: float | None = None    # Antiguedad a partir de la cual se borran temporales abandonados (None = nunca)
+    swept: float = 0.0                  # Ultima busqueda de temporales vencidos
 
-    def __init__(self, path: str) -> None:
+    def __init__(self, path: str, cache: ChunkCache | None = None, partial_ttl: float | None = None) -> None:
         self.path = path
-        self.open_files = dict()
+        self.cache = cache
+        self.partial_ttl = partial_ttl
+        self.swept = 0.0
         os.makedirs(self.path, exist_ok=True)
 
     def is_filename_used(self, filename: str) -> bool:
@@ -24,44 +270,134 @@ class FileHandler:
         
         return os.path.exists(file_path)
 
-    def open_file(self, filename: str, mode="wb"):
-        file_path = os.path.join(self.path, filename)
-        file = open(file_path, mode)
-        
-        self.open_files[filename] = file
-        return file
-    
-    def save_datagram(self, filename: str, datagram: Datagram) -> None:
-        if filename not in self.open_files:
-            # Abrir siempre en 'wb' para truncar el archivo si ya existe (pisar contenido)
-            self.open_file(filename, "wb")
-
-        file = self.open_files[filename]
-        file.write(datagram.payload)
-
-        if not (datagram.flags & FLAG_MF): 
-            print(f"[DEBUG] Archivo '{filename}' guardado completo")
-            self.close_file(filename)
-    
-    def close_file(self, filename: str) -> None:
-        if filename in self.open_files:
-            self.open_files[filename].close()
-            del self.open_files[filename]
-
-    def get_file_chunks(self, filename: str, chunk_size: int):
-        """Generador que devuelve el archivo en chunks de tamaño chunk_size"""
-        
-        filepath = os.path.join(self.path, filename)
-        filesize = os.path.getsize(filepath)
-        
-        with open(filepath, 'rb') as file:
-            while True:
-                payload = file.read(chunk_size)
-                
-                if not payload:
-                    break
-                
-                more_fragments = file.tell() < filesize
-                print(f"[DEBUG] Enviando payload: '{payload}' MF={more_fragments} de tamaño {len(payload)}")
-                
-                yield payload, more_fragments
+    def file_size(self, filename: str) -> int:
+        return os.path.getsize(os.path.join(self.path, filename))
+
+    def _partial_paths(self, filename: str) -> tuple[str, str, str]:
+        """Archivo final, temporal fijo y journal de `filename`."""
+
+        final_path = os.path.join(self.path, filename)
+        directory, name = os.path.split(final_path)
+
+        return final_path, os.path.join(directory, f".{name}.part"), os.path.join(directory, f".{name}.journal")
+
+    def read_journal(self, filename: str) -> dict | None:
+        """Estado guardado de una recepcion cortada de `filename`, o None."""
+
+        _, _, journal_path = self._partial_paths(filename)
+        try:
+            with open(journal_path) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    def resume_offset(self, filename: str, size: int | None, chunk_size: int = MSS) -> int:
+        """Desde que offset se puede reanudar la recepcion de `filename` (0 si no hay nada util).
+        Siempre se vuelve a pedir al menos el ultimo chunk, que es el que cierra la transferencia."""
+
+        journal = self.read_journal(filename)
+        if not journal or not size or journal.get("size") != size or journal.get("chunk_size") != chunk_size:
+            return 0
+
+        last_chunk = (size - 1) // chunk_size * chunk_size
+        return min(journal.get("offset", 0), last_chunk)
+
+    @staticmethod
+    def _in_use(path: str) -> bool:
+        """El temporal fijo tiene el flock de un escritor vivo (de este u otro proceso)."""
+
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            return False
+
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return False
+        except OSError:
+            return True
+        finally:
+            os.close(fd)
+
+    def reap_partials(self, max_age: float, now: float | None = None) -> int:
+        """
+        Borra temporales (.part) y journals de recepciones abandonadas: los que no se tocan hace mas
+        de `max_age` segundos. Un upload suspendido deja de ser reanudable. Devuelve cuantos borro.
+        """
+
+        now = time.time() if now is None else now
+        removed = 0
+        for entry in os.scandir(self.path):
+            name = entry.name
+            if not name.startswith('.') or not name.endswith(('.part', '.journal')) or not entry.is_file():
+                continue
+
+            part = entry.path[:-len('.journal')] + '.part' if name.endswith('.journal') else entry.path
+            if now - entry.stat().st_mtime < max_age or self._in_use(part):
+                continue
+
+            try:
+                os.remove(entry.path)
+                removed += 1
+            except FileNotFoundError:
+                pass
+
+        return removed
+
+    def _sweep(self) -> None:
+        """Con partial_ttl, busca temporales vencidos como mucho cada PARTIAL_SWEEP segundos."""
+
+        now = time.time()
+        if self.partial_ttl is None or now - self.swept < PARTIAL_SWEEP:
+            return
+
+        self.swept = now
+        self.reap_partials(self.partial_ttl, now)
+
+    def _private_writer(self, final_path: str, size: int | None, chunk_size: int) -> FileWriter:
+        """Escritor sobre un temporal con nombre unico, sin journal (no reanudable)."""
+
+        directory, name = os.path.split(final_path)
+        tmp_path = os.path.join(directory, f".{name}.{os.getpid()}.{next(_writer_ids)}.part")
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+
+        return FileWriter(final_path=final_path, tmp_path=tmp_path, fd=fd, chunk_size=chunk_size, size=size, on_commit=self._invalidate)
+
+    def open_writer(self, filename: str, size: int | None = None, chunk_size: int = MSS, offset: int = 0, resumable: bool = True) -> FileWriter:
+        """
+        Abre un escritor propio para `filename` (el archivo final se pisa recien en commit).
+        Con offset > 0 (ver resume_offset) se conserva lo ya recibido de un intento anterior.
+        """
+
+        self._sweep()
+
+        final_path, tmp_path, journal_path = self._partial_paths(filename)
+        if not resumable:
+            return self._private_writer(final_path, size, chunk_size)
+
+        fd = os.open(tmp_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            # Otra transferencia del mismo nombre tiene el temporal fijo: se usa uno propio, sin reanudacion
+            os.close(fd)
+            return self._private_writer(final_path, size, chunk_size)
+
+        if offset != self.resume_offset(filename, size, chunk_size):
+            offset = 0
+        if not offset:
+            os.ftruncate(fd, 0)
+
+        return FileWriter(final_path=final_path, tmp_path=tmp_path, fd=fd, chunk_size=chunk_size, size=size, journal_path=journal_path, offset=offset, on_commit=self._invalidate)
+
+    def _invalidate(self, path: str) -> None:
+        if self.cache:
+            self.cache.invalidate(path)
+
+    def get_file_chunks(self, filename: str, chunk_size: int) -> MmapChunkSource:
+        """Devuelve el archivo como fuente de chunks de tamaño chunk_size (ver MmapChunkSource), con cache si hay"""
+
+        path = os.path.join(self.path, filename)
+        if self.cache:
+            return CachedChunkSource(path, chunk_size, self.cache)
+        return MmapChunkSource(path, chunk_size)
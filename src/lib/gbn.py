@@ -1,23 +1,201 @@
+import time
+
 from dataclasses import dataclass
-from socket import socket
 
 from lib.logger import Logger
-from src.lib.protocolo_amcgf import Datagram
-
-@dataclass  
-class GoBackN:
-    def __init__(self, sock: socket, client_addr: tuple[str, int]):
-        self.sock = sock
-        self.client_addr = client_addr
-            
-    def send_data(self, datagram: Datagram, logger: Logger | None):
-        pass
-        
-    def receive_data(self):
-       pass 
-    
-    def send_ack(self, acknum: int):
-        pass
-    
-    def receive_ack(self):
-        pass
\ No newline at end of file
+from lib.protocolo_amcgf import *
+from lib.config import *
+from lib.sw import StopAndWait
+from lib.congestion import CongestionControl, make_congestion_control
+
+@dataclass
+class GoBackN(StopAndWait):
+    """
+    Emisor Go-Back-N: hasta `window` paquetes en vuelo, ACK acumulativo y un unico timer
+    para toda la ventana. Ante un timeout se vuelve a `base` y se reenvia desde ahi, limitado
+    por la ventana de congestion. El lado receptor es el mismo de StopAndWait.
+    """
+
+    ver: int = VER_GBN
+    window: int = WINDOW_SIZE
+    congestion: str | None = CC_ALGORITHM
+    ack_every: int = ACK_EVERY
+
+    def __post_init__(self):
+        super().__post_init__()
+
+        self.base = 0                          # Primer seq sin confirmar
+        self.next_seq = 0                      # Proximo seq nuevo (ya codificado hasta next_seq - 1)
+        self.send_ptr = 0                      # Proximo seq a (re)enviar: < next_seq tras un go-back
+        self.ring = [bytearray(self.mtu) for _ in range(self.window)]   # Buffers preasignados, uno por slot
+        self.frames = [memoryview(b"")] * self.window             # Frame codificado de cada slot (indice seq % window)
+        self.sent_at = [0.0] * self.window     # Momento del envio de cada frame del anillo
+        self.resent = [False] * self.window    # Frames retransmitidos (regla de Karn: no dan muestra de RTT)
+        self.deadline: float | None = None     # Vencimiento del timer de la ventana
+
+        # Control de congestion (None => ventana fija)
+        self.cc: CongestionControl | None = make_congestion_control(self.congestion, self.window)
+        self.cc_logged: tuple[int, float] | None = None
+
+        # FEC: el receptor no guarda grupos mas alla de la ventana (+1 por el grupo partido en cada borde)
+        if self.fec_rx:
+            self.fec_rx.max_groups = self.window // self.fec_rx.group + 2
+
+    def start_at(self, seq: int) -> None:
+        super().start_at(seq)
+        self.base = self.next_seq = self.send_ptr = seq
+
+    def in_flight(self) -> int:
+        return self.next_seq - self.base
+
+    def effective_window(self) -> int:
+        """La menor entre la ventana configurada y la ventana de congestion."""
+
+        return min(self.window, self.cc.window()) if self.cc else self.window
+
+    def can_send(self) -> bool:
+        return self.send_ptr == self.next_seq and self.in_flight() < self.effective_window()
+
+    def _log_cc(self, logger: Logger | None) -> None:
+        """Registra cwnd/ssthresh cuando cambia la ventana efectiva o el umbral."""
+
+        if not (logger and self.cc):
+            return
+
+        state = (self.cc.window(), self.cc.ssthresh)
+        if state != self.cc_logged:
+            self.cc_logged = state
+            logger.log_cwnd(self.cc.cwnd, self.cc.ssthresh)
+
+    def _resend(self, seq: int, now: float) -> None:
+        slot = seq % self.window
+        self.sock.sendto(self.frames[slot], self.peer)
+        self.sent_at[slot] = now
+        self.resent[slot] = True
+
+    def _fill(self, logger: Logger | None = None) -> int:
+        """Despues de un go-back, reenvia desde send_ptr lo que permita la ventana efectiva."""
+
+        now = time.time()
+        resent = 0
+        while self.send_ptr < self.next_seq and self.send_ptr - self.base < self.effective_window():
+            self._resend(self.send_ptr, now)
+            self.send_ptr += 1
+            resent += 1
+
+        self.retransmissions += resent
+        if logger and resent:
+            logger.add_retransmission(resent)
+
+        return resent
+
+    def _fast_retransmit(self, logger: Logger | None = None) -> None:
+        """
+        Fast retransmit sin esperar el timer. El receptor GBN descarta todo lo posterior al hueco,
+        asi que se vuelve a `base` (salvo que ya se este reenviando desde ahi).
+        """
+
+        if self.resent[self.base % self.window]:
+            return
+
+        self.send_ptr = self.base
+        self._fill(logger)
+
+    def transmit(self, datagrama: Datagram, logger: Logger | None = None) -> int:
+        """Envia un DATA sin bloquear. Requiere que haya lugar en la ventana."""
+
+        slot = datagrama.seq % self.window
+        try:
+            length = datagrama.encode_into(self.ring[slot], mss=self.mss)
+        except ProtoError:
+            return 0
+
+        if not self.in_flight():
+            # Ventana vacia: se alinea con el seq del emisor y arranca el timer
+            self.base = datagrama.seq
+            self.deadline = time.time() + self.rto
+
+        self.frames[slot] = memoryview(self.ring[slot])[:length]
+        self.sent_at[slot] = time.time()
+        self.resent[slot] = False
+        self.next_seq = datagrama.seq + 1
+        self.send_ptr = self.next_seq
+
+        self.sock.sendto(self.frames[slot], self.peer)
+
+        if self.fec_tx:
+            self._send_parity(datagrama, logger)
+
+        return length
+
+    def on_ack(self, datagram: Datagram, logger: Logger | None = None) -> None:
+        """Procesa un ACK acumulativo: desliza la ventana, avisa al control de congestion y reinicia el timer."""
+
+        if datagram.ack == self.base and self.in_flight():
+            # ACK duplicado: el receptor recibio algo posterior a un hueco
+            if self.cc and self.cc.on_dup_ack(self.in_flight(), self.next_seq):
+                self._fast_retransmit(logger)
+            self._log_cc(logger)
+            return
+
+        if datagram.ack <= self.base or datagram.ack > self.next_seq:
+            return
+
+        slot = (datagram.ack - 1) % self.window
+        if not self.resent[slot]:
+            self._rtt_sample(time.time() - self.sent_at[slot], logger)
+        else:
+            self._rto_progress(logger)
+
+        acked = datagram.ack - self.base
+        self.base = datagram.ack
+        self.send_ptr = max(self.send_ptr, self.base)
+
+        if self.cc and self.cc.on_ack(acked, datagram.ack) and self.in_flight():
+            self._fast_retransmit(logger)
+        self._log_cc(logger)
+
+        self._fill(logger)
+        self.deadline = time.time() + self.rto if self.in_flight() else None
+
+    def on_timeout(self, logger: Logger | None = None) -> None:
+        """Vencio el timer: se vuelve a `base` y se reenvia lo que permita la ventana efectiva."""
+
+        self._rto_backoff(logger)
+
+        if self.cc:
+            self.cc.on_timeout(self.in_flight())
+            self._log_cc(logger)
+
+        self.send_ptr = self.base
+        self._fill(logger)
+
+        self.deadline = time.time() + self.rto
+
+    def _pump(self, logger: Logger | None = None) -> None:
+        """Espera un ACK hasta el vencimiento del timer y dispara el reenvio si corresponde."""
+
+        timeout = max(self.deadline - time.time(), 0.001) if self.deadline else self.rto
+
+        raw = self.recv_fn(timeout)
+        if raw is not None:
+            datagram = self._safe_decode(raw)
+            if datagram and datagram.typ == MsgType.ACK:
+                self.on_ack(datagram, logger)
+
+        if self.deadline and time.time() >= self.deadline:
+            self.on_timeout(logger)
+
+    def send_data(self, datagrama: Datagram, logger: Logger | None = None) -> int:
+        """Encola el DATA en la ventana; bloquea solo mientras la ventana este llena."""
+
+        while not self.can_send():
+            self._pump(logger)
+
+        return self.transmit(datagrama, logger)
+
+    def flush(self, logger: Logger | None = None) -> None:
+        """Espera hasta que todos los paquetes en vuelo esten confirmados."""
+
+        while self.in_flight():
+            self._pump(logger)
@@ -0,0 +1,96 @@
+"""
+Metricas de memoria fija para el logger. Histogram es un histograma log-lineal al estilo
+HdrHistogram: los valores enteros caen en 2^SUB_BITS cubetas por cada potencia de 2, asi que el
+error relativo de un percentil queda por debajo de 2^-(SUB_BITS-1) sin guardar las muestras.
+Series es un historial (tiempo, valor...) acotado que se submuestrea a medida que se llena.
+"""
+
+import math
+
+from dataclasses import dataclass, field
+
+from lib.config import *
+
+SUB_BITS = 7                 # 128 cubetas por potencia de 2: error relativo < 1.6%
+HIST_MAX = 60_000_000        # Mayor valor distinguible (60 s en microsegundos); lo de arriba va a la ultima cubeta
+
+def _index(value: int) -> int:
+    half = 1 << (SUB_BITS - 1)
+    shift = max(0, value.bit_length() - SUB_BITS)
+    return shift * half + (value >> shift)
+
+def _highest(index: int) -> int:
+    """Mayor valor que cae en la cubeta `index`."""
+
+    half = 1 << (SUB_BITS - 1)
+    shift = max(0, (index - half) // half)
+    return ((index - shift * half + 1) << shift) - 1
+
+@dataclass
+class Histogram:
+    """Histograma de valores enteros no negativos (el logger guarda RTT en microsegundos)."""
+
+    counts: list[int] = field(default_factory=lambda: [0] * (_index(HIST_MAX) + 1))
+    count: int = 0
+    total: int = 0
+    max: int = 0
+
+    def record(self, value: int) -> None:
+        value = max(0, value)
+        self.counts[_index(min(value, HIST_MAX))] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def merge(self, other: 'Histogram') -> None:
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0
+
+    def percentile(self, p: float) -> int:
+        """Valor por debajo del cual queda el p% de las muestras (acotado al maximo visto)."""
+
+        if not self.count:
+            return 0
+
+        target = max(1, math.ceil(p / 100 * self.count))
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                return min(_highest(index), self.max)
+        return self.max
+
+@dataclass
+class Series:
+    """
+    Historial de hasta `limit` puntos. Al llenarse descarta uno de cada dos y duplica el paso de
+    muestreo: cubre toda la transferencia con resolucion decreciente y memoria fija.
+    """
+
+    limit: int = HISTORY_MAX
+    points: list = field(default_factory=list)
+    step: int = 1
+    seen: int = 0
+    last: tuple | None = None     # Ultimo punto registrado, aunque el muestreo lo haya salteado
+
+    def append(self, point: tuple) -> None:
+        if self.seen % self.step == 0:
+            self.points.append(point)
+            if len(self.points) >= self.limit:
+                del self.points[1::2]
+                self.step *= 2
+
+        self.seen += 1
+        self.last = point
+
+    def __iter__(self):
+        return iter(self.points)
+
+    def __len__(self) -> int:
+        return len(self.points)
@@ -0,0 +1,176 @@
+"""
+Relay UDP que degrada el enlace entre cliente y servidor en localhost, para reproducir sin
+Mininet ni root las condiciones de net.py. Cada sentido aplica, al estilo de netem: perdida
+aleatoria o en rafagas (Gilbert-Elliott), demora fija con jitter, reordenamiento, duplicados,
+corrupcion de un bit (el receptor la ve como BadChecksum) y un tope de ancho de banda con cola
+acotada. Cada sentido tiene su propio generador derivado de la semilla: con la misma secuencia
+de datagramas se toman las mismas decisiones.
+"""
+
+import heapq
+import itertools
+import random
+import selectors
+import threading
+import time
+
+from collections import Counter
+from dataclasses import dataclass, field
+from socket import AF_INET, SOCK_DGRAM, socket
+
+@dataclass
+class Impairment:
+    """Condiciones de un sentido del enlace. Tiempos en segundos, probabilidades en [0, 1]."""
+
+    loss: float = 0.0           # Perdida aleatoria (con Gilbert-Elliott, la del estado bueno)
+    ge_p: float = 0.0           # Gilbert-Elliott: probabilidad de pasar de bueno a malo (0 = sin rafagas)
+    ge_r: float = 1.0           # Gilbert-Elliott: probabilidad de volver de malo a bueno
+    ge_loss: float = 1.0        # Gilbert-Elliott: perdida en el estado malo
+    delay: float = 0.0
+    jitter: float = 0.0         # La demora varia uniforme en [delay - jitter, delay + jitter]
+    reorder: float = 0.0        # Paquetes que se demoran reorder_delay extra (los siguientes los pasan)
+    reorder_delay: float = 0.005
+    duplicate: float = 0.0
+    corrupt: float = 0.0        # Paquetes con un bit invertido
+    rate: float = 0.0           # Tope de ancho de banda en bits/s (0 = sin tope)
+    queue: int = 64 * 1024      # Bytes que entran en la cola del tope; lo que no entra se descarta
+
+@dataclass
+class Link:
+    """Un sentido del enlace: decide que pasa con cada datagrama y cuando se entrega."""
+
+    spec: Impairment
+    rng: random.Random
+    bad: bool = False           # Estado de Gilbert-Elliott
+    busy_until: float = 0.0     # Con tope de ancho de banda: cuando termina de salir lo encolado
+    stats: Counter = field(default_factory=Counter)
+
+    def _lost(self) -> bool:
+        spec = self.spec
+        if spec.ge_p:
+            self.bad = self.rng.random() >= spec.ge_r if self.bad else self.rng.random() < spec.ge_p
+
+        return self.rng.random() < (spec.ge_loss if self.bad else spec.loss)
+
+    def _corrupt(self, data: bytes) -> bytes:
+        frame = bytearray(data)
+        frame[self.rng.randrange(len(frame))] ^= 1 << self.rng.randrange(8)
+        return bytes(frame)
+
+    def process(self, data: bytes, now: float) -> list[tuple[float, bytes]]:
+        """Entregas de `data` como (momento, bytes): ninguna si se pierde, dos si se duplica."""
+
+        spec = self.spec
+        if self._lost():
+            self.stats['dropped'] += 1
+            return []
+
+        copies = 1
+        if spec.duplicate and self.rng.random() < spec.duplicate:
+            self.stats['duplicated'] += 1
+            copies = 2
+
+        out = []
+        for _ in range(copies):
+            frame = data
+            if spec.corrupt and data and self.rng.random() < spec.corrupt:
+                self.stats['corrupted'] += 1
+                frame = self._corrupt(data)
+
+            sent = now
+            if spec.rate:
+                start = max(now, self.busy_until)
+                if (start - now) * spec.rate / 8 > spec.queue:
+                    self.stats['queue_drops'] += 1
+                    continue
+                sent = self.busy_until = start + len(frame) * 8 / spec.rate
+
+            at = sent + spec.delay
+            if spec.jitter:
+                at += self.rng.uniform(-spec.jitter, spec.jitter)
+            if spec.reorder and self.rng.random() < spec.reorder:
+                self.stats['reordered'] += 1
+                at += spec.reorder_delay
+
+            self.stats['forwarded'] += 1
+            out.append((max(at, sent), frame))
+
+        return out
+
+@dataclass
+class ImpairmentProxy:
+    """
+    Relay entre clientes y un servidor: escucha en `listen` y por cada cliente abre un socket
+    propio hacia `server`, asi las respuestas vuelven al cliente correcto. `up` degrada lo que
+    va al servidor y `down` lo que vuelve. Las entregas demoradas cuelgan de un heap de timers.
+    """
+
+    listen: tuple[str, int]
+    server: tuple[str, int]
+    up: Impairment = field(default_factory=Impairment)
+    down: Impairment = field(default_factory=Impairment)
+    seed: int = 0
+
+    def __post_init__(self):
+        self.front = socket(AF_INET, SOCK_DGRAM)
+        self.front.bind(self.listen)
+        self.address = self.front.getsockname()
+
+        # Un generador por sentido: las decisiones de uno no dependen del trafico del otro
+        self.links = {
+            'up': Link(self.up, random.Random(2 * self.seed)),
+            'down': Link(self.down, random.Random(2 * self.seed + 1)),
+        }
+
+        self.upstreams: dict[tuple[str, int], socket] = {}
+        self.pending: list = []
+        self.counter = itertools.count()
+        self.stopped = threading.Event()
+
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.front, selectors.EVENT_READ, None)
+
+    def _upstream(self, client: tuple[str, int]) -> socket:
+        sock = self.upstreams.get(client)
+        if sock is None:
+            sock = self.upstreams[client] = socket(AF_INET, SOCK_DGRAM)
+            sock.bind((self.address[0], 0))
+            self.selector.register(sock, selectors.EVENT_READ, client)
+        return sock
+
+    def _schedule(self, link: Link, data: bytes, sock: socket, addr: tuple[str, int], now: float) -> None:
+        for at, frame in link.process(data, now):
+            heapq.heappush(self.pending, (at, next(self.counter), sock, frame, addr))
+
+    def _flush(self, now: float) -> None:
+        while self.pending and self.pending[0][0] <= now:
+            _, _, sock, frame, addr = heapq.heappop(self.pending)
+            sock.sendto(frame, addr)
+
+    def stats(self) -> dict[str, Counter]:
+        return {direction: link.stats for direction, link in self.links.items()}
+
+    def run(self) -> None:
+        while not self.stopped.is_set():
+            timeout = 0.1
+            if self.pending:
+                timeout = min(max(self.pending[0][0] - time.time(), 0), timeout)
+
+            for key, _ in self.selector.select(timeout):
+                data, addr = key.fileobj.recvfrom(65535)
+                now = time.time()
+
+                if key.data is None:
+                    self._schedule(self.links['up'], data, self._upstream(addr), self.server, now)
+                else:
+                    self._schedule(self.links['down'], data, self.front, key.data, now)
+
+            self._flush(time.time())
+
+    def start(self) -> threading.Thread:
+        thread = threading.Thread(target=self.run, daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self) -> None:
+        self.stopped.set()
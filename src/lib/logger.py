@@ -1,21 +1,45 @@
 #import matplotlib.pyplot as plt
+import threading
 import time
 import os
 
+from lib.histogram import Histogram, Series
+
+# Niveles de log: se imprime lo que tenga nivel >= Logger.level
+DEBUG = 10
+INFO = 20
+WARNING = 30
+
 class Logger:
-    def __init__(self, verbose: bool = False, output_dir: str = 'logs'):
-        self.verbose = verbose
+    def __init__(self, verbose: bool = False, output_dir: str = 'logs', level: int | None = None):
+        # Sin nivel explicito, verbose => INFO. Los caminos calientes chequean debug_enabled antes de
+        # armar el mensaje, asi con DEBUG apagado el costo es leer un atributo
+        self.level = level if level is not None else (INFO if verbose else WARNING)
+        self.verbose = self.level <= INFO
+        self.debug_enabled = self.level <= DEBUG
 
-        # Datos para RTT
-        self.x_data = []
-        self.y_data = []
-        self.rtt_list = []        # Nueva lista de RTT
-        self.packets_sent = 0     # Contador de paquetes
+        # Datos para RTT (memoria fija aunque la transferencia sea larga)
+        self.rtt_hist = Histogram()   # RTT en microsegundos
+        self.rtt_history = Series()   # (tiempo, RTT ms), solo con verbose
+        self.packets_sent = 0         # Contador de paquetes
+        self.rto_history = Series()   # (tiempo, RTO) para ver la convergencia del estimador
+        self.cwnd_history = Series()  # (tiempo, cwnd, ssthresh) del control de congestion
 
         # Datos para métricas extra
         self.bytes_sent = 0
         self.start_time = None
         self.retransmissions = 0
+        self.parity_sent = 0      # FEC: PARITY enviados y sus bytes en el cable
+        self.parity_bytes = 0
+        self.fec_recovered = 0    # FEC: DATA reconstruidos sin retransmision
+        self.zip_codec = None     # Compresion: codec acordado, bytes de archivo, bytes en el cable y CPU (s)
+        self.zip_raw = 0
+        self.zip_wire = 0
+        self.zip_cpu = 0.0
+
+        # Transferencias en varios streams: (stream, bytes, duracion s, retransmisiones)
+        self.streams = []
+        self.lock = threading.Lock()
 
         # Carpeta para guardar resultados
         self.output_dir = output_dir
@@ -42,6 +66,11 @@ class Logger:
         if self.verbose or quiet:
             print(message)
 
+    def debug(self, message: str):
+        """Mensaje de nivel DEBUG (en caminos calientes, chequear antes debug_enabled)"""
+        if self.debug_enabled:
+            print(message)
+
     def start_transfer(self):
         """Marcar el inicio de la transferencia"""
         self.start_time = time.time()
@@ -55,33 +84,102 @@ class Logger:
         if retransmission:
             self.retransmissions += 1
 
+    def add_retransmission(self, count: int = 1):
+        """Registrar paquetes reenviados sin sumar bytes nuevos"""
+        self.retransmissions += count
+
+    def add_parity(self, nbytes: int):
+        """Registrar un PARITY (FEC) enviado"""
+        self.parity_sent += 1
+        self.parity_bytes += nbytes
+
+    def add_recovered(self, count: int):
+        """Registrar paquetes reconstruidos por FEC en el receptor"""
+        self.fec_recovered += count
+
+    def add_compression(self, codec):
+        """Registrar las metricas del codec de compresion de una transferencia"""
+        self.zip_codec = codec.name
+        self.zip_raw += codec.raw_bytes
+        self.zip_wire += codec.wire_bytes
+        self.zip_cpu += codec.cpu_time
+
     def log_rtt(self, rtt: float):
         """Registrar un valor de RTT"""
         now = time.time()
         elapsed = now - self.start_time if self.start_time else 0
-        self.rtt_list.append(rtt)
+        self.rtt_hist.record(int(rtt * 1000))
         self.packets_sent += 1
 
         if self.verbose:
-            self.x_data.append(elapsed)
-            self.y_data.append(rtt)
+            self.rtt_history.append((elapsed, rtt))
+
+    def log_rto(self, rto: float):
+        """Registrar un nuevo valor de RTO (en segundos)"""
+        elapsed = time.time() - self.start_time if self.start_time else 0
+        self.rto_history.append((elapsed, rto))
+
+    def log_cwnd(self, cwnd: float, ssthresh: float):
+        """Registrar la ventana de congestion y el umbral de slow start (en paquetes)"""
+        elapsed = time.time() - self.start_time if self.start_time else 0
+        self.cwnd_history.append((elapsed, cwnd, ssthresh))
+
+    def stream_logger(self) -> 'Logger':
+        """Logger propio para un stream (cada uno corre en su hilo); al terminar se suma con merge_stream"""
+        child = Logger(self.verbose, self.output_dir, self.level)
+        child.start_time = time.time()
+        return child
+
+    def merge_stream(self, stream: int, child: 'Logger'):
+        """Suma las metricas de un stream terminado y guarda su resumen"""
+        duration = time.time() - child.start_time if child.start_time else 0
+
+        with self.lock:
+            self.bytes_sent += child.bytes_sent
+            self.retransmissions += child.retransmissions
+            self.parity_sent += child.parity_sent
+            self.parity_bytes += child.parity_bytes
+            self.fec_recovered += child.fec_recovered
+            self.zip_codec = self.zip_codec or child.zip_codec
+            self.zip_raw += child.zip_raw
+            self.zip_wire += child.zip_wire
+            self.zip_cpu += child.zip_cpu
+            self.packets_sent += child.packets_sent
+            self.rtt_hist.merge(child.rtt_hist)
+            self.streams.append((stream, child.bytes_sent, duration, child.retransmissions))
 
     def log_final(self, filename: str = 'metrics.txt'):
         """Guardar métricas y mostrar resultados finales"""
         
         duration = time.time() - self.start_time if self.start_time else 0
         throughput = (self.bytes_sent / 1024) / duration if duration > 0 else 0
-        rtt_avg = (sum(self.rtt_list)/len(self.rtt_list))*1000 if self.rtt_list else 0  # ms
+        rtt = self.rtt_hist
+        rto_final = self.rto_history.last[1] * 1000 if self.rto_history.last else 0  # ms
 
         summary = (
             f"Duración: {duration:.2f} s\n"
             f"Bytes enviados: {self.bytes_sent}\n"
             f"Paquetes enviados: {self.packets_sent}\n"
             f"Throughput promedio: {throughput:.2f} KB/s\n"
-            f"RTT promedio: {rtt_avg:.2f} ms\n"
+            f"RTT promedio: {rtt.mean / 1000:.2f} ms\n"
+            f"RTT p50/p90/p99/max: {rtt.percentile(50) / 1000:.2f} / {rtt.percentile(90) / 1000:.2f} / {rtt.percentile(99) / 1000:.2f} / {rtt.max / 1000:.2f} ms\n"
             f"Retransmisiones: {self.retransmissions}\n"
+            f"RTO final: {rto_final:.2f} ms\n"
         )
 
+        if self.parity_sent:
+            overhead = self.parity_bytes / self.bytes_sent * 100 if self.bytes_sent else 0
+            summary += f"Paridad FEC: {self.parity_sent} paquetes, {self.parity_bytes} bytes ({overhead:.2f}% de overhead)\n"
+        if self.fec_recovered:
+            summary += f"Recuperados por FEC: {self.fec_recovered} paquetes\n"
+        if self.zip_codec:
+            ratio = self.zip_raw / self.zip_wire if self.zip_wire else 1
+            summary += f"Compresion ({self.zip_codec}): {self.zip_raw} -> {self.zip_wire} bytes (ratio {ratio:.2f}), CPU {self.zip_cpu * 1000:.2f} ms\n"
+
+        for stream, nbytes, elapsed, retransmissions in sorted(self.streams):
+            stream_tp = (nbytes / 1024) / elapsed if elapsed > 0 else 0
+            summary += f"Stream {stream}: {nbytes} bytes en {elapsed:.2f} s ({stream_tp:.2f} KB/s), {retransmissions} retransmisiones\n"
+
         self.log("Resultados finales:\n" + summary)
 
         # Guardar métricas en archivo
@@ -89,9 +187,33 @@ class Logger:
         with open(filepath, "w") as f:
             f.write(summary)
 
+        # Resumen por stream
+        if self.streams:
+            streams_path = os.path.splitext(filepath)[0] + "_streams.csv"
+            with open(streams_path, "w") as f:
+                f.write("stream,bytes,duracion_s,retransmisiones\n")
+                for stream, nbytes, elapsed, retransmissions in sorted(self.streams):
+                    f.write(f"{stream},{nbytes},{elapsed:.4f},{retransmissions}\n")
+
+        # Historial de RTO (tiempo en s, RTO en ms)
+        if self.rto_history:
+            rto_path = os.path.splitext(filepath)[0] + "_rto.csv"
+            with open(rto_path, "w") as f:
+                f.write("tiempo_s,rto_ms\n")
+                for elapsed, rto in self.rto_history:
+                    f.write(f"{elapsed:.4f},{rto * 1000:.3f}\n")
+
+        # Historial de la ventana de congestion (tiempo en s, cwnd y ssthresh en paquetes)
+        if self.cwnd_history:
+            cwnd_path = os.path.splitext(filepath)[0] + "_cwnd.csv"
+            with open(cwnd_path, "w") as f:
+                f.write("tiempo_s,cwnd,ssthresh\n")
+                for elapsed, cwnd, ssthresh in self.cwnd_history:
+                    f.write(f"{elapsed:.4f},{cwnd:.2f},{ssthresh:.2f}\n")
+
         #if self.verbose:
-            #self.line_rtt.set_xdata(self.x_data)
-            #self.line_rtt.set_ydata(self.y_data)
+            #self.line_rtt.set_xdata([t for t, _ in self.rtt_history])
+            #self.line_rtt.set_ydata([rtt for _, rtt in self.rtt_history])
             #self.ax_rtt.relim()
             #self.ax_rtt.autoscale_view()
             #plt.draw()
@@ -0,0 +1,171 @@
+import multiprocessing
+import os
+import threading
+import time
+
+from dataclasses import dataclass, field, fields
+from typing import Callable
+
+from lib.config import *
+from lib.histogram import Histogram
+
+@dataclass
+class ServerMetrics:
+    """
+    Contadores del servidor. Los hilos de un mismo proceso los actualizan con `add`;
+    con varios workers cada proceso además los publica en su fila de `shared`, donde cualquiera
+    los suma, y al terminar los envia al padre, que los suma con `merge`.
+    """
+
+    workers: int = 1
+    uploads: int = 0
+    downloads: int = 0
+    errors: int = 0
+    expired: int = 0           # Sesiones cortadas por inactividad del peer o por durar mas que el tope
+    bytes_in: int = 0
+    bytes_out: int = 0
+    retransmissions: int = 0
+    parity_sent: int = 0       # PARITY de FEC enviados en downloads
+    fec_recovered: int = 0     # DATA reconstruidos por FEC en uploads
+    zip_raw_bytes: int = 0     # Compresion: bytes de archivo que pasaron por el codec
+    zip_wire_bytes: int = 0    # Compresion: lo que ocuparon esos bytes en los payloads
+    rtt: Histogram = field(default_factory=Histogram, repr=False, compare=False)   # RTT de los downloads (us)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+    shared: 'SharedCounters | None' = field(default=None, repr=False, compare=False)   # Tabla de todos los workers
+    row: int = field(default=0, repr=False, compare=False)                            # Fila de este worker en `shared`
+
+    def add(self, **counters: int) -> None:
+        with self.lock:
+            for name, value in counters.items():
+                setattr(self, name, getattr(self, name) + value)
+
+            if self.shared:
+                self.shared.publish(self.row, self.to_dict())
+
+    def share(self, shared: 'SharedCounters', row: int) -> None:
+        """Publica desde ahora los contadores en la fila `row` de la tabla compartida entre workers."""
+        with self.lock:
+            self.shared, self.row = shared, row
+            shared.publish(row, self.to_dict())
+
+    def record_rtt(self, rtt: float) -> None:
+        """Muestra de RTT (s) de un motor emisor del servidor."""
+        with self.lock:
+            self.rtt.record(int(rtt * 1_000_000))
+
+    def to_dict(self) -> dict[str, int]:
+        """Contadores sin el lock ni el histograma (para enviarlos entre procesos)."""
+        return {name: getattr(self, name) for name in COUNTERS}
+
+    def rtt_summary(self) -> dict[str, int]:
+        """Percentiles del RTT en microsegundos."""
+        with self.lock:
+            return {
+                'rtt_samples': self.rtt.count,
+                'rtt_sum_us': self.rtt.total,
+                'rtt_p50_us': self.rtt.percentile(50),
+                'rtt_p90_us': self.rtt.percentile(90),
+                'rtt_p99_us': self.rtt.percentile(99),
+                'rtt_max_us': self.rtt.max,
+            }
+
+    @classmethod
+    def from_dict(cls, counters: dict[str, int]) -> 'ServerMetrics':
+        return cls(**counters)
+
+    def merge(self, other: 'ServerMetrics') -> 'ServerMetrics':
+        """Suma los contadores de otro worker sobre estos."""
+        self.add(**other.to_dict())
+        return self
+
+    def summary(self) -> str:
+        return "\n".join([
+            "========== Resumen del servidor ==========",
+            f"Workers: {self.workers}",
+            f"Uploads completos: {self.uploads}",
+            f"Downloads completos: {self.downloads}",
+            f"Errores enviados: {self.errors}",
+            f"Sesiones vencidas: {self.expired}",
+            f"Bytes recibidos: {self.bytes_in}",
+            f"Bytes enviados: {self.bytes_out}",
+            f"Retransmisiones: {self.retransmissions}",
+            f"Paridad FEC enviada: {self.parity_sent}",
+            f"Recuperados por FEC: {self.fec_recovered}",
+            f"Compresion: {self.zip_raw_bytes} -> {self.zip_wire_bytes} bytes",
+        ])
+
+# Campos de ServerMetrics que se envian entre procesos y se suman entre workers
+COUNTERS = tuple(f.name for f in fields(ServerMetrics) if f.name not in ('rtt', 'lock', 'shared', 'row'))
+
+class SharedCounters:
+    """
+    Contadores de todos los workers en memoria compartida: una fila por worker, que solo escribe
+    ese worker, y la suma de las filas es la vista del servidor entero. Se crea en el padre antes
+    de levantar los workers.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.table = multiprocessing.Array('q', workers * len(COUNTERS))
+
+    def publish(self, row: int, counters: dict[str, int]) -> None:
+        base = row * len(COUNTERS)
+        with self.table.get_lock():
+            self.table[base:base + len(COUNTERS)] = [counters[name] for name in COUNTERS]
+
+    def total(self) -> dict[str, int]:
+        with self.table.get_lock():
+            values = self.table[:]
+        return {name: sum(values[i::len(COUNTERS)]) for i, name in enumerate(COUNTERS)}
+
+# Metricas que no son contadores acumulados (valor actual)
+_GAUGES = ('workers', 'active_sessions', 'queue_depth', 'queue_depth_max', 'cache_bytes')
+_QUANTILES = (('0.5', 'rtt_p50_us'), ('0.9', 'rtt_p90_us'), ('0.99', 'rtt_p99_us'), ('1', 'rtt_max_us'))
+
+def to_prometheus(stats: dict[str, int], prefix: str = 'amcgf') -> str:
+    """Snapshot de Server.stats en el formato de texto de Prometheus (el RTT como summary en segundos)."""
+
+    lines = []
+    for name, value in stats.items():
+        if name.startswith('rtt_'):
+            continue
+
+        if name in _GAUGES:
+            lines += [f"# TYPE {prefix}_{name} gauge", f"{prefix}_{name} {value}"]
+        else:
+            lines += [f"# TYPE {prefix}_{name}_total counter", f"{prefix}_{name}_total {value}"]
+
+    if 'rtt_samples' in stats:
+        lines.append(f"# TYPE {prefix}_rtt_seconds summary")
+        lines += [f'{prefix}_rtt_seconds{{quantile="{q}"}} {stats[key] / 1e6:.6f}' for q, key in _QUANTILES]
+        lines += [f"{prefix}_rtt_seconds_sum {stats['rtt_sum_us'] / 1e6:.6f}", f"{prefix}_rtt_seconds_count {stats['rtt_samples']}"]
+
+    return "\n".join(lines) + "\n"
+
+@dataclass
+class MetricsExporter:
+    """
+    Escribe cada `interval` segundos el snapshot de `snapshot()` en formato Prometheus a `path`
+    (por ejemplo para el textfile collector de node_exporter). Se escribe a un temporal y se
+    renombra, asi quien lee nunca ve un archivo a medias.
+    """
+
+    path: str
+    snapshot: Callable[[], dict[str, int]]
+    interval: float = METRICS_INTERVAL
+
+    def write(self) -> None:
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            f.write(to_prometheus(self.snapshot()))
+        os.replace(tmp, self.path)
+
+    def start(self) -> threading.Thread:
+        def run():
+            while True:
+                self.write()
+                time.sleep(self.interval)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
@@ -1,5 +1,5 @@
 """
-File Transfer / Go-Back-N / Stop-and-Wait (AMCGF) Header
+File Transfer / Go-Back-N / Stop-and-Wait / Selective Repeat (AMCGF) Header
 
     0               1             2               3
     0 1 2 3 4 5 6 7 0 1 2 3 4 5 6 7 0 1 2 3 4 5 6 7 0 1 2 3 4 5 6 7 
@@ -21,6 +21,8 @@ import struct
 from dataclasses import dataclass
 from enum import IntEnum
 
+from lib.checksum import checksum_update, inet_checksum
+
 # Definicion de constantes y enum
 
 # Header nuevo (16 bytes):
@@ -29,27 +31,95 @@ from enum import IntEnum
 HDR_FMT  = "!BBHHHII"  # B=1, B=1, H=2, H=2, H=2, I=4, I=4  => 16 bytes
 HDR_SIZE = struct.calcsize(HDR_FMT)
 
-# Version del RDT (Stop-and-Wait o Go-Back-N)
+# Offsets de campos dentro del header (para parchear frames ya codificados o mirar el tipo sin decodificar)
+TYP_OFFSET = 0
+CK_OFFSET  = 6
+ACK_OFFSET = 8
+SEQ_OFFSET = 12
+
+# Version del RDT (Stop-and-Wait, Go-Back-N o Selective Repeat)
 VER_SW  = 1  # Stop-and-Wait
 VER_GBN = 2  # Go-Back-N
+VER_SR  = 3  # Selective Repeat
+VERSIONS = (VER_SW, VER_GBN, VER_SR)
 
-# MTU de payload (recomendado por el TP)
+# MTU de payload (recomendado por el TP). Es el valor por defecto: el REQUEST puede pedir otro
+# (clave `mss`) entre MSS_MIN y MSS_MAX y el OK confirma el acordado. MSS_MAX deja el frame mas
+# grande (un PARITY) dentro de un MTU Ethernet de 1500 con los headers IP/UDP
 MSS = 1024
-MTU = HDR_SIZE + MSS
+MSS_MIN = 256
+MSS_MAX = 1448
+
+# PARITY (FEC, ver lib/fec.py): seq = primer DATA del grupo; el payload lleva fila de paridad,
+# cantidad de DATA del grupo y cantidad de paridades, seguido de la unidad codificada
+# (2 bytes de largo/ultimo fragmento + payload). Es el unico frame que supera MSS de payload
+PARITY_HDR_FMT = "!BBB"
+PARITY_HDR_SIZE = struct.calcsize(PARITY_HDR_FMT)
+PARITY_OVERHEAD = PARITY_HDR_SIZE + 2
+FEC_MAX_GROUP = 128     # Tope de DATA por grupo (los coeficientes de Cauchy usan 0..255)
+FEC_MAX_PARITY = 16
+
+def frame_size(mss: int = MSS) -> int:
+    """Frame mas grande posible con ese MSS (un PARITY): tamaño de los buffers de recepcion."""
+
+    return HDR_SIZE + mss + PARITY_OVERHEAD
+
+MTU = frame_size(MSS_MAX)   # Alcanza para cualquier frame de cualquier MSS negociable
 
 # Flags de 16 bits
 # Se usa el bit mas alto (0x8000) como "ACK flag" (0x8000 = 1000 0000 0000 0000)
 FLAG_ACK = 0x8000
 # Flag MF (More Fragments)
 FLAG_MF  = 0x4000   
+# Flag RESUME en REQUEST_UPLOAD/REQUEST_DOWNLOAD: reanudar una transferencia cortada.
+# El OK indica en `offset` desde que byte (multiplo de MSS) continua el emisor
+FLAG_RESUME = 0x2000
+# Flag TLV en REQUEST/OK/ERR: el payload de control va en TLV binario (ver tlv_encode). Sin el flag
+# es el formato texto k=v de los peers viejos; el servidor contesta en el mismo formato del REQUEST
+FLAG_TLV = 0x0800
+
+# Bits de PAYLOAD_FEATURES_KEY: funciones opcionales que se negocian en el handshake. Las que llevan
+# parametros (FEC, compresion) los mandan en sus propias claves
+FEATURE_SACK = 0x01   # Bloques SACK en los ACK de Selective Repeat
+FEATURE_FEC  = 0x02   # PARITY por grupos (fec_group, fec_parity)
+FEATURE_ZIP  = 0x04   # DATA comprimidos (zip)
+
+# Flag ZIP en DATA: el payload va comprimido con el codec acordado en el handshake (clave `zip`).
+# Cada chunk se comprime por separado; uno que no achica viaja crudo, sin el flag
+FLAG_ZIP = 0x1000
 
 # Convencion: ack == 0 => no hay ACK piggyback
 ACK_NONE = 0
 
+# En un ACK de Selective Repeat el campo seq indica el paquete puntual confirmado (seq + 1);
+# seq == 0 => el ACK es solo acumulativo
+
+# SACK (Selective Repeat, se negocia con la clave `sack` en el REQUEST y el OK): el payload del ACK
+# lleva hasta SACK_MAX_BLOCKS bloques [start, end) de seqs ya recibidos por encima del acumulado,
+# cada uno como dos enteros de 32 bits en big-endian. Payload vacio => sin bloques
+SACK_BLOCK_FMT = "!II"
+SACK_BLOCK_SIZE = struct.calcsize(SACK_BLOCK_FMT)
+SACK_MAX_BLOCKS = 16
+
 PAYLOAD_DATA_KEY = "chunk" # deprecado
 PAYLOAD_FILENAME_KEY = "filename" # deprecado
 PAYLOAD_ERR_MSG_KEY = "message" # deprecado
 PAYLOAD_FILE_SIZE_KEY = "file_size"  # deprecado
+PAYLOAD_OFFSET_KEY = "offset"
+PAYLOAD_MSS_KEY = "mss"                 # MSS pedido en el REQUEST / acordado en el OK (ausente = MSS)
+PAYLOAD_WINDOW_KEY = "window"           # Ventana en paquetes pedida / acordada (ausente = la del servidor)
+PAYLOAD_FEATURES_KEY = "features"       # Mapa de bits FEATURE_* ofrecido en el REQUEST / aceptado en el OK
+PAYLOAD_FEC_GROUP_KEY = "fec_group"     # FEC: DATA por grupo (lo propone el cliente, el OK confirma lo aceptado)
+PAYLOAD_FEC_PARITY_KEY = "fec_parity"   # FEC: PARITY por grupo
+PAYLOAD_ZIP_KEY = "zip"                 # Compresion: codecs ofrecidos en el REQUEST ("lz4,zlib"), el elegido en el OK
+
+# Transferencia en varios streams: cada stream es una sesion propia que mueve un rango de bytes.
+# El server divide el archivo con el MSS acordado y el OK de cada stream indica su rango [offset, range_end).
+# Los seq son absolutos (seq * MSS = offset en el archivo) y el ultimo chunk de cada rango va sin MF
+PAYLOAD_TRANSFER_ID_KEY = "transfer_id"
+PAYLOAD_STREAM_KEY = "stream"
+PAYLOAD_STREAMS_KEY = "streams"
+PAYLOAD_RANGE_END_KEY = "range_end"
 
 class MsgType(IntEnum):
     REQUEST_UPLOAD   = 0
@@ -59,117 +129,133 @@ class MsgType(IntEnum):
     DATA             = 4 
     ACK              = 5
     BYE              = 6 
+    PARITY           = 7
+    STATS            = 8   # Pedido de contadores del servidor; la respuesta va con FLAG_ACK
 
 class ProtoError(Exception): ...
 class BadChecksum(ProtoError): ...
 class Truncated(ProtoError): ...
 class FrameTooBig(ProtoError): ...
+class UnknownType(ProtoError): ...
+
+# Checksum estilo Internet sobre header (con checksum en 0) + payload: ver lib/checksum.py
+
+def patch_ack_seq(frame: bytearray, ack: int | None = None, seq: int | None = None) -> None:
+    """
+    Reescribe ack y/o seq de un frame ya codificado y ajusta el checksum en forma incremental
+    (RFC 1624), sin volver a sumar el payload. No modifica los flags.
+    """
+
+    ck = struct.unpack_from("!H", frame, CK_OFFSET)[0]
+    for offset, value in ((ACK_OFFSET, ack), (SEQ_OFFSET, seq)):
+        if value is None:
+            continue
+        old = struct.unpack_from("!I", frame, offset)[0]
+        struct.pack_into("!I", frame, offset, value)
+        ck = checksum_update(ck, old, value)
+    struct.pack_into("!H", frame, CK_OFFSET, ck)
+
+class DatagramView:
+    """
+    Vista liviana de un frame recibido: header ya parseado y payload como memoryview
+    sobre el buffer de recepcion (sin copiar). Es valida mientras el buffer no se reutilice.
+    """
+
+    __slots__ = ("ver", "typ", "flags", "ack", "seq", "payload")
+
+    def __init__(self, ver: int, typ: 'MsgType', flags: int, ack: int, seq: int, payload: memoryview):
+        self.ver = ver
+        self.typ = typ
+        self.flags = flags
+        self.ack = ack
+        self.seq = seq
+        self.payload = payload
+
+    def to_datagram(self) -> 'Datagram':
+        """Copia el payload y devuelve un Datagram independiente del buffer."""
+
+        return Datagram(ver=self.ver, typ=self.typ, ack=self.ack, seq=self.seq, payload=bytes(self.payload), flags=self.flags)
+
+def encode_into(buf: bytearray, offset: int, typ: int, ver: int, flags: int = 0, ack: int = 0, seq: int = 0, payload: bytes | memoryview = b"", mss: int = MSS) -> int:
+    """
+    Escribe un frame completo en buf[offset:] y devuelve su largo. El header se escribe con
+    pack_into (checksum en 0), se copia el payload y luego se parchea el checksum en su lugar.
+    El payload no puede superar el MSS acordado para la conexion.
+    """
+
+    length = len(payload)
+    limit = mss + PARITY_OVERHEAD if typ == MsgType.PARITY else mss
+    if length > limit:
+        raise FrameTooBig(f"DATA payload {length} > MSS {limit}")
+
+    # Encendido automatico del flag ACK si:
+    # - el tipo es ACK, o
+    # - hay piggyback (ack != 0)
+    if typ == MsgType.ACK or ack != 0:
+        flags |= FLAG_ACK
+
+    end = offset + HDR_SIZE + length
+    struct.pack_into(HDR_FMT, buf, offset, int(typ), ver, flags, length, 0, ack, seq)
+    buf[offset + HDR_SIZE:end] = payload
+
+    with memoryview(buf) as view:
+        ck = inet_checksum(view[offset:end])
+    struct.pack_into("!H", buf, offset + CK_OFFSET, ck)
+
+    return end - offset
+
+def decode_view(buf: bytes | bytearray | memoryview) -> DatagramView:
+    """Valida y parsea un frame sin copiar el payload."""
+
+    # Verificar largo minimo de header
+    if len(buf) < HDR_SIZE:
+        raise Truncated(f"{len(buf)} < HDR_SIZE {HDR_SIZE}")
+
+    typ, ver, flags, length, _, ack, seq = struct.unpack_from(HDR_FMT, buf)
+
+    end = HDR_SIZE + length
+    if len(buf) < end:
+        raise Truncated(f"payload {len(buf) - HDR_SIZE} != {length}")
+
+    # Sumando el frame completo (checksum incluido) un frame valido da 0
+    frame = memoryview(buf)[:end]
+    if inet_checksum(frame) != 0:
+        raise BadChecksum("checksum mismatch")
+
+    try:
+        typ = MsgType(typ)
+    except ValueError as e:
+        raise UnknownType(f"tipo de mensaje {typ}") from e
 
-# Checksum estilo Internet sobre header (con checksum en 0) + payload
-def inet_checksum(data: bytes) -> int:
-    # Si el largo es impar, agregar un byte 0
-    if len(data) % 2:
-        data += b"\x00"
-    s = 0
-    for i in range(0, len(data), 2):
-        s += (data[i] << 8) | data[i + 1]
-        s = (s & 0xFFFF) + (s >> 16)
-    return (~s) & 0xFFFF
-
-@dataclass
+    return DatagramView(ver, typ, flags, ack, seq, frame[HDR_SIZE:])
+
+@dataclass(slots=True)
 class Datagram:
-    ver: int                  # VER_SW o VER_GBN
+    ver: int                  # VER_SW, VER_GBN o VER_SR
     typ: MsgType              # Tipo de mensaje
     ack: int = 0              # Numero de ACK (piggyback o para MsgType.ACK)
     seq: int = 0              # Numero de secuencia para DATA
     payload: bytes = b""      # Datos
     flags: int = 0            # Flags de 16 bits (FLAG_ACK si corresponde)
 
-    def encode(self) -> bytes:
-        if len(self.payload) > MSS:
-            raise FrameTooBig(f"DATA payload {len(self.payload)} > MSS {MSS}")
-
-        # Encendido automatico del flag ACK si:
-        # - el tipo es ACK, o
-        # - hay piggyback (ack != 0)
-        flags = self.flags
-        if self.typ == MsgType.ACK or self.ack != 0:
-            flags |= FLAG_ACK
-
-        # Encendido automatico del flag MF si:
-        # - el tipo es DATA, y
-        # - el flag ya viene seteado en self.flags
-        if (self.typ == MsgType.DATA or self.typ == MsgType.REQUEST_DOWNLOAD or self.typ == MsgType.REQUEST_UPLOAD) and (self.flags & FLAG_MF):
-            flags |= FLAG_MF
-
-        # Header con checksum en 0 para calcularlo
-        header_wo_ck = struct.pack(
-            HDR_FMT,
-            int(self.typ),          # TYPE
-            self.ver,               # VER
-            flags,                  # FLAGS
-            len(self.payload),      # LEN
-            0,                      # CHECKSUM (0 para el calculo)
-            self.ack,               # ACKNUM
-            self.seq,               # SEQNUM
-        )
-        
-        ck = inet_checksum(header_wo_ck + self.payload)
-
-        # Header final con checksum real
-        header = struct.pack(
-            HDR_FMT,
-            int(self.typ),
-            self.ver,
-            flags,
-            len(self.payload),
-            ck,
-            self.ack,
-            self.seq,
-        )
+    def encode_into(self, buf: bytearray, offset: int = 0, mss: int = MSS) -> int:
+        """Codifica el datagrama en un buffer del llamador y devuelve el largo del frame."""
 
-        return header + self.payload
+        return encode_into(buf, offset, self.typ, self.ver, self.flags, self.ack, self.seq, self.payload, mss)
 
-    @staticmethod
-    def decode(buf: bytes) -> 'Datagram':
-        # Verificar largo minimo de header
-        if len(buf) < HDR_SIZE:
-            raise Truncated(f"{len(buf)} < HDR_SIZE {HDR_SIZE}")
-
-        typ, ver, flags, length, ck, ack, seq = struct.unpack(HDR_FMT, buf[:HDR_SIZE])
-
-        # Extraer payload
-        payload = buf[HDR_SIZE:HDR_SIZE + length]
-        if len(payload) != length:
-            raise Truncated(f"payload {len(payload)} != {length}")
-
-        # Recalcular checksum con campo en 0
-        header_zero = struct.pack(
-            HDR_FMT,
-            typ,
-            ver,
-            flags,
-            length,
-            0,      # checksum cero para validar
-            ack,
-            seq,
-        )
+    def encode(self, mss: int = MSS) -> bytes:
+        buf = bytearray(HDR_SIZE + len(self.payload))
+        self.encode_into(buf, mss=mss)
 
-        if inet_checksum(header_zero + payload) != ck:
-            raise BadChecksum("checksum mismatch")
+        return bytes(buf)
 
-        return Datagram(
-            ver=ver,
-            typ=MsgType(typ),
-            ack=ack,
-            seq=seq,
-            payload=payload,
-            flags=flags,
-        )
+    @staticmethod
+    def decode(buf: bytes) -> 'Datagram':
+        return decode_view(buf).to_datagram()
 
     def __str__(self) -> str:
         # Traduccion de version a nombre
-        ver_name = "SW" if self.ver == VER_SW else "GBN" if self.ver == VER_GBN else str(self.ver)
+        ver_name = {VER_SW: "SW", VER_GBN: "GBN", VER_SR: "SR"}.get(self.ver, str(self.ver))
 
         # Decodificacion de flags
         flags_list = []
@@ -177,6 +263,12 @@ class Datagram:
             flags_list.append("ACK")
         if self.flags & FLAG_MF:
             flags_list.append("MF")
+        if self.flags & FLAG_RESUME:
+            flags_list.append("RESUME")
+        if self.flags & FLAG_ZIP:
+            flags_list.append("ZIP")
+        if self.flags & FLAG_TLV:
+            flags_list.append("TLV")
         flags_str = "[" + ", ".join(flags_list) + "]" if flags_list else "[]"
 
         # Longitud del payload
@@ -266,39 +358,175 @@ def payload_decode(b: bytes) -> dict:
         out[k.strip()] = _decode_value(k.strip(), v.strip())
     return out
 
+# Payload de control en TLV: por campo, tipo (1 byte) + largo del valor (2 bytes) + valor. Cada
+# clave tiene un tipo fijo; los enteros van sin signo en big-endian con los bytes justos y los
+# textos en UTF-8. Un tipo desconocido se saltea (lo puede agregar una version nueva)
+TLV_HDR_FMT = "!BH"
+TLV_HDR_SIZE = struct.calcsize(TLV_HDR_FMT)
+TLV_FIELDS = {
+    PAYLOAD_FILENAME_KEY: (1, str),
+    PAYLOAD_FILE_SIZE_KEY: (2, int),
+    PAYLOAD_ERR_MSG_KEY: (3, str),
+    PAYLOAD_OFFSET_KEY: (4, int),
+    PAYLOAD_MSS_KEY: (5, int),
+    PAYLOAD_WINDOW_KEY: (6, int),
+    PAYLOAD_FEATURES_KEY: (7, int),
+    PAYLOAD_FEC_GROUP_KEY: (8, int),
+    PAYLOAD_FEC_PARITY_KEY: (9, int),
+    PAYLOAD_ZIP_KEY: (10, str),
+    PAYLOAD_TRANSFER_ID_KEY: (11, int),
+    PAYLOAD_STREAM_KEY: (12, int),
+    PAYLOAD_STREAMS_KEY: (13, int),
+    PAYLOAD_RANGE_END_KEY: (14, int),
+}
+_TLV_KEYS = {code: (key, kind) for key, (code, kind) in TLV_FIELDS.items()}
+
+def tlv_encode(d: dict) -> bytes:
+    out = bytearray()
+    for k, v in d.items():
+        if k not in TLV_FIELDS:
+            raise ValueError(f"Unsupported TLV field: {k}")
+
+        code, kind = TLV_FIELDS[k]
+        if kind is int:
+            value = int(v).to_bytes(max(1, (int(v).bit_length() + 7) // 8), 'big')
+        else:
+            value = str(v).encode('utf-8')
+
+        out += struct.pack(TLV_HDR_FMT, code, len(value)) + value
+    return bytes(out)
+
+def tlv_decode(b: bytes | memoryview) -> dict:
+    out = {}
+    pos = 0
+    while pos < len(b):
+        if pos + TLV_HDR_SIZE > len(b):
+            raise Truncated(f"TLV header at {pos}")
+
+        code, length = struct.unpack_from(TLV_HDR_FMT, b, pos)
+        pos += TLV_HDR_SIZE
+        if pos + length > len(b):
+            raise Truncated(f"TLV value {code} of {length} bytes")
+
+        value = bytes(b[pos:pos + length])
+        pos += length
+
+        if code in _TLV_KEYS:
+            key, kind = _TLV_KEYS[code]
+            out[key] = int.from_bytes(value, 'big') if kind is int else value.decode('utf-8')
+    return out
+
+def control_decode(datagram: 'Datagram | DatagramView') -> dict:
+    """Campos del payload de un REQUEST/OK/ERR, en TLV o en el formato texto segun FLAG_TLV."""
+
+    if datagram.flags & FLAG_TLV:
+        return tlv_decode(datagram.payload)
+    return payload_decode(bytes(datagram.payload))
+
+def _control(ver: int, typ: MsgType, fields: dict, tlv: bool, flags: int = 0, ack: int = ACK_NONE) -> Datagram:
+    if tlv and fields:
+        return Datagram(ver, typ, ack=ack, payload=tlv_encode(fields), flags=flags | FLAG_TLV)
+    return Datagram(ver, typ, ack=ack, payload=payload_encode(fields), flags=flags)
+
 # -------------------- API --------------------
 
-def make_req_upload(filename: str, ver: int, data_size: int) -> Datagram:
-    """Crea un datagrama de solicitud de subida de archivo."""
+def split_ranges(size: int, streams: int, chunk_size: int = MSS) -> list[tuple[int, int]]:
+    """Divide [0, size) en hasta `streams` rangos contiguos alineados a chunk (nunca vacios salvo size == 0)."""
 
-    return Datagram(ver, MsgType.REQUEST_UPLOAD, payload=payload_encode({PAYLOAD_FILENAME_KEY: filename, PAYLOAD_FILE_SIZE_KEY: data_size}))
+    chunks = max(1, -(-size // chunk_size))
+    streams = max(1, min(streams, chunks))
+    bounds = [chunks * i // streams for i in range(streams + 1)]
 
-def make_req_download(filename: str, ver: int) -> Datagram:
-    """Crea un datagrama de solicitud de descarga de archivo."""
+    return [(bounds[i] * chunk_size, min(bounds[i + 1] * chunk_size, size)) for i in range(streams)]
 
-    return Datagram(ver, MsgType.REQUEST_DOWNLOAD, payload=payload_encode({PAYLOAD_FILENAME_KEY: filename}))
+def chunk_span(start: int, end: int, chunk_size: int = MSS) -> tuple[int, int]:
+    """Seqs [primero, ultimo + 1) que cubren el rango de bytes [start, end) (al menos uno)."""
 
-def make_ok(extra: dict | None = None, ver: int = VER_SW, ack: int = ACK_NONE) -> Datagram:
+    first = start // chunk_size
+    return first, max(-(-end // chunk_size), first + 1)
+
+def make_req_upload(filename: str, ver: int, data_size: int, resume: bool = False, extra: dict | None = None, tlv: bool = True) -> Datagram:
+    """Crea un datagrama de solicitud de subida de archivo (con resume, el server elige el offset)."""
+
+    flags = FLAG_RESUME if resume else 0
+    payload = {PAYLOAD_FILENAME_KEY: filename, PAYLOAD_FILE_SIZE_KEY: data_size, **(extra or {})}
+    return _control(ver, MsgType.REQUEST_UPLOAD, payload, tlv, flags)
+
+def make_req_download(filename: str, ver: int, offset: int | None = None, data_size: int | None = None, extra: dict | None = None, tlv: bool = True) -> Datagram:
+    """Crea un datagrama de solicitud de descarga de archivo; con offset pide reanudar desde ahi."""
+
+    payload = {PAYLOAD_FILENAME_KEY: filename, **(extra or {})}
+    if offset is None:
+        return _control(ver, MsgType.REQUEST_DOWNLOAD, payload, tlv)
+
+    payload.update({PAYLOAD_OFFSET_KEY: offset, PAYLOAD_FILE_SIZE_KEY: data_size})
+    return _control(ver, MsgType.REQUEST_DOWNLOAD, payload, tlv, FLAG_RESUME)
+
+def make_ok(extra: dict | None = None, ver: int = VER_SW, ack: int = ACK_NONE, tlv: bool = True) -> Datagram:
     """Crea un datagrama de OK, con campos extra opcionales en el payload."""
     
-    return Datagram(ver, MsgType.OK, ack=ack, payload=payload_encode(extra or {}))
+    return _control(ver, MsgType.OK, extra or {}, tlv, ack=ack)
 
-def make_err(msg: str, ver: int = VER_SW, ack: int = ACK_NONE) -> Datagram:
+def make_err(msg: str, ver: int = VER_SW, ack: int = ACK_NONE, tlv: bool = True) -> Datagram:
     """Crea un datagrama de error con mensaje."""
     
-    return Datagram(ver, MsgType.ERR, ack=ack, payload=payload_encode({PAYLOAD_ERR_MSG_KEY: msg}))
+    return _control(ver, MsgType.ERR, {PAYLOAD_ERR_MSG_KEY: msg}, tlv, ack=ack)
 
-def make_data(seq: int, chunk: bytes, ver: int, ack: int = ACK_NONE, mf: bool = False) -> Datagram:
+def make_data(seq: int, chunk: bytes, ver: int, ack: int = ACK_NONE, mf: bool = False, zipped: bool = False) -> Datagram:
     """Crea un datagrama de datos con numero de secuencia y payload."""
     
-    return Datagram(ver, MsgType.DATA, ack=ack, seq=seq, payload=chunk, flags=FLAG_MF if mf else 0)
+    flags = (FLAG_MF if mf else 0) | (FLAG_ZIP if zipped else 0)
+    return Datagram(ver, MsgType.DATA, ack=ack, seq=seq, payload=chunk, flags=flags)
+
+def make_ack(acknum: int, ver: int, seq: int = 0, sack: list[tuple[int, int]] | None = None) -> Datagram:
+    """Crea un datagrama de ACK con numero de ACK (y opcionalmente el paquete puntual confirmado y bloques SACK)."""
 
-def make_ack(acknum: int, ver: int) -> Datagram:
-    """Crea un datagrama de ACK con numero de ACK."""
+    return Datagram(ver, MsgType.ACK, ack=acknum, seq=seq, payload=sack_encode(sack) if sack else b"")
 
-    return Datagram(ver, MsgType.ACK, ack=acknum)
+def sack_blocks(seqs) -> list[tuple[int, int]]:
+    """Agrupa seqs recibidos en bloques contiguos [start, end), de menor a mayor, hasta SACK_MAX_BLOCKS."""
+
+    blocks = []
+    for seq in sorted(seqs):
+        if blocks and blocks[-1][1] == seq:
+            blocks[-1][1] = seq + 1
+        elif len(blocks) == SACK_MAX_BLOCKS:
+            break
+        else:
+            blocks.append([seq, seq + 1])
+
+    return [(start, end) for start, end in blocks]
+
+def sack_encode(blocks: list[tuple[int, int]]) -> bytes:
+    return b"".join(struct.pack(SACK_BLOCK_FMT, start, end) for start, end in blocks[:SACK_MAX_BLOCKS])
+
+def sack_decode(payload: bytes | memoryview) -> list[tuple[int, int]]:
+    """Bloques SACK de un ACK (los bytes sobrantes o bloques vacios se ignoran)."""
+
+    count = min(len(payload) // SACK_BLOCK_SIZE, SACK_MAX_BLOCKS)
+    blocks = (struct.unpack_from(SACK_BLOCK_FMT, payload, i * SACK_BLOCK_SIZE) for i in range(count))
+
+    return [(start, end) for start, end in blocks if start < end]
+
+def make_parity(seq: int, ver: int, index: int, members: int, parities: int, coded: bytes) -> Datagram:
+    """Crea un datagrama de paridad FEC para el grupo que empieza en `seq`."""
+
+    return Datagram(ver, MsgType.PARITY, seq=seq, payload=struct.pack(PARITY_HDR_FMT, index, members, parities) + coded)
+
+def parse_parity(datagram: Datagram) -> tuple[int, int, int, bytes]:
+    """(fila, cantidad de DATA del grupo, cantidad de paridades, unidad codificada) de un PARITY."""
+
+    index, members, parities = struct.unpack_from(PARITY_HDR_FMT, datagram.payload)
+    return index, members, parities, bytes(datagram.payload[PARITY_HDR_SIZE:])
 
 def make_bye(ver: int) -> Datagram:
     """Crea un datagrama de BYE para finalizar la conexion."""
     
     return Datagram(ver, MsgType.BYE)
+
+def make_stats(ver: int = VER_SW, stats: dict | None = None) -> Datagram:
+    """Crea un pedido de STATS o, con `stats`, la respuesta con los contadores del servidor (formato texto k=v)."""
+
+    if stats is None:
+        return Datagram(ver, MsgType.STATS)
+    return Datagram(ver, MsgType.STATS, flags=FLAG_ACK, payload=payload_encode(stats))
@@ -0,0 +1,72 @@
+from dataclasses import dataclass
+
+from lib.config import *
+
+# Granularidad del reloj usada como piso de la varianza (RFC 6298, G)
+CLOCK_GRANULARITY = 0.001
+
+@dataclass
+class RttEstimator:
+    """
+    Estimador de RTO estilo Jacobson/Karels (RFC 6298):
+        RTTVAR = (1 - beta) * RTTVAR + beta * |SRTT - R|
+        SRTT   = (1 - alpha) * SRTT + alpha * R
+        RTO    = SRTT + max(G, K * RTTVAR)
+    Regla de Karn: el llamador no debe pasar muestras de paquetes retransmitidos.
+    Ante cada timeout el RTO se duplica hasta `max_rto`; cuando un ACK vuelve a mostrar avance
+    (aunque sea de un paquete retransmitido y no de muestra) se descarta el backoff.
+    """
+
+    rto: float = RTO
+    min_rto: float = RTO_MIN
+    max_rto: float = RTO_MAX
+    alpha: float = 1 / 8
+    beta: float = 1 / 4
+    k: int = 4
+    srtt: float | None = None
+    rttvar: float = 0.0
+    backoffs: int = 0
+
+    def __post_init__(self):
+        # RTO sin backoff mientras no haya muestras (con perdidas al arrancar, Karn puede no dar ninguna)
+        self.initial_rto = self.rto
+
+    def _clamp(self, rto: float) -> float:
+        return min(max(rto, self.min_rto), self.max_rto)
+
+    def _base_rto(self) -> float:
+        if self.srtt is None:
+            return self.initial_rto
+        return self._clamp(self.srtt + max(CLOCK_GRANULARITY, self.k * self.rttvar))
+
+    def sample(self, rtt: float) -> float:
+        """Incorpora una muestra de RTT (en segundos) de un paquete no retransmitido."""
+
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = (1 - self.beta) * self.rttvar + self.beta * abs(self.srtt - rtt)
+            self.srtt = (1 - self.alpha) * self.srtt + self.alpha * rtt
+
+        self.backoffs = 0
+        self.rto = self._base_rto()
+
+        return self.rto
+
+    def backoff(self) -> float:
+        """Timeout: backoff exponencial del RTO con tope."""
+
+        self.backoffs += 1
+        self.rto = self._clamp(self.rto * 2)
+
+        return self.rto
+
+    def reset_backoff(self) -> float:
+        """ACK con avance: vuelve al RTO calculado sin esperar una muestra valida."""
+
+        if self.backoffs:
+            self.rto = self._clamp(self._base_rto())
+            self.backoffs = 0
+
+        return self.rto
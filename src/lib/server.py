@@ -1,133 +1,453 @@
+import os
 import threading
+import time
 
 from typing import Tuple
 from queue import Empty, Queue
-from socket import AF_INET, SOCK_DGRAM, socket
+from socket import AF_INET, SO_REUSEPORT, SOCK_DGRAM, SOL_SOCKET, socket
 from dataclasses import dataclass, field
 
+from lib.batch_recv import BatchReceiver
+from lib.compression import pick_codec
 from lib.connection import Connection
 from lib.config import *
+from lib.metrics import MetricsExporter, ServerMetrics
+from lib.sw import StopAndWait
+from lib.transfer import Transfer
 from lib.protocolo_amcgf import *
-        
-# A futuro restar key de data
-CHUNK_SIZE = MSS
+
 DEFAULT_STORAGE_PATH = './storage_data'
 
+class SessionExpired(Exception):
+    """El peer de una sesion dejo de responder o la sesion supero su duracion maxima."""
+
+@dataclass
+class Lease:
+    """
+    Plazos de una sesion del servidor con hilos. Se controlan en cada recepcion de la cola: los
+    motores esperan de a un RTO, asi que un peer que desaparece corta cualquier bucle (envio,
+    flush, espera del BYE) a lo sumo un RTO despues de vencer.
+    """
+
+    idle_timeout: float = IDLE_TIMEOUT
+    max_time: float = MAX_TRANSFER_TIME
+    start: float = field(default_factory=time.time)
+
+    def __post_init__(self):
+        self.last_seen = self.start
+        self.expires = self.start + self.max_time if self.max_time else float('inf')
+
+    def check(self, received: bool) -> None:
+        now = time.time()
+        if received:
+            self.last_seen = now
+        elif now - self.last_seen >= self.idle_timeout:
+            raise SessionExpired(f"Sin datagramas del peer durante {self.idle_timeout:g} s")
+
+        if now >= self.expires:
+            raise SessionExpired(f"La sesion supero los {self.max_time:g} s")
+
 @dataclass
 class Server(Connection):
-    queues: dict = field(default_factory=dict)
+    queues: dict = field(default_factory=dict)   # addr -> cola del hilo del cliente (o sesion en EventServer)
+    reuse_port: bool = False                     # Varios workers comparten el puerto (SO_REUSEPORT)
+    metrics: ServerMetrics = field(default_factory=ServerMetrics)
+    transfers: dict = field(default_factory=dict)   # (host, transfer_id) -> Transfer de un upload en varios streams
+    transfers_lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    mss: int = MSS_MAX                           # Tope del MSS que se acepta en el handshake
+    metrics_file: str | None = None              # Archivo donde se exportan las metricas en formato Prometheus
+    metrics_interval: float = METRICS_INTERVAL
+    idle_timeout: float = IDLE_TIMEOUT           # Sesion sin datagramas del peer durante este tiempo => se corta
+    max_transfer_time: float = MAX_TRANSFER_TIME # Duracion maxima de una sesion (0 = sin tope)
 
     @staticmethod
-    def _queue_recv_fn(timeout: float, queue: Queue) -> bytes | None:
+    def _queue_recv_fn(timeout: float, queue: Queue, lease: Lease | None = None) -> bytes | None:
         try:
-            return queue.get(timeout=timeout)
+            data = queue.get(timeout=timeout)
         except Empty:
-            return None
+            data = None
+
+        if lease:
+            lease.check(data is not None)
+        return data
+
+    def _make_server_socket(self) -> socket:
+        """Socket de escucha. Con reuse_port el kernel reparte los clientes entre los workers
+        por hash de la 4-upla, asi que cada cliente queda siempre en el mismo proceso."""
 
-    def run(self):
         sock = socket(AF_INET, SOCK_DGRAM)
+        if self.reuse_port:
+            sock.setsockopt(SOL_SOCKET, SO_REUSEPORT, 1)
         sock.bind((self.host, self.port))
 
+        return sock
+
+    def run(self):
+        sock = self._make_server_socket()
+
+        receiver = BatchReceiver(sock)
+
         print(f"Server listening at {self.host}:{self.port}")
+        self._start_exporter()
 
         while True:
-            data, addr = sock.recvfrom(MTU)
+            self._demux(sock, receiver.recv_batch())
+
+    def _demux(self, sock: socket, batch: list[tuple[bytes, tuple[str, int]]]) -> None:
+        """Reparte un lote de datagramas entre las colas de los clientes (abre un hilo por cliente nuevo)."""
+
+        queues = self.queues
+        for data, addr in batch:
             if len(data) < HDR_SIZE:
                 continue 
 
-            if addr not in self.queues:
+            queue = queues.get(addr)
+            if queue is None:
+                if self._answer_stats(sock, addr, data):
+                    continue
+
                 queue = Queue()
-                self.queues[addr] = queue
+                queues[addr] = queue
 
                 threading.Thread(target=self.process_client, args=(addr, sock, queue), daemon=True).start()
-            else:
-                queue = self.queues[addr]
 
             queue.put(data)
 
+    def _queue_depths(self) -> list[int]:
+        """Datagramas esperando en la cola de cada cliente."""
+
+        return [queue.qsize() for queue in list(self.queues.values())]
+
+    def stats(self) -> dict[str, int]:
+        """
+        Snapshot de las metricas del servidor: contadores, sesiones activas, colas y percentiles de RTT.
+        Con varios workers los contadores son la suma de todos; sesiones, colas, RTT y cache son los de este worker.
+        """
+
+        depths = self._queue_depths()
+        return {
+            **(self.metrics.shared.total() if self.metrics.shared else self.metrics.to_dict()),
+            'active_sessions': len(self.queues),
+            'queue_depth': sum(depths),
+            'queue_depth_max': max(depths, default=0),
+            **self.metrics.rtt_summary(),
+            **(self.file_handler.cache.counters() if self.file_handler and self.file_handler.cache else {}),
+        }
+
+    def _answer_stats(self, sock: socket, addr: tuple[str, int], data: bytes) -> bool:
+        """Contesta un pedido de STATS de un cliente sin sesion. True si el datagrama era un STATS."""
+
+        if data[TYP_OFFSET] != MsgType.STATS:
+            return False
+
+        try:
+            datagram = Datagram.decode(buf=data)
+        except ProtoError:
+            return True
+
+        if not datagram.flags & FLAG_ACK:
+            sock.sendto(make_stats(datagram.ver, self.stats()).encode(), addr)
+        return True
+
+    def _start_exporter(self) -> None:
+        if self.metrics_file:
+            MetricsExporter(self.metrics_file, self.stats, self.metrics_interval).start()
+
+    def _send_err(self, sock: socket, addr: tuple[str, int], message: str, tlv: bool = False) -> None:
+        encoded = make_err(message, tlv=tlv).encode()
+
+        sock.sendto(encoded, addr)
+        self.metrics.add(errors=1)
+
+    def _check_request(self, datagram: Datagram) -> str | None:
+        """Valida un REQUEST_UPLOAD/REQUEST_DOWNLOAD. Devuelve el mensaje de error o None si es valido."""
+
+        if datagram.ver not in VERSIONS:
+            return f"Error: Version de protocolo {datagram.ver} no soportada"
+
+        # Un payload truncado o con campos faltantes o de otro tipo se contesta con ERR: no puede tirar al servidor
+        try:
+            return self._check_fields(datagram.typ, control_decode(datagram))
+        except (ProtoError, UnicodeDecodeError, KeyError, TypeError) as e:
+            return f"Error: REQUEST mal formado ({e})"
+
+    def _check_fields(self, typ: MsgType, payload: dict) -> str | None:
+        for key, (_, kind) in TLV_FIELDS.items():
+            if key in payload and not isinstance(payload[key], kind):
+                raise TypeError(f"el campo '{key}' no es {kind.__name__}")
+
+        filename = payload[PAYLOAD_FILENAME_KEY]
+        streams = payload.get(PAYLOAD_STREAMS_KEY, 1)
+        mss = self._negotiate_mss(payload)
+        if not 1 <= streams <= MAX_STREAMS:
+            return f"Error: Cantidad de streams invalida (maximo {MAX_STREAMS})"
+
+        if typ == MsgType.REQUEST_UPLOAD:
+            size = payload[PAYLOAD_FILE_SIZE_KEY]
+            if size > MAX_FILE_SIZE:
+                return f"Error: Tamaño máximo de archivo permitido de {MAX_FILE_SIZE} bytes"
+
+            ranges = split_ranges(size, streams, mss)
+            if not 0 <= payload.get(PAYLOAD_STREAM_KEY, 0) < len(ranges):
+                return f"Error: El archivo se divide en {len(ranges)} streams"
+
+            # Cada stream puede caer en otro worker y el archivo se arma en la memoria de un proceso
+            if len(ranges) > 1 and self.reuse_port:
+                return "Error: Un servidor con varios workers no acepta uploads en varios streams"
+
+        elif typ == MsgType.REQUEST_DOWNLOAD:
+            if not self.file_handler.is_filename_used(filename):
+                return f"Error: Archivo '{filename}' no existe"
+
+            ranges = split_ranges(self.file_handler.file_size(filename), streams, mss)
+            if not 0 <= payload.get(PAYLOAD_STREAM_KEY, 0) < len(ranges):
+                return f"Error: El archivo '{filename}' se divide en {len(ranges)} streams"
+
+        return None
+
     def process_client(self, addr: tuple[str, int], sock: socket, queue: Queue):
+        try:
+            self._serve_client(addr, sock, queue)
+        except SessionExpired as e:
+            self.metrics.add(expired=1)
+            if self.logger:
+                self.logger.log(f"[INFO] - Sesion de {addr[0]}:{addr[1]} cortada: {e}")
+        finally:
+            # Por cualquier camino (fin normal, error, vencimiento) el cliente deja de tener cola
+            self.queues.pop(addr, None)
+
+    def _serve_client(self, addr: tuple[str, int], sock: socket, queue: Queue):
         data = queue.get(block=True)
         
         try:
             datagram = Datagram.decode(buf=data)
         except Exception:
-            try:
-                encoded = make_err("Error: Error al decodificar datagrama").encode()
-            except Exception:
-                raise
+            self._send_err(sock, addr, "Error: Error al decodificar datagrama")
+            return
 
-            sock.sendto(encoded, addr)
+        if datagram.typ not in (MsgType.REQUEST_UPLOAD, MsgType.REQUEST_DOWNLOAD):
             return
             
-        self.protocol = datagram.ver
+        # Se contesta en el mismo formato de payload que el REQUEST
+        tlv = bool(datagram.flags & FLAG_TLV)
+        error = self._check_request(datagram)
+        if error:
+            self._send_err(sock, addr, error, tlv)
+            return
+
+        # La version se pasa explicitamente: el Server es compartido entre hilos de distintos clientes
+        ver = datagram.ver
+        payload = control_decode(datagram)
+        filename = payload.get(PAYLOAD_FILENAME_KEY)
+
+        features = self._accept_features(ver, payload)
+        mss = features[PAYLOAD_MSS_KEY]
+        lease = Lease(self.idle_timeout, self.max_transfer_time)
 
         if datagram.typ == MsgType.REQUEST_UPLOAD:
-            payload = payload_decode(datagram.payload)
-            
-            filename = payload[PAYLOAD_FILENAME_KEY]
-            file_size = payload[PAYLOAD_FILE_SIZE_KEY]
-
-            if file_size > MAX_FILE_SIZE:
-                try:
-                    encoded = make_err(f"Error: Tamaño máximo de archivo permitido de {MAX_FILE_SIZE} bytes").encode()
-                except Exception:
-                    raise
-                
-                sock.sendto(encoded, addr)
-                return
-            
-            self.handle_upload(sock=sock, addr=addr, filename=filename, queue=queue)
+            transfer = self._open_transfer(addr, datagram, payload, mss)
+            start, end = self._upload_range(transfer, payload, mss)
+            self.handle_upload(sock=sock, addr=addr, filename=filename, queue=queue, ver=ver, transfer=transfer, start=start, end=end, features=features, tlv=tlv, lease=lease)
 
         elif datagram.typ == MsgType.REQUEST_DOWNLOAD:
-            payload = payload_decode(datagram.payload)
-            
-            filename = payload[PAYLOAD_FILENAME_KEY]
+            start, end, streams = self._download_range(datagram, filename, payload, mss)
+            self.handle_download(sock=sock, addr=addr, filename=filename, queue=queue, ver=ver, start=start, end=end, streams=streams, features=features, tlv=tlv, lease=lease)
 
-            if not self.file_handler.is_filename_used(filename):
-                try:
-                    encoded = make_err(f"Error: Archivo '{filename}' no existe").encode()
-                except Exception:
-                    raise
-                
-                sock.sendto(encoded, addr)
-                return
-            
-            self.handle_download(sock=sock, addr=addr, filename=filename, queue=queue)
+    def _negotiate_mss(self, payload: dict) -> int:
+        """MSS de la conexion: el pedido, acotado al tope del servidor; un cliente que no lo pide usa MSS."""
+
+        if PAYLOAD_MSS_KEY not in payload:
+            return MSS
+        return max(MSS_MIN, min(payload[PAYLOAD_MSS_KEY], self.mss, MSS_MAX))
+
+    def _accept_features(self, ver: int, payload: dict) -> dict:
+        """
+        Valores y opciones del REQUEST que acepta el servidor, con los campos que los confirman en el OK.
+        MSS y ventana se acotan a los topes del servidor. SACK solo con SR (y si esta habilitado); FEC solo
+        con ventana, acotado a los topes del protocolo; compresion con el primer codec ofrecido que se soporte.
+        """
+
+        offered = payload.get(PAYLOAD_FEATURES_KEY, 0)
+        window = max(1, min(payload.get(PAYLOAD_WINDOW_KEY, self.window), self.window))
+        features = {PAYLOAD_MSS_KEY: self._negotiate_mss(payload), PAYLOAD_WINDOW_KEY: window}
+
+        accepted = 0
+        if self.sack and ver == VER_SR and offered & FEATURE_SACK:
+            accepted |= FEATURE_SACK
+
+        group = min(payload.get(PAYLOAD_FEC_GROUP_KEY, 0), FEC_MAX_GROUP)
+        if offered & FEATURE_FEC and group > 1 and ver != VER_SW:
+            accepted |= FEATURE_FEC
+            features[PAYLOAD_FEC_GROUP_KEY] = group
+            features[PAYLOAD_FEC_PARITY_KEY] = max(1, min(payload.get(PAYLOAD_FEC_PARITY_KEY, 1), FEC_MAX_PARITY, group))
+
+        codec = pick_codec(payload.get(PAYLOAD_ZIP_KEY))
+        if offered & FEATURE_ZIP and codec:
+            accepted |= FEATURE_ZIP
+            features[PAYLOAD_ZIP_KEY] = codec
+
+        features[PAYLOAD_FEATURES_KEY] = accepted
+        return features
+
+    def _upload_offset(self, datagram: Datagram, filename: str, size: int | None, mss: int) -> int:
+        """Con FLAG_RESUME, el offset desde el que sigue el upload segun el journal (0 si no hay)."""
+
+        if not datagram.flags & FLAG_RESUME:
+            return 0
+
+        return self.file_handler.resume_offset(filename, size, mss)
+
+    def _open_transfer(self, addr: tuple[str, int], datagram: Datagram, payload: dict, mss: int = MSS) -> Transfer:
+        """Transferencia a la que pertenece un REQUEST_UPLOAD: propia, o compartida por todos los streams del mismo transfer_id."""
+
+        filename = payload[PAYLOAD_FILENAME_KEY]
+        size = payload.get(PAYLOAD_FILE_SIZE_KEY)
+        streams = len(split_ranges(size, payload.get(PAYLOAD_STREAMS_KEY, 1), mss))
+
+        if streams == 1:
+            offset = self._upload_offset(datagram, filename, size, mss)
+            return Transfer(writer=self.file_handler.open_writer(filename, size=size, chunk_size=mss, offset=offset))
+
+        key = (addr[0], payload.get(PAYLOAD_TRANSFER_ID_KEY))
+        with self.transfers_lock:
+            transfer = self.transfers.get(key)
+            if transfer is None:
+                writer = self.file_handler.open_writer(filename, size=size, chunk_size=mss, resumable=False)
+                transfer = Transfer(writer=writer, streams=streams, key=key)
+                self.transfers[key] = transfer
+                self._watch_transfer(transfer)
+
+        transfer.join()
+        return transfer
+
+    def _watch_transfer(self, transfer: Transfer) -> None:
+        """Si algun stream no llega a conectarse en `idle_timeout`, el archivo se descarta en vez de quedar abierto."""
+
+        timer = threading.Timer(self.idle_timeout, self._expire_transfer, args=(transfer,))
+        timer.daemon = True
+        timer.start()
+
+    def _expire_transfer(self, transfer: Transfer) -> None:
+        if not transfer.expire_missing():
+            return
+
+        with self.transfers_lock:
+            self.transfers.pop(transfer.key, None)
+
+        self.metrics.add(expired=1)
+        if self.logger:
+            self.logger.log(f"[INFO] - Upload de '{os.path.basename(transfer.writer.final_path)}' descartado: llegaron {transfer.joined} de {transfer.streams} streams")
+
+    @staticmethod
+    def _upload_range(transfer: Transfer, payload: dict, mss: int) -> tuple[int, int]:
+        """Rango de bytes [start, end) que envia este stream: el suyo dentro del archivo, o desde lo ya recibido si se reanuda."""
+
+        size = payload[PAYLOAD_FILE_SIZE_KEY]
+        if transfer.streams > 1:
+            return split_ranges(size, transfer.streams, mss)[payload.get(PAYLOAD_STREAM_KEY, 0)]
+        return transfer.writer.offset, size
+
+    @staticmethod
+    def _engine_counters(engine: StopAndWait) -> dict[str, int]:
+        """Contadores del motor de una transferencia terminada, para sumar a las metricas del servidor."""
+
+        counters = {'retransmissions': engine.retransmissions, 'parity_sent': engine.parity_sent, 'fec_recovered': engine.recovered}
+        if engine.codec:
+            counters.update(zip_raw_bytes=engine.codec.raw_bytes, zip_wire_bytes=engine.codec.wire_bytes)
+        return counters
+
+    def _end_upload_stream(self, transfer: Transfer, engine: StopAndWait, received: int, ok: bool = True) -> None:
+        committed = transfer.end_stream(engine.expected_seq, ok)
+
+        if transfer.done and transfer.key:
+            with self.transfers_lock:
+                self.transfers.pop(transfer.key, None)
+
+        self.metrics.add(uploads=int(committed), bytes_in=received, **self._engine_counters(engine))
+
+    def _download_offset(self, datagram: Datagram, filename: str, payload: dict, mss: int) -> int:
+        """Con FLAG_RESUME, acepta el offset pedido si el archivo no cambio de tamaño y esta alineado a un chunk."""
+
+        if not datagram.flags & FLAG_RESUME:
+            return 0
+
+        size = self.file_handler.file_size(filename)
+        offset = payload.get(PAYLOAD_OFFSET_KEY, 0)
+
+        if payload.get(PAYLOAD_FILE_SIZE_KEY) != size or offset % mss or not 0 <= offset < size:
+            return 0
+
+        return offset
+
+    def _download_range(self, datagram: Datagram, filename: str, payload: dict, mss: int = MSS) -> tuple[int, int, int]:
+        """Rango de bytes [start, end) que envia este stream y cuantos streams tiene la descarga."""
+
+        size = self.file_handler.file_size(filename)
+        streams = payload.get(PAYLOAD_STREAMS_KEY, 1)
+
+        if streams == 1:
+            return self._download_offset(datagram, filename, payload, mss), size, 1
+
+        ranges = split_ranges(size, streams, mss)
+        start, end = ranges[payload.get(PAYLOAD_STREAM_KEY, 0)]
+
+        return start, end, len(ranges)
     
-    def handle_upload(self, sock: socket, addr: Tuple[str, int], filename: str, queue: Queue):
-        sw = self._send_ok_and_prepare_sw(sock=sock, peer_addr=addr, rcv=lambda t: Server._queue_recv_fn(t, queue))
+    def handle_upload(self, sock: socket, addr: Tuple[str, int], filename: str, queue: Queue, ver: int = VER_SW, transfer: Transfer | None = None, start: int = 0, end: int | None = None, features: dict | None = None, tlv: bool = True, lease: Lease | None = None):
+        if transfer is None:
+            transfer = Transfer(writer=self.file_handler.open_writer(filename, chunk_size=(features or {}).get(PAYLOAD_MSS_KEY, MSS)))
 
-        seq_number = 0
-        while True:
-            datagram = sw.receive_data()
-            
-            if not datagram:
-                continue
-                        
-            if datagram.typ == MsgType.DATA:
-                print(f"[DEBUG] - Receive data with sequence_number={datagram.seq}, expecting={seq_number}")
-                
-                if datagram.seq == seq_number:
-                    self.file_handler.save_datagram(filename=filename, datagram=datagram)
-                    seq_number += 1
-
-                sw.send_ack(acknum=seq_number)
-                
-                if not (datagram.flags & FLAG_MF):
-                    break
-
-        sw.await_bye_and_linger(linger_factor=3, quiet_time=0.2)
-        
-        del self.queues[addr]
+        extra = {PAYLOAD_OFFSET_KEY: start, PAYLOAD_STREAMS_KEY: transfer.streams}
+        if end is not None:
+            extra[PAYLOAD_RANGE_END_KEY] = end
+        sw = self._send_ok_and_prepare_sw(sock=sock, peer_addr=addr, rcv=lambda t: Server._queue_recv_fn(t, queue, lease), ver=ver, extra=extra, features=features, tlv=tlv)
+        sw.start_at(start // sw.mss)
+
+        received = 0
+        debug = self.logger is not None and self.logger.debug_enabled
 
-    def handle_download(self, sock: socket, addr: tuple[str, int], filename: str, queue: Queue):
-        sw = self._send_ok_and_prepare_sw(sock=sock, peer_addr=addr, rcv=lambda t: self._queue_recv_fn(t, queue))
+        done = False
+        try:
+            while not done:
+                datagram = sw.receive_data()
 
-        chunks = self.file_handler.get_file_chunks(filename, CHUNK_SIZE)
-        for seq_number, (payload, mf) in enumerate(chunks):
-            sw.send_data(datagrama=make_data(seq=seq_number, chunk=payload, ver=self.protocol, mf=mf))
+                if not datagram or datagram.typ not in (MsgType.DATA, MsgType.PARITY):
+                    continue
 
-        sw.send_bye_with_retry(retries=8, quiet_time=0.2)
+                if debug:
+                    self.logger.debug(f"[DEBUG] - Receive data with sequence_number={datagram.seq}, expecting={sw.expected_seq}")
+
+                # Cada DATA nuevo (o reconstruido por FEC) va directo a su offset, aunque llegue fuera de orden
+                for data in sw.deliver(datagram):
+                    received += transfer.write_chunk(data.seq, data.payload)
+                transfer.checkpoint(sw.expected_seq)
+
+                done = sw.complete
+        except SessionExpired:
+            # El cliente dejo de enviar: con un unico stream lo recibido queda en disco para reanudar
+            self._end_upload_stream(transfer, sw, received, ok=False)
+            raise
+
+        self._end_upload_stream(transfer, sw, received)
 
-        del self.queues[addr]
-    
\ No newline at end of file
+        sw.await_bye_and_linger(linger_factor=3, quiet_time=0.2, timeout=self.idle_timeout)
+
+    def handle_download(self, sock: socket, addr: tuple[str, int], filename: str, queue: Queue, ver: int = VER_SW, start: int = 0, end: int | None = None, streams: int = 1, features: dict | None = None, tlv: bool = True, lease: Lease | None = None):
+        size = self.file_handler.file_size(filename)
+        end = size if end is None else end
+
+        extra = {PAYLOAD_FILE_SIZE_KEY: size, PAYLOAD_OFFSET_KEY: start, PAYLOAD_RANGE_END_KEY: end, PAYLOAD_STREAMS_KEY: streams}
+        sw = self._send_ok_and_prepare_sw(sock=sock, peer_addr=addr, rcv=lambda t: self._queue_recv_fn(t, queue, lease), ver=ver, extra=extra, features=features, tlv=tlv)
+        sw.rtt_observer = self.metrics.record_rtt
+
+        first, stop = chunk_span(start, end, sw.mss)
+        sent = 0
+        with self.file_handler.get_file_chunks(filename, sw.mss) as chunks:
+            for datagram, nbytes in chunks.frames(sw, first, stop):
+                sw.send_data(datagrama=datagram)
+                sent += nbytes
+
+        sw.flush()
+        self.metrics.add(downloads=int(end == size), bytes_out=sent, **self._engine_counters(sw))
+
+        sw.send_bye_with_retry(retries=8, quiet_time=0.2)
@@ -0,0 +1,228 @@
+import heapq
+import time
+
+from dataclasses import dataclass
+
+from lib.logger import Logger
+from lib.protocolo_amcgf import *
+from lib.config import *
+from lib.gbn import GoBackN
+
+@dataclass
+class SelectiveRepeat(GoBackN):
+    """
+    Selective Repeat: cada paquete en vuelo tiene su propio timer y solo se reenvian los
+    que vencen sin confirmar. El receptor acepta los paquetes fuera de orden (se escriben en su
+    offset) y solo recuerda sus seqs para avanzar el acumulado. Los ACK llevan el acumulado en `ack` y el paquete puntual en `seq`.
+    Con `sack` (negociado en el handshake) los ACK tambien llevan los bloques ya recibidos por encima
+    del acumulado, y el emisor reenvia los huecos sin esperar a que venza su timer.
+    """
+
+    ver: int = VER_SR
+    sack: bool = False
+
+    def __post_init__(self):
+        super().__post_init__()
+
+        # Emisor
+        self.acked = [False] * self.window      # Paquetes confirmados dentro de la ventana (indice seq % window)
+        self.timers: dict[int, float] = {}      # seq -> vencimiento del timer de ese paquete
+        self.timer_heap: list[tuple[float, int]] = []   # (vencimiento, seq), con entradas viejas descartadas al sacarlas
+
+        # Receptor
+        self.received: set[int] = set()         # Seqs recibidos fuera de orden (el payload ya esta en disco)
+
+    def _arm(self, seq: int, deadline: float) -> None:
+        self.timers[seq] = deadline
+        heapq.heappush(self.timer_heap, (deadline, seq))
+
+    def _update_deadline(self) -> None:
+        """Deja en self.deadline el timer mas proximo entre los paquetes sin confirmar."""
+
+        heap = self.timer_heap
+        while heap and self.timers.get(heap[0][1]) != heap[0][0]:
+            heapq.heappop(heap)
+
+        self.deadline = heap[0][0] if heap else None
+
+    def _mark_acked(self, seq: int, logger: Logger | None) -> bool:
+        if seq not in self.timers:
+            return False
+
+        del self.timers[seq]
+        slot = seq % self.window
+        self.acked[slot] = True
+
+        if not self.resent[slot]:
+            self._rtt_sample(time.time() - self.sent_at[slot], logger)
+
+        return True
+
+    def _fast_retransmit(self, logger: Logger | None = None, seq: int | None = None) -> None:
+        """Reenvia solo el primer paquete sin confirmar (o `seq`), si todavia no fue reenviado."""
+
+        seq = self.base if seq is None else seq
+        if seq not in self.timers or self.resent[seq % self.window]:
+            return
+
+        now = time.time()
+        self._resend(seq, now)
+        self._arm(seq, now + self.rto)
+        self._update_deadline()
+
+        self.retransmissions += 1
+        if logger:
+            logger.add_retransmission()
+
+    def _on_sack(self, blocks: list[tuple[int, int]], logger: Logger | None) -> int:
+        """Marca como confirmados los paquetes de los bloques SACK. Devuelve cuantos eran nuevos."""
+
+        acked = 0
+        for start, end in blocks:
+            for seq in range(max(start, self.base), min(end, self.next_seq)):
+                acked += self._mark_acked(seq, logger)
+
+        return acked
+
+    def _sack_retransmit(self, logger: Logger | None) -> None:
+        """Reenvia (una vez por timer) cada hueco con al menos SACK_DUPTHRESH paquetes confirmados por encima."""
+
+        above = 0
+        for seq in range(self.next_seq - 1, self.base - 1, -1):
+            if self.acked[seq % self.window]:
+                above += 1
+            elif above >= SACK_DUPTHRESH:
+                self._fast_retransmit(logger, seq)
+
+    def transmit(self, datagrama: Datagram, logger: Logger | None = None) -> int:
+        sent = super().transmit(datagrama, logger)
+        if not sent:
+            return 0
+
+        self.acked[datagrama.seq % self.window] = False
+        self._arm(datagrama.seq, time.time() + self.rto)
+        self._update_deadline()
+
+        return sent
+
+    def on_ack(self, datagram: Datagram, logger: Logger | None = None) -> None:
+        """Marca como confirmados el acumulado y el paquete puntual, y desliza la ventana."""
+
+        acked = 0
+        for seq in range(self.base, min(datagram.ack, self.next_seq)):
+            acked += self._mark_acked(seq, logger)
+
+        if datagram.seq and self.base <= datagram.seq - 1 < self.next_seq:
+            acked += self._mark_acked(datagram.seq - 1, logger)
+
+        blocks = sack_decode(datagram.payload) if self.sack and datagram.payload else None
+        if blocks:
+            acked += self._on_sack(blocks, logger)
+
+        base = self.base
+        while self.base < self.next_seq and self.acked[self.base % self.window]:
+            self.base += 1
+
+        if self.base > base:
+            self._rto_progress(logger)
+
+            if self.cc and self.cc.on_ack(acked, self.base) and self.in_flight():
+                self._fast_retransmit(logger)
+
+        elif self.in_flight() and self.cc and self.cc.on_dup_ack(self.in_flight(), self.next_seq):
+            # Llego un paquete posterior al hueco en `base`: equivale a un ACK duplicado
+            self._fast_retransmit(logger)
+
+        if blocks and self.in_flight():
+            self._sack_retransmit(logger)
+
+        self._log_cc(logger)
+        self._update_deadline()
+
+    def on_timeout(self, logger: Logger | None = None) -> None:
+        """Reenvia solo los paquetes cuyo timer vencio."""
+
+        now = time.time()
+        expired = []
+
+        while self.timer_heap and self.timer_heap[0][0] <= now:
+            deadline, seq = heapq.heappop(self.timer_heap)
+            if self.timers.get(seq) == deadline:
+                expired.append(seq)
+
+        if expired:
+            self._rto_backoff(logger)
+
+            if self.cc:
+                self.cc.on_timeout(self.in_flight())
+                self._log_cc(logger)
+
+        for seq in expired:
+            self._resend(seq, now)
+            self._arm(seq, now + self.rto)
+
+        self.retransmissions += len(expired)
+        if logger and expired:
+            logger.add_retransmission(len(expired))
+
+        self._update_deadline()
+
+    def accept_data(self, datagram: Datagram) -> bool:
+        """Acepta el paquete si cae en la ventana de recepcion y no es duplicado; el llamador lo
+        escribe directo en su offset, asi que solo se recuerdan los seqs para avanzar el acumulado."""
+
+        if self.fec_rx:
+            self.fec_rx.on_data(datagram)
+
+        seq = datagram.seq
+
+        # Solo puede esperar el ACK de un paquete en orden sin huecos pendientes detras
+        in_order = seq == self.expected_seq and not self.received
+        new = self._accept(datagram)
+        in_order = in_order and new
+        if new and self.fec_rx:
+            self.fec_rx.prune(self.expected_seq)
+
+        # Se confirma el paquete puntual (tambien duplicados, por si se perdio el ACK)
+        self._ack(datagram, in_order=in_order, seq=seq + 1)
+
+        return new
+
+    def _accept(self, datagram: Datagram) -> bool:
+        """Guarda el seq si cae en la ventana de recepcion y no es duplicado, y avanza el acumulado."""
+
+        seq = datagram.seq
+        if not (self.expected_seq <= seq < self.expected_seq + self.window) or seq in self.received:
+            return False
+
+        self._note_last(datagram)
+        self.received.add(seq)
+
+        while self.expected_seq in self.received:
+            self.received.remove(self.expected_seq)
+            self.expected_seq += 1
+
+        return True
+
+    def _accept_recovered(self, recovered: list[Datagram]) -> list[Datagram]:
+        accepted = [datagram for datagram in recovered if self._accept(datagram)]
+
+        # Sin SACK, los reconstruidos que quedaron por encima de un hueco se confirman uno por uno
+        if not self.sack:
+            for datagram in accepted:
+                if datagram.seq >= self.expected_seq:
+                    self.send_ack(acknum=self.expected_seq, seq=datagram.seq + 1)
+
+        return accepted
+
+    def send_ack(self, acknum: int, seq: int = 0) -> None:
+        """Con SACK y paquetes fuera de orden, el ACK lleva sus bloques (frame armado en el momento)."""
+
+        if not (self.sack and self.received):
+            super().send_ack(acknum, seq)
+            return
+
+        encoded = make_ack(acknum=acknum, ver=self.ver, seq=seq, sack=sack_blocks(self.received)).encode()
+
+        self.sock.sendto(encoded, self.peer)
+        self.acks.reset()
@@ -4,7 +4,11 @@ from dataclasses import dataclass
 from socket import socket, timeout as SocketTimeout
 from typing import Callable, Tuple, Optional
 
+from lib.ack_policy import AckPolicy
+from lib.compression import ChunkCodec, DecompressError
+from lib.fec import FecDecoder, FecEncoder
 from lib.logger import Logger
+from lib.rtt import RttEstimator
 from lib.protocolo_amcgf import *
 from lib.config import *
 
@@ -14,10 +18,79 @@ class StopAndWait:
     sock: socket | None = None
     peer: Tuple[str, int] | None = None
     recv_fn: Optional[Callable[[float], bytes | None]] | None = None
+    ver: int = VER_SW
+    ack_every: int = 1
+    fec_group: int = 0      # FEC acordado en el handshake (0 = sin FEC)
+    fec_parity: int = 1
+    zip: str | None = None  # Codec de compresion acordado en el handshake (None = DATA crudos)
+    mss: int = MSS          # MSS acordado en el handshake: tope del payload y tamaño de los chunks
 
     def __post_init__(self):
         if not self.recv_fn:
             self.recv_fn = self._default_recv
+
+        # Buffer de recepcion: el frame mas grande posible con el MSS acordado
+        self.mtu = frame_size(self.mss)
+
+        # Proximo numero de secuencia esperado del lado receptor
+        self.expected_seq = 0
+
+        # Seq del ultimo fragmento (MF apagado), cuando ya se recibio
+        self.last_seq: int | None = None
+
+        # Frame de ACK ya codificado: para cada ACK solo se parchean ack/seq
+        self.ack_frame: bytearray | None = None
+
+        # Politica de ACK del receptor; el emisor Stop-and-Wait espera el ACK de cada paquete
+        self.acks = AckPolicy(every=1 if self.ver == VER_SW else self.ack_every)
+        self.ack_seq = 0    # Campo seq del ACK pendiente (SR: paquete puntual)
+
+        # FEC: en Stop-and-Wait no hay otros paquetes en vuelo con los que armar un grupo
+        fec = self.fec_group if self.ver != VER_SW else 0
+        self.fec_tx = FecEncoder(fec, self.fec_parity) if fec else None
+        self.fec_rx = FecDecoder(fec) if fec else None
+
+        self.codec = ChunkCodec(self.zip) if self.zip else None
+
+        # Estimador adaptativo del RTO (compartido por SW, GBN y SR); self.rto sigue su valor actual
+        self.rtt = RttEstimator(rto=self.rto)
+
+        # Reenvios hechos por el emisor (los lee el servidor para sus metricas)
+        self.retransmissions = 0
+
+        # Destino de las muestras de RTT (el servidor las junta en su histograma)
+        self.rtt_observer: Callable[[float], None] | None = None
+
+        # OK ya enviado (server side): se repite si el cliente reenvia su REQUEST porque lo perdio
+        self.ok_frame: bytes | None = None
+
+    def _rtt_sample(self, rtt: float, logger: Logger | None = None) -> None:
+        """Muestra de RTT (s) de un paquete no retransmitido: actualiza SRTT/RTTVAR y el RTO."""
+
+        self.rto = self.rtt.sample(rtt)
+        if self.rtt_observer:
+            self.rtt_observer(rtt)
+
+        if logger:
+            logger.log_rtt(rtt * 1000)
+            logger.log_rto(self.rto)
+
+    def _rto_progress(self, logger: Logger | None = None) -> None:
+        """Un ACK confirmo datos nuevos: se deshace el backoff acumulado."""
+
+        if self.rtt.backoffs:
+            self.rto = self.rtt.reset_backoff()
+
+            if logger:
+                logger.log_rto(self.rto)
+
+    def _rto_backoff(self, logger: Logger | None = None) -> None:
+        """Vencio un timer: backoff exponencial del RTO."""
+
+        self.rto = self.rtt.backoff()
+
+        if logger:
+            logger.log_rto(self.rto)
     
     def _default_recv(self, timeout: float = RTO) -> Optional[bytes]:
         """Recibe datos directamente desde el socket (modo cliente)."""
@@ -25,14 +98,14 @@ class StopAndWait:
         self.sock.settimeout(timeout)
         
         try:
-            data, _ = self.sock.recvfrom(MTU)
+            data, _ = self.sock.recvfrom(self.mtu)
             return data
         except SocketTimeout:
             return None
 
     def _safe_encode(self, datagrama: Datagram) -> bytes | None:
         try:
-            encoded = datagrama.encode()
+            encoded = datagrama.encode(mss=self.mss)
         except Exception:
             return None
         
@@ -41,11 +114,42 @@ class StopAndWait:
     def _safe_decode(self, data: bytes) -> Optional[Datagram] | None:
         try:
             datagram = Datagram.decode(data)
-        except (Truncated, BadChecksum):
+        except ProtoError:
             return None
+
+        self.answer_request(datagram)
         
         return datagram
 
+    def answer_request(self, datagram: Datagram) -> bool:
+        """Si llega un REQUEST repetido (se perdio el OK) se reenvia el OK. True si lo era."""
+
+        if self.ok_frame is None or datagram.typ not in (MsgType.REQUEST_UPLOAD, MsgType.REQUEST_DOWNLOAD):
+            return False
+
+        self.sock.sendto(self.ok_frame, self.peer)
+        return True
+
+    @property
+    def parity_sent(self) -> int:
+        return self.fec_tx.sent if self.fec_tx else 0
+
+    @property
+    def recovered(self) -> int:
+        return self.fec_rx.recovered if self.fec_rx else 0
+
+    def _send_parity(self, datagram: Datagram, logger: Logger | None = None) -> None:
+        """FEC: suma un DATA nuevo al grupo en curso y, si lo cierra, envia sus PARITY."""
+
+        for parity in self.fec_tx.add(datagram):
+            encoded = self._safe_encode(parity)
+            if not encoded:
+                continue
+
+            self.sock.sendto(encoded, self.peer)
+            if logger:
+                logger.add_parity(len(encoded))
+
     def send_data(self, datagrama: Datagram, logger: Logger | None = None) -> int:
         expected_ack = datagrama.seq + 1
         
@@ -53,6 +157,7 @@ class StopAndWait:
         if not encoded:
             return 0
 
+        retransmitted = False
         while True:       
             self.sock.sendto(encoded, self.peer)
             t0 = time.time()
@@ -70,9 +175,11 @@ class StopAndWait:
                     continue
                 
                 if datagram.ack == expected_ack:
-                    if logger:
-                        rtt = time.time() - t0  
-                        logger.log_rtt(rtt * 1000) 
+                    # Regla de Karn: solo se muestrea el RTT si el paquete no fue retransmitido
+                    if not retransmitted:
+                        self._rtt_sample(time.time() - t0, logger)
+                    else:
+                        self._rto_progress(logger)
                 
                     return len(encoded)
                 
@@ -82,46 +189,186 @@ class StopAndWait:
                 elif time.time() - t0 > self.rto:
                     break
 
+            # Timeout: backoff del RTO y reenvio
+            self._rto_backoff(logger)
+            retransmitted = True
+            self.retransmissions += 1
+            if logger:
+                logger.add_retransmission()
+
+    def flush(self, logger: Logger | None = None) -> None:
+        """En Stop-and-Wait cada send_data ya espera su ACK, no queda nada en vuelo."""
+
+        return
+
     def receive_data(self) -> Optional[Datagram]:
         """Recibe un datagrama decodificado usando la función recv_fn."""
 
-        raw_bytes = self.recv_fn(self.rto)
+        timeout = self.rto
+        if self.acks.deadline is not None:
+            timeout = min(timeout, max(self.acks.deadline - time.time(), 0.0005))
+
+        raw_bytes = self.recv_fn(timeout)
+        self.ack_timer()
         
         if not raw_bytes:
             return None
         
         return self._safe_decode(raw_bytes)
 
-    def send_ack(self, acknum: int) -> None:
+    def ack_timer(self, now: float | None = None) -> None:
+        """Envia el ACK retardado si vencio su timer."""
+
+        if self.acks.due(time.time() if now is None else now):
+            self.send_ack(acknum=self.expected_seq, seq=self.ack_seq)
+
+    def start_at(self, seq: int) -> None:
+        """Arranca la transferencia en `seq` en vez de 0 (reanudacion)."""
+
+        self.expected_seq = seq
+
+    @property
+    def complete(self) -> bool:
+        """El receptor ya tiene todos los fragmentos hasta el ultimo."""
+
+        return self.last_seq is not None and self.expected_seq > self.last_seq
+
+    def _note_last(self, datagram: Datagram) -> None:
+        if not (datagram.flags & FLAG_MF):
+            self.last_seq = datagram.seq
+
+    def accept_data(self, datagram: Datagram) -> bool:
+        """Receptor con ACK acumulativo: acepta solo el seq esperado y descarta el resto.
+        El ACK lleva el proximo seq esperado (segun `acks` puede quedar retardado). Devuelve True si el datagrama es nuevo
+        (hay que escribirlo en el offset de su seq)."""
+
+        if self.fec_rx:
+            self.fec_rx.on_data(datagram)
+
+        new = datagram.seq == self.expected_seq
+        if new:
+            self._note_last(datagram)
+            self.expected_seq += 1
+            if self.fec_rx:
+                self.fec_rx.prune(self.expected_seq)
+
+        self._ack(datagram, in_order=new)
+
+        return new
+
+    def data_frame(self, seq: int, chunk: bytes, mf: bool) -> Datagram:
+        """DATA con un chunk del archivo, comprimido si se acordo en el handshake y achica."""
+
+        if not self.codec:
+            return make_data(seq=seq, chunk=chunk, ver=self.ver, mf=mf)
+
+        payload, zipped = self.codec.compress(chunk)
+        return make_data(seq=seq, chunk=payload, ver=self.ver, mf=mf, zipped=zipped)
+
+    def deliver(self, datagram: Datagram) -> list[Datagram]:
+        """
+        DATA o PARITY recibido => DATA nuevos a escribir en su offset (con FEC, tambien los
+        reconstruidos), con el payload ya descomprimido.
+        """
+
+        if datagram.typ == MsgType.PARITY:
+            accepted = self.accept_parity(datagram)
+            if self.codec:
+                accepted = [data for data in map(self._unzip, accepted) if data is not None]
+            return accepted
+
+        if datagram.typ != MsgType.DATA:
+            return []
+
+        if not self.codec:
+            return [datagram] if self.accept_data(datagram) else []
+
+        # Un payload que no descomprime o que se pasa del MSS se descarta sin confirmarlo, como uno corrupto
         try:
-            encoded = make_ack(acknum=acknum, ver=VER_SW).encode()
-        except Exception:
-            raise
+            chunk = self.codec.inflate(datagram.payload, zipped=bool(datagram.flags & FLAG_ZIP), limit=self.mss)
+        except DecompressError:
+            return []
+
+        if not self.accept_data(datagram):
+            return []
+
+        self.codec.count(len(chunk), len(datagram.payload))
+        return [make_data(seq=datagram.seq, chunk=chunk, ver=datagram.ver, mf=bool(datagram.flags & FLAG_MF))]
+
+    def _unzip(self, datagram: Datagram) -> Datagram | None:
+        """DATA reconstruido por FEC, descomprimido; None si su payload no es valido."""
+
+        try:
+            chunk = self.codec.decompress(datagram.payload, zipped=bool(datagram.flags & FLAG_ZIP), limit=self.mss)
+        except DecompressError:
+            return None
+        return make_data(seq=datagram.seq, chunk=chunk, ver=datagram.ver, mf=bool(datagram.flags & FLAG_MF))
+
+    def accept_parity(self, datagram: Datagram) -> list[Datagram]:
+        """FEC: registra un PARITY y acepta los DATA que se pudieron reconstruir (se confirman al instante)."""
+
+        if not self.fec_rx:
+            return []
+
+        recovered = self.fec_rx.on_parity(datagram)
+        accepted = self._accept_recovered(recovered) if recovered else []
+
+        # Aun sin nada que reconstruir: un PARITY de un grupo ya entregado no tiene que quedar guardado
+        self.fec_rx.prune(self.expected_seq)
+        if recovered:
+            self.send_ack(acknum=self.expected_seq)
+
+        return accepted
+
+    def _accept_recovered(self, recovered: list[Datagram]) -> list[Datagram]:
+        """
+        Receptor acumulativo: los paquetes posteriores al perdido ya se habian descartado, pero el FEC
+        los guarda; con el hueco cubierto se aceptan todos los que siguen en orden.
+        """
+
+        accepted = []
+        while (datagram := self.fec_rx.stored(self.expected_seq, self.ver)) is not None:
+            self._note_last(datagram)
+            self.expected_seq += 1
+            accepted.append(datagram)
+
+        return accepted
+
+    def _ack(self, datagram: Datagram, in_order: bool, seq: int = 0) -> None:
+        """Confirma ya o deja el ACK pendiente segun la politica (el ultimo fragmento nunca espera)."""
+
+        self.ack_seq = seq
+        if self.acks.on_data(in_order, last=not (datagram.flags & FLAG_MF), now=time.time()):
+            self.send_ack(acknum=self.expected_seq, seq=seq)
+
+    def send_ack(self, acknum: int, seq: int = 0) -> None:
+        if self.ack_frame is None:
+            self.ack_frame = bytearray(make_ack(acknum=ACK_NONE, ver=self.ver).encode())
+
+        patch_ack_seq(self.ack_frame, ack=acknum, seq=seq)
         
-        self.sock.sendto(encoded, self.peer)
+        self.sock.sendto(self.ack_frame, self.peer)
+        self.acks.reset()
 
     def receive_ack(self, expected_ack: int) -> bool:
         self.sock.settimeout(self.rto)
         
         try:
-            bytes, _ = self.sock.recvfrom(MTU)
+            bytes, _ = self.sock.recvfrom(self.mtu)
         except SocketTimeout:
             return False
         
         try:
             datagram = Datagram.decode(bytes)
-        except (Truncated, BadChecksum):
+        except ProtoError:
             return False
         
         return datagram.typ == MsgType.ACK and datagram.ack == expected_ack
 
     def send_bye(self) -> None:
-        bye = make_bye(ver=VER_SW)
+        bye = make_bye(ver=self.ver)
 
-        try:
-            encoded = bye.encode()
-        except Exception:
-            raise
+        encoded = bye.encode()
 
         self.sock.sendto(encoded, self.peer)
         
@@ -129,7 +376,7 @@ class StopAndWait:
         """Envía BYE y espera un OK. Funciona tanto en server (cola) como en cliente (socket)."""
 
         for _ in range(retries):
-            encoded = self._safe_encode(make_bye(ver=VER_SW))
+            encoded = self._safe_encode(make_bye(ver=self.ver))
             if not encoded:
                 continue
             
@@ -160,11 +407,13 @@ class StopAndWait:
 
         return False
 
-    def await_bye_and_linger(self, linger_factor: int = 2, quiet_time: float = 0.2) -> None:
+    def await_bye_and_linger(self, linger_factor: int = 2, quiet_time: float = 0.2, timeout: float = IDLE_TIMEOUT) -> bool:
         """Espera un BYE del peer y responde con OK, manejando linger.
-        Funciona tanto en server (cola) como en cliente (socket)."""
+        Funciona tanto en server (cola) como en cliente (socket). Se rinde (False) si el peer
+        pasa `timeout` segundos sin enviar nada."""
         
-        while True:
+        deadline = time.time() + timeout
+        while time.time() < deadline:
             raw = self.recv_fn(self.rto)
             if raw is None:
                 continue
@@ -173,8 +422,15 @@ class StopAndWait:
             if datagram is None:
                 continue
 
+            deadline = time.time() + timeout
+
+            # El ultimo ACK pudo perderse: el emisor reenvia DATA y hay que volver a confirmarlo
+            if datagram.typ == MsgType.DATA:
+                self.accept_data(datagram)
+                continue
+
             if datagram.typ == MsgType.BYE:
-                encoded = self._safe_encode(make_ok(ver=VER_SW))
+                encoded = self._safe_encode(make_ok(ver=self.ver))
                 if not encoded:
                     continue
                 
@@ -192,51 +448,51 @@ class StopAndWait:
                         continue
 
                     if datagram.typ == MsgType.BYE:
-                        encoded = self._safe_encode(make_ok(ver=VER_SW))
+                        encoded = self._safe_encode(make_ok(ver=self.ver))
                         if not encoded:
                             continue
                         
                         self.sock.sendto(encoded, self.peer)
                         # resetear linger
                         t_end = time.time() + linger_factor * self.rto
-                return
+                return True
+
+        return False
 
     def receive_bye(self) -> bool:
         self.sock.settimeout(self.rto)
 
         try:
-            bytes, _ = self.sock.recvfrom(MTU)
+            bytes, _ = self.sock.recvfrom(self.mtu)
         except SocketTimeout:
             return False
         
         try:
             datagram = Datagram.decode(bytes)
-        except (Truncated, BadChecksum):
+        except ProtoError:
             return False
         
         return datagram.typ == MsgType.BYE
     
-    def send_ok(self) -> None:
-        ok = make_ok(ver=VER_SW)
+    def send_ok(self, extra: dict | None = None, tlv: bool = True) -> None:
+        ok = make_ok(extra=extra, ver=self.ver, tlv=tlv)
 
-        try:
-            encoded = ok.encode()
-        except Exception:
-            raise
+        encoded = ok.encode()
 
+        self.ok_frame = encoded
         self.sock.sendto(encoded, self.peer)
 
     def receive_ok(self) -> bool:
         self.sock.settimeout(self.rto)
         
         try:
-            bytes, _ = self.sock.recvfrom(MTU)
+            bytes, _ = self.sock.recvfrom(self.mtu)
         except SocketTimeout:
             return False
         
         try:
             datagram = Datagram.decode(bytes)
-        except (Truncated, BadChecksum):
+        except ProtoError:
             return False
         
         return datagram.typ == MsgType.OK
\ No newline at end of file
@@ -0,0 +1,109 @@
+"""
+Rueda de timers con hash (Varghese y Lauck): un arreglo circular de `slots` casilleros de
+`tick` segundos. Un timer se guarda en el casillero de su tick absoluto modulo `slots`, asi que
+armarlo o cancelarlo es O(1) sin importar cuantos haya cargados. Los que vencen mas alla de una
+vuelta comparten casillero con los cercanos y se saltean hasta que llega su tick. Para saber
+cuando despertar sin recorrer la rueda se lleva cuantos timers hay por tick y un heap de esos ticks.
+"""
+
+import heapq
+import math
+import time
+
+from dataclasses import dataclass, field
+
+from lib.config import WHEEL_SLOTS, WHEEL_TICK
+
+@dataclass(eq=False)
+class Timer:
+    deadline: float
+    item: object
+    tick: int
+    slot: dict | None = None    # Casillero donde esta cargado (None = vencido o cancelado)
+
+@dataclass
+class TimerWheel:
+    tick: float = WHEEL_TICK
+    slots: int = WHEEL_SLOTS
+    start: float = field(default_factory=time.time)
+
+    def __post_init__(self):
+        # Cada casillero es un dict usado como conjunto ordenado: alta y baja O(1)
+        self.wheel: list[dict[Timer, None]] = [{} for _ in range(self.slots)]
+        self.current = int(self.start / self.tick)   # Ultimo tick procesado
+        self.count = 0
+        self.pending: dict[int, int] = {}     # Timers cargados por tick absoluto
+        self.ticks: list[int] = []            # Heap de ticks con timers (los que se vaciaron se limpian al llegar arriba)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def schedule(self, deadline: float, item: object) -> Timer:
+        """Carga `item` para que venza en `deadline` (nunca antes; a lo sumo un tick despues)."""
+
+        tick = max(math.ceil(deadline / self.tick), self.current + 1)
+        timer = Timer(deadline, item, tick)
+        timer.slot = self.wheel[tick % self.slots]
+        timer.slot[timer] = None
+        self.count += 1
+
+        if tick not in self.pending:
+            self.pending[tick] = 0
+            heapq.heappush(self.ticks, tick)
+            # Rearmar timers lejanos deja ticks vaciados en el heap: se compacta cuando son mayoria
+            if len(self.ticks) > 2 * len(self.pending) + self.slots:
+                self.ticks = list(self.pending)
+                heapq.heapify(self.ticks)
+        self.pending[tick] += 1
+
+        return timer
+
+    def cancel(self, timer: Timer) -> None:
+        if timer.slot is not None:
+            del timer.slot[timer]
+            timer.slot = None
+            self.count -= 1
+            self._release(timer.tick)
+
+    def advance(self, now: float) -> list:
+        """Items de los timers vencidos hasta `now`, por orden de vencimiento. Se descargan de la rueda."""
+
+        target = int(now / self.tick)
+        if target <= self.current:
+            return []
+
+        # Con mas de una vuelta sin avanzar alcanza con visitar cada casillero una vez
+        expired = []
+        for tick in range(max(self.current + 1, target - self.slots + 1), target + 1):
+            slot = self.wheel[tick % self.slots]
+            if not slot:
+                continue
+
+            for timer in [timer for timer in slot if timer.tick <= target]:
+                del slot[timer]
+                timer.slot = None
+                self._release(timer.tick)
+                expired.append(timer)
+
+        self.current = target
+        self.count -= len(expired)
+        expired.sort(key=lambda timer: timer.deadline)
+
+        return [timer.item for timer in expired]
+
+    def next_expiry(self) -> float | None:
+        """Cuando hay que volver a llamar a advance: el proximo tick con timers dentro de una vuelta,
+        o el fin de la vuelta si todos vencen mas lejos. None si la rueda esta vacia."""
+
+        if not self.count:
+            return None
+
+        while self.ticks[0] not in self.pending:
+            heapq.heappop(self.ticks)
+
+        return min(self.ticks[0], self.current + self.slots) * self.tick
+
+    def _release(self, tick: int) -> None:
+        self.pending[tick] -= 1
+        if not self.pending[tick]:
+            del self.pending[tick]
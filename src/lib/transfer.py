@@ -0,0 +1,77 @@
+import threading
+
+from dataclasses import dataclass, field
+
+from lib.file_handler import FileWriter
+
+@dataclass
+class Transfer:
+    """
+    Archivo que se recibe por uno o varios streams. Cada stream escribe su rango de bytes en el
+    mismo escritor y el ultimo en terminar publica el archivo. Con un unico stream el prefijo
+    recibido queda en el journal (reanudable); con varios los rangos no son contiguos y un corte
+    descarta todo, igual que un stream que nunca llega (ver expire_missing).
+    """
+
+    writer: FileWriter
+    streams: int = 1
+    key: tuple | None = None    # Clave en el registro de transferencias del servidor
+    joined: int = 0             # Streams que ya abrieron su sesion
+    ended: int = 0
+    failed: bool = False
+    committed: bool = False
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def done(self) -> bool:
+        return self.ended >= self.streams
+
+    def write_chunk(self, seq: int, payload: bytes) -> int:
+        with self.lock:
+            if self.failed:
+                return 0
+            return self.writer.write_chunk(seq, payload)
+
+    def join(self) -> None:
+        with self.lock:
+            self.joined += 1
+
+    def expire_missing(self) -> bool:
+        """Vencio la espera de los streams: si falta alguno se descarta el archivo. True si lo descarto."""
+
+        with self.lock:
+            if self.joined >= self.streams or self.done:
+                return False
+
+            self.failed = True
+            self.ended = self.streams
+            self.writer.abort()
+            return True
+
+    def checkpoint(self, seq: int) -> None:
+        if self.streams == 1:
+            self.writer.checkpoint(seq)
+
+    def end_stream(self, seq: int, ok: bool = True) -> bool:
+        """Termina un stream (`seq` = su proximo seq esperado). True si con este se publico el archivo."""
+
+        with self.lock:
+            if self.done:
+                # Ya se descarto porque no llegaron todos los streams
+                return False
+
+            self.ended += 1
+            self.failed |= not ok
+
+            if not self.done:
+                return False
+
+            if not self.failed:
+                self.writer.commit()
+                self.committed = True
+            elif self.streams == 1:
+                self.writer.suspend(seq)
+            else:
+                self.writer.abort()
+
+            return self.committed
@@ -0,0 +1,52 @@
+from argparse import ArgumentParser, RawDescriptionHelpFormatter, Namespace
+
+from lib.impair import Impairment, ImpairmentProxy
+
+def define_flags():
+    parser = ArgumentParser(description='Lossy UDP relay between client and server (local stand-in for the Mininet topology)', formatter_class=RawDescriptionHelpFormatter)
+
+    parser.add_argument('-H', '--host', required=False, type=str, default='127.0.0.1', metavar='HOST', help='address the proxy listens on')
+    parser.add_argument('-p', '--port', required=True, type=int, metavar='PORT', help='port the proxy listens on (clients connect here)')
+    parser.add_argument('--server-host', required=False, type=str, default='127.0.0.1', metavar='HOST', help='server IP address')
+    parser.add_argument('--server-port', required=True, type=int, metavar='PORT', help='server port')
+    parser.add_argument('--loss', required=False, type=float, default=0.0, metavar='P', help='random loss probability (in the good state with --ge)')
+    parser.add_argument('--ge', required=False, type=float, nargs=2, metavar=('P', 'R'), help='bursty Gilbert-Elliott loss: P = good->bad, R = bad->good transition probability')
+    parser.add_argument('--ge-loss', required=False, type=float, default=1.0, metavar='H', help='loss probability in the bad state')
+    parser.add_argument('--delay', required=False, type=float, default=0.0, metavar='MS', help='one-way delay in milliseconds')
+    parser.add_argument('--jitter', required=False, type=float, default=0.0, metavar='MS', help='uniform delay variation in milliseconds')
+    parser.add_argument('--reorder', required=False, type=float, default=0.0, metavar='P', help='probability of holding a packet back so later ones overtake it')
+    parser.add_argument('--reorder-delay', required=False, type=float, default=5.0, metavar='MS', help='extra delay of reordered packets in milliseconds')
+    parser.add_argument('--duplicate', required=False, type=float, default=0.0, metavar='P', help='duplication probability')
+    parser.add_argument('--corrupt', required=False, type=float, default=0.0, metavar='P', help='probability of flipping one bit')
+    parser.add_argument('--rate', required=False, type=float, default=0.0, metavar='MBPS', help='bandwidth cap in Mbit/s per direction (like the Mininet bw)')
+    parser.add_argument('--queue', required=False, type=int, default=64 * 1024, metavar='BYTES', help='queue size behind the bandwidth cap')
+    parser.add_argument('--seed', required=False, type=int, default=0, metavar='N', help='random seed (same seed, same decisions)')
+
+    return parser
+
+def process_args(args: Namespace) -> ImpairmentProxy:
+    ge_p, ge_r = args.ge if args.ge else (0.0, 1.0)
+    spec = Impairment(
+        loss=args.loss, ge_p=ge_p, ge_r=ge_r, ge_loss=args.ge_loss,
+        delay=args.delay / 1000, jitter=args.jitter / 1000,
+        reorder=args.reorder, reorder_delay=args.reorder_delay / 1000,
+        duplicate=args.duplicate, corrupt=args.corrupt,
+        rate=args.rate * 1_000_000, queue=args.queue,
+    )
+
+    # Como en net.py, el enlace degrada los dos sentidos
+    return ImpairmentProxy(listen=(args.host, args.port), server=(args.server_host, args.server_port), up=spec, down=spec, seed=args.seed)
+
+if __name__ == '__main__':
+
+    parser = define_flags()
+    args = parser.parse_args()
+
+    proxy = process_args(args)
+    print(f"Proxy listening at {proxy.address[0]}:{proxy.address[1]} -> {args.server_host}:{args.server_port}")
+
+    try:
+        proxy.run()
+    except KeyboardInterrupt:
+        for direction, stats in proxy.stats().items():
+            print(f"\n{direction}: " + " ".join(f"{name}={count}" for name, count in sorted(stats.items())))
@@ -1,15 +1,25 @@
+import os
 import sys
 
-from signal import SIGINT, signal
+from multiprocessing import Process, Queue
+from queue import Empty
+from signal import SIG_IGN, SIGINT, SIGTERM, signal
 from types import FrameType
 from argparse import ArgumentParser, Namespace, RawDescriptionHelpFormatter
 
-from lib.logger import Logger
+from lib.chunk_cache import ChunkCache
+from lib.config import CHUNK_CACHE_BYTES, IDLE_TIMEOUT, MAX_TRANSFER_TIME, METRICS_INTERVAL, PARTIAL_TTL
+from lib.logger import DEBUG, Logger
 from lib.server import DEFAULT_STORAGE_PATH, Server   
+from lib.event_server import EventServer
 from lib.protocolo_amcgf import *
 from lib.file_handler import FileHandler
+from lib.metrics import MetricsExporter, ServerMetrics, SharedCounters
 
 def sigint_handler(_: int, frame: FrameType | None):
+    # La señal puede llegar dentro de un llamado del loop (p. ej. la recepcion en lote): se sube hasta run()
+    while frame and 'sock' not in frame.f_locals:
+        frame = frame.f_back
     sock = frame.f_locals['sock']
     try:
         sock.close()
@@ -24,29 +34,107 @@ def define_flags():
     parser = ArgumentParser(description='File server program', formatter_class=RawDescriptionHelpFormatter)
     parser.add_argument('-v', '--verbose', required=False, action='store_true', help='increase output verbosity')
     parser.add_argument('-q', '--quiet', required=False, action='store_true', help='decrease output verbosity')
+    parser.add_argument('--debug', required=False, action='store_true', help='log every packet (debug level)')
     parser.add_argument('-H', '--host', required=False, type=str, metavar='HOST', help='server IP address')
     parser.add_argument('-p', '--port', required=False, type=int, metavar='PORT', help='server port')
     parser.add_argument('-s', '--storage', required=False, type=str, metavar='DIRPATH', help='destination file path')
+    parser.add_argument('-e', '--engine', required=False, type=str, choices=['threaded', 'event'], default='threaded', help='server engine: one thread per client or single-threaded event loop')
+    parser.add_argument('--mss', required=False, type=int, default=MSS_MAX, metavar='BYTES', help=f'largest payload size accepted in the handshake ({MSS_MIN} to {MSS_MAX})')
+    parser.add_argument('--window', required=False, type=int, metavar='N', help='largest sliding window accepted in the handshake, in packets')
+    parser.add_argument('--metrics-file', required=False, type=str, metavar='PATH', help='periodically write server metrics to PATH in Prometheus text format')
+    parser.add_argument('--metrics-interval', required=False, type=float, default=METRICS_INTERVAL, metavar='SECONDS', help='seconds between metrics file writes')
+    parser.add_argument('--cache', required=False, type=int, default=CHUNK_CACHE_BYTES // (1024 * 1024), metavar='MB', help='memory for the chunk cache shared by downloads (0 = no cache)')
+    parser.add_argument('--idle-timeout', required=False, type=float, default=IDLE_TIMEOUT, metavar='SECONDS', help='close a session after this long without datagrams from the client')
+    parser.add_argument('--max-transfer-time', required=False, type=float, default=MAX_TRANSFER_TIME, metavar='SECONDS', help='close sessions that last longer than this (0 = no limit)')
+    parser.add_argument('--partial-ttl', required=False, type=float, default=PARTIAL_TTL, metavar='SECONDS', help='delete partial uploads untouched for this long (0 = keep them)')
+    parser.add_argument('-w', '--workers', required=False, type=int, default=1, metavar='N', help='number of worker processes sharing the port (SO_REUSEPORT)')
     return parser
 
 def process_args(args: Namespace):
-    server = Server()
+    server = EventServer() if args.engine == 'event' else Server()
 
     server.verbose = args.verbose
     server.quiet = args.quiet
     server.host = args.host if args.host else server.host
     server.port = args.port if args.port else server.port    
-    server.file_handler = FileHandler(args.storage) if args.storage else FileHandler(DEFAULT_STORAGE_PATH)
-    server.logger = Logger(server.verbose)
+    cache = ChunkCache(budget=args.cache * 1024 * 1024) if args.cache > 0 else None
+    server.file_handler = FileHandler(args.storage if args.storage else DEFAULT_STORAGE_PATH, cache, partial_ttl=args.partial_ttl or None)
+    server.logger = Logger(server.verbose, level=DEBUG if args.debug else None)
+    server.mss = args.mss
+    server.window = args.window if args.window else server.window
+    server.metrics_file = args.metrics_file
+    server.metrics_interval = args.metrics_interval
+    server.idle_timeout = args.idle_timeout
+    server.max_transfer_time = args.max_transfer_time
 
 
     return server
 
-if __name__ == '__main__':
-    signal(SIGINT, sigint_handler)
+def run_worker(args: Namespace, results: Queue, shared: SharedCounters, row: int):
+    """Proceso worker: corre el servidor sobre su propio socket y al recibir SIGTERM reporta sus metricas."""
+
+    # Ctrl+C le llega a todo el grupo: lo coordina el padre
+    signal(SIGINT, SIG_IGN)
+
+    server = process_args(args)
+    server.reuse_port = True
+    server.metrics.share(shared, row)
+    if server.metrics_file:
+        # Sesiones, colas, RTT y cache son de cada worker: un archivo por proceso (el padre escribe la suma)
+        server.metrics_file = f"{server.metrics_file}.{os.getpid()}"
+
+    def report(*_):
+        results.put((os.getpid(), server.metrics.to_dict()))
+        sys.exit(0)
+
+    signal(SIGTERM, report)
+    server.run()
+
+def run_workers(args: Namespace):
+    """Levanta N workers en el mismo puerto y, al cortar con Ctrl+C, junta sus metricas en un resumen."""
+
+    results = Queue()
+    shared = SharedCounters(args.workers)
+    workers = [Process(target=run_worker, args=(args, results, shared, row), daemon=True) for row in range(args.workers)]
+    for worker in workers:
+        worker.start()
+
+    if args.metrics_file:
+        # Vista del servidor entero: los contadores sumados de todos los workers
+        MetricsExporter(args.metrics_file, shared.total, args.metrics_interval).start()
 
+    try:
+        for worker in workers:
+            worker.join()
+    except KeyboardInterrupt:
+        signal(SIGINT, SIG_IGN)
+
+    for worker in workers:
+        worker.terminate()
+
+    total = ServerMetrics(workers=0)
+    for _ in workers:
+        try:
+            pid, counters = results.get(timeout=2)
+        except Empty:
+            break
+
+        metrics = ServerMetrics.from_dict(counters)
+        print(f"\nWorker {pid}: uploads={metrics.uploads} downloads={metrics.downloads} errores={metrics.errors}")
+        total.merge(metrics)
+
+    print(f"\n{total.summary()}")
+    print('\nGraceful Exit')
+
+if __name__ == '__main__':
     parser = define_flags()
     args = parser.parse_args()
 
+    if args.workers > 1:
+        run_workers(args)
+        sys.exit(0)
+
+    signal(SIGINT, sigint_handler)
+
     server = process_args(args)
     server.run()
@@ -0,0 +1,38 @@
+from argparse import ArgumentParser, RawDescriptionHelpFormatter, Namespace
+
+from lib.logger import Logger
+from lib.metrics import to_prometheus
+from lib.client import Client
+
+def define_flags():
+    parser = ArgumentParser(description='Server metrics program', formatter_class=RawDescriptionHelpFormatter)
+
+    parser.add_argument('-H', '--host', required=False, type=str, metavar='HOST', help='server IP address')
+    parser.add_argument('-p', '--port', required=False, type=int, metavar='PORT', help='server port')
+    parser.add_argument('--prometheus', required=False, action='store_true', help='print the counters in Prometheus text format')
+
+    return parser
+
+def process_args(args: Namespace):
+    client = Client()
+
+    client.host = args.host if args.host else client.host
+    client.port = args.port if args.port else client.port
+    client.logger = Logger()
+
+    return client
+
+if __name__ == '__main__':
+
+    parser = define_flags()
+    args = parser.parse_args()
+
+    client = process_args(args)
+    stats = client.stats()
+
+    if stats is not None:
+        if args.prometheus:
+            print(to_prometheus(stats), end='')
+        else:
+            for name, value in stats.items():
+                print(f"{name}: {value}")
@@ -1,6 +1,9 @@
+import sys
+
 from argparse import ArgumentParser, RawDescriptionHelpFormatter, Namespace
 
-from lib.logger import Logger
+from lib.config import WINDOW_SIZE
+from lib.logger import DEBUG, Logger
 from lib.protocolo_amcgf import *
 from lib.client import DEFAULT_NAME, DEFAULT_SRC, Client
 
@@ -9,11 +12,20 @@ def define_flags():
     
     parser.add_argument('-v', '--verbose', required=False, action='store_true', help='increase output verbosity')
     parser.add_argument('-q', '--quiet', required=False, action='store_true', help='decrease output verbosity')
+    parser.add_argument('--debug', required=False, action='store_true', help='log every packet (debug level)')
     parser.add_argument('-H', '--host', required=False, type=str, metavar='HOST', help='server IP address')
     parser.add_argument('-p', '--port', required=False, type=int, metavar='PORT', help='server port')
     parser.add_argument('-s', '--src', required=False, type=str, metavar='SRC', help='source file path')
     parser.add_argument('-n', '--name', required=False, type=str, metavar='FILENAME', help='file name')
-    parser.add_argument('-r', '--protocol', required=False, type=str, metavar='PROTOCOL', help='error recovery protocol')
+    parser.add_argument('-r', '--protocol', required=False, type=str, metavar='PROTOCOL', help='error recovery protocol (SW, GBN or SR)')
+    parser.add_argument('--resume', required=False, action='store_true', help='resume an interrupted transfer')
+    parser.add_argument('--streams', required=False, type=int, default=1, metavar='N', help='split the file into N byte ranges sent over parallel flows')
+    parser.add_argument('--fec', required=False, type=int, default=0, metavar='GROUP', help='send parity packets every GROUP data packets (GBN and SR)')
+    parser.add_argument('--fec-parity', required=False, type=int, default=1, metavar='N', help='parity packets per FEC group (1 = XOR, more = Reed-Solomon)')
+    parser.add_argument('--mss', required=False, type=int, default=MSS, metavar='BYTES', help=f'payload size to request ({MSS_MIN} to {MSS_MAX}, the server may lower it)')
+    parser.add_argument('--window', required=False, type=int, default=WINDOW_SIZE, metavar='N', help='sliding window to request, in packets (GBN and SR)')
+    parser.add_argument('--compress', required=False, action='store_true', help='compress DATA payloads (zlib, or lz4 when installed)')
+    parser.add_argument('--text-control', required=False, action='store_true', help='send control payloads in the legacy text format (for old servers)')
 
     return parser
 
@@ -26,12 +38,22 @@ def process_args(args: Namespace):
     client.port = args.port if args.port else client.port
     client.src = args.src if args.src else DEFAULT_SRC
     client.name = args.name if args.name else DEFAULT_NAME
-    client.logger = Logger(client.verbose)
+    client.logger = Logger(client.verbose, level=DEBUG if args.debug else None)
+    client.resume = args.resume
+    client.streams = args.streams
+    client.fec_group = args.fec
+    client.fec_parity = args.fec_parity
+    client.compress = args.compress
+    client.tlv = not args.text_control
+    client.mss = args.mss
+    client.window = args.window
 
     if args.protocol == 'SW':
         client.protocol = VER_SW
     elif args.protocol == 'GBN':
         client.protocol = VER_GBN
+    elif args.protocol == 'SR':
+        client.protocol = VER_SR
 
     return client
 
@@ -41,4 +63,4 @@ if __name__ == '__main__':
     args = parser.parse_args()
 
     client = process_args(args)
-    client.upload()
\ No newline at end of file
+    sys.exit(0 if client.upload() else 1)
\ No newline at end of file
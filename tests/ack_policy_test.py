@@ -0,0 +1,35 @@
+from lib.ack_policy import AckPolicy
+
+def test_acks_every_k_in_order():
+    """Testing del ACK acumulado: en orden se confirma de a `every` paquetes"""
+
+    acks = AckPolicy(every=2, delay=0.002)
+
+    assert not acks.on_data(in_order=True, last=False, now=0.0)
+    assert acks.on_data(in_order=True, last=False, now=0.0005)
+
+def test_delayed_ack_timer():
+    """Testing del ACK retardado: vence a `delay` del primer paquete pendiente y se reinicia al enviar"""
+
+    acks = AckPolicy(every=4, delay=0.002)
+    acks.on_data(in_order=True, last=False, now=1.0)
+    acks.on_data(in_order=True, last=False, now=1.001)
+
+    assert not acks.due(1.0015) and acks.due(1.002)
+
+    acks.reset()
+
+    assert not acks.due(2.0) and acks.pending == 0
+
+def test_immediate_ack_cases():
+    """Testing de ACK inmediato: fuera de orden, el que cierra el hueco, ultimo fragmento y every=1"""
+
+    acks = AckPolicy(every=2, delay=0.002)
+
+    assert acks.on_data(in_order=False, last=False, now=0.0)
+    assert acks.on_data(in_order=True, last=False, now=0.0)
+    assert not acks.on_data(in_order=True, last=False, now=0.0)
+    acks.reset()
+    assert acks.on_data(in_order=True, last=True, now=0.0)
+
+    assert AckPolicy(every=1).on_data(in_order=True, last=False, now=0.0)
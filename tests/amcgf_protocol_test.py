@@ -1,3 +1,5 @@
+import struct
+
 from lib.protocolo_amcgf import *
 
 def test_encode_decode_json():
@@ -52,6 +54,17 @@ def test_exception_truncated():
     except Exception as e:
         assert 'Truncated' in str(type(e).__name__)
 
+def test_exception_unknowntype():
+    """Testing de excepción UnknownType: un tipo de mensaje desconocido es un error de protocolo"""
+
+    encoded = Datagram(ver=VER_SW, typ=99, seq=3, payload=b'???').encode()
+
+    try:
+        Datagram.decode(encoded)
+        assert False, 'Should have raised UnknownType'
+    except ProtoError as e:
+        assert isinstance(e, UnknownType) and isinstance(e.__cause__, ValueError)
+
 def test_exception_frametoobig():
     """Testing de excepción FrameTooBig"""
 
@@ -61,6 +74,18 @@ def test_exception_frametoobig():
     except Exception as e:
         assert 'FrameTooBig' in str(type(e).__name__)
 
+def test_frametoobig_uses_negotiated_mss():
+    """Testing del tope de payload con un MSS acordado mayor al por defecto"""
+
+    datagram = make_data(seq=0, chunk=b'x' * MSS_MAX, ver=VER_GBN)
+    assert Datagram.decode(datagram.encode(mss=MSS_MAX)).payload == datagram.payload
+
+    try:
+        datagram.encode()
+        assert False, "Debería haber lanzado FrameTooBig"
+    except FrameTooBig:
+        pass
+
 def test_ack_flag_behavior():
     """Testing del comportamiento del FLAG_ACK"""
     
@@ -92,6 +117,30 @@ def test_make_req_download():
 
     assert download.typ == MsgType.REQUEST_DOWNLOAD
 
+def test_split_ranges():
+    """Los rangos cubren el archivo sin huecos, alineados a chunk."""
+    ranges = split_ranges(size=10 * MSS + 7, streams=4, chunk_size=MSS)
+
+    assert ranges[0][0] == 0 and ranges[-1][1] == 10 * MSS + 7
+    assert all(a[1] == b[0] and a[1] % MSS == 0 for a, b in zip(ranges, ranges[1:]))
+
+    # Nunca mas streams que chunks
+    assert split_ranges(size=MSS, streams=4, chunk_size=MSS) == [(0, MSS)]
+
+def test_chunk_span():
+    """Seqs que cubren un rango de bytes; un archivo vacio igual manda un chunk."""
+    assert chunk_span(2 * MSS, 5 * MSS + 1, MSS) == (2, 6)
+    assert chunk_span(0, 0, MSS) == (0, 1)
+
+def test_sack_blocks_roundtrip():
+    """Los seqs se agrupan en bloques contiguos y viajan en el payload del ACK."""
+    blocks = sack_blocks({9, 3, 4, 5, 7})
+    ack = Datagram.decode(make_ack(acknum=2, ver=VER_SR, sack=blocks).encode())
+
+    assert blocks == [(3, 6), (7, 8), (9, 10)]
+    assert sack_decode(ack.payload) == blocks and len(ack.payload) == 3 * SACK_BLOCK_SIZE
+    assert len(sack_blocks(range(0, 100, 2))) == SACK_MAX_BLOCKS
+
 def test_make_ok():
     ok = make_ok(ver=VER_GBN)
 
@@ -115,4 +164,55 @@ def test_mf_flag_behavior():
     encoded = datagram.encode()
     decoded = Datagram.decode(encoded)
 
-    assert decoded.typ == MsgType.DATA and (decoded.flags & FLAG_MF) == 0
\ No newline at end of file
+    assert decoded.typ == MsgType.DATA and (decoded.flags & FLAG_MF) == 0
+
+def test_encode_into_and_decode_view():
+    """Testing del codec sin copias: encode_into sobre buffer propio y decode_view"""
+
+    buf = bytearray(MTU + 8)
+    length = make_data(seq=7, chunk=b'Hallo Welt!', ver=VER_GBN, mf=True).encode_into(buf, offset=8)
+
+    view = decode_view(memoryview(buf)[8:8 + length])
+
+    assert length == HDR_SIZE + 11 \
+        and view.typ == MsgType.DATA \
+        and view.seq == 7 \
+        and view.flags & FLAG_MF \
+        and isinstance(view.payload, memoryview) \
+        and view.payload == b'Hallo Welt!'
+
+def test_encode_matches_reference_checksum():
+    """Testing de que el checksum parcheado en su lugar coincida con el calculo sobre header en 0"""
+
+    encoded = make_data(seq=3, chunk=b'abc', ver=VER_SR).encode()
+    zeroed = bytearray(encoded)
+    zeroed[CK_OFFSET:CK_OFFSET + 2] = b'\x00\x00'
+
+    assert int.from_bytes(encoded[CK_OFFSET:CK_OFFSET + 2], 'big') == inet_checksum(bytes(zeroed))
+
+def test_control_payload_tlv_roundtrip():
+    """Testing de REQUEST en TLV: los campos vuelven con su tipo, aunque el nombre tenga '=' o sea numerico"""
+
+    req = make_req_upload('123=a b', VER_SR, 5000, extra={PAYLOAD_MSS_KEY: MSS_MAX, PAYLOAD_ZIP_KEY: 'zlib', PAYLOAD_FEATURES_KEY: 0})
+    decoded = Datagram.decode(req.encode())
+
+    assert decoded.flags & FLAG_TLV \
+        and control_decode(decoded) == {PAYLOAD_FILENAME_KEY: '123=a b', PAYLOAD_FILE_SIZE_KEY: 5000, PAYLOAD_MSS_KEY: MSS_MAX, PAYLOAD_ZIP_KEY: 'zlib', PAYLOAD_FEATURES_KEY: 0} \
+        and len(decoded.payload) < len(payload_encode(control_decode(decoded)))
+
+def test_control_payload_text_fallback_and_unknown_tlv():
+    """Testing de compatibilidad: sin FLAG_TLV se usa el formato texto y un tipo TLV desconocido se saltea"""
+
+    err = make_err('Error: Archivo no existe', tlv=False)
+    unknown = struct.pack(TLV_HDR_FMT, 200, 3) + b'xyz' + tlv_encode({PAYLOAD_OFFSET_KEY: 0})
+
+    assert not err.flags & FLAG_TLV \
+        and control_decode(Datagram.decode(err.encode())) == {PAYLOAD_ERR_MSG_KEY: 'Error: Archivo no existe'} \
+        and tlv_decode(unknown) == {PAYLOAD_OFFSET_KEY: 0}
+
+    try:
+        tlv_decode(tlv_encode({PAYLOAD_FILENAME_KEY: 'abc'})[:-1])
+    except Truncated:
+        pass
+    else:
+        assert False
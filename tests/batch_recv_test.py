@@ -0,0 +1,45 @@
+from socket import AF_INET, SOCK_DGRAM, socket
+
+from lib.batch_recv import BatchReceiver
+
+def _pair():
+    server = socket(AF_INET, SOCK_DGRAM)
+    server.bind(('127.0.0.1', 0))
+    client = socket(AF_INET, SOCK_DGRAM)
+    client.bind(('127.0.0.1', 0))
+    return server, client
+
+def test_recv_batch_gets_queued_datagrams():
+    """Testing de la recepcion en lote: una llamada trae todo lo encolado, con su direccion"""
+
+    server, client = _pair()
+    receiver = BatchReceiver(server, batch=8)
+
+    for i in range(5):
+        client.sendto(bytes([i]) * (i + 1), server.getsockname())
+
+    batch = receiver.recv_batch()
+    while len(batch) < 5:
+        batch += receiver.recv_batch()
+
+    assert [data for data, _ in batch] == [bytes([i]) * (i + 1) for i in range(5)]
+    assert all(addr == client.getsockname() for _, addr in batch)
+
+    server.setblocking(False)
+    assert receiver.recv_batch(block=False) == []
+
+    server.close()
+    client.close()
+
+def test_recv_batch_fallback():
+    """Testing del fallback con recvfrom"""
+
+    server, client = _pair()
+    receiver = BatchReceiver(server, batch=8)
+    receiver.enabled = False
+
+    client.sendto(b'hola', server.getsockname())
+    assert receiver.recv_batch() == [(b'hola', client.getsockname())]
+
+    server.close()
+    client.close()
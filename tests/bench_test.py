@@ -0,0 +1,35 @@
+from lib.bench import Bench, compare, parse_size
+
+def test_parse_size():
+    """Testing de los tamaños de la matriz"""
+
+    assert parse_size('64K') == 65536 and parse_size('16m') == 16 * 1024 ** 2 and parse_size('1500') == 1500
+
+def test_compare_flags_regressions_beyond_threshold():
+    """Testing de la comparacion: se marca la caida de goodput, la suba de CPU y el caso que deja de andar"""
+
+    baseline = [
+        {'key': 'upload/SR/clean/1', 'ok': True, 'goodput_mbps': 100.0, 'cpu_s_per_mb': 0.1},
+        {'key': 'upload/SR/lossy/1', 'ok': True, 'goodput_mbps': 10.0, 'cpu_s_per_mb': 0.2},
+        {'key': 'download/SR/clean/1', 'ok': True, 'goodput_mbps': 50.0, 'cpu_s_per_mb': 0.1},
+    ]
+    results = [
+        {'key': 'upload/SR/clean/1', 'ok': True, 'goodput_mbps': 95.0, 'cpu_s_per_mb': 0.15},
+        {'key': 'upload/SR/lossy/1', 'ok': True, 'goodput_mbps': 8.0, 'cpu_s_per_mb': 0.2},
+        {'key': 'download/SR/clean/1', 'ok': False, 'goodput_mbps': 0.0, 'cpu_s_per_mb': 0.0},
+        {'key': 'download/SR/lossy/1', 'ok': True, 'goodput_mbps': 1.0, 'cpu_s_per_mb': 9.0},
+    ]
+
+    regressions = compare(results, baseline, threshold=0.1)
+
+    assert [r.split(':')[0] for r in regressions] == ['upload/SR/clean/1', 'upload/SR/lossy/1', 'download/SR/clean/1'] \
+        and 'CPU' in regressions[0] and 'goodput' in regressions[1] and 'failed' in regressions[2]
+
+def test_bench_case_through_lossy_link(tmp_path):
+    """Testing de un caso de la matriz: upload y download correctos, con retransmisiones por la perdida"""
+
+    upload, download = Bench(workdir=str(tmp_path)).run_case('SR', 'lossy', 256 * 1024)
+
+    assert upload.ok and download.ok \
+        and upload.goodput_mbps > 0 and download.goodput_mbps > 0 \
+        and upload.retransmissions > 0 and download.retransmissions > 0
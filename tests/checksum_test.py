@@ -0,0 +1,45 @@
+import random
+
+from lib.checksum import BACKENDS, checksum_batch, checksum_reference, checksum_update
+from lib.protocolo_amcgf import *
+
+def test_backends_match_reference():
+    """Testing de que todos los backends den igual que la implementacion de referencia"""
+
+    rnd = random.Random(1071)
+    vectors = [b'', b'\x00', b'\xff\xff', bytes(MTU)] + [rnd.randbytes(rnd.randint(1, MTU)) for _ in range(200)]
+
+    for name, fn in BACKENDS.items():
+        for v in vectors:
+            assert fn(v) == checksum_reference(v), f'{name} difiere para largo {len(v)}'
+
+def test_checksum_batch():
+    """Testing del calculo por lotes"""
+
+    frames = [b'Hallo', b'Welt!', b'', b'x' * MSS]
+
+    assert checksum_batch(frames) == [checksum_reference(f) for f in frames]
+
+def test_incremental_update():
+    """Testing de la actualizacion incremental de checksum (RFC 1624)"""
+
+    rnd = random.Random(1624)
+
+    for _ in range(200):
+        datagram = make_data(seq=rnd.getrandbits(32), chunk=rnd.randbytes(64), ver=VER_GBN)
+        frame = bytearray(datagram.encode())
+
+        old_ck = int.from_bytes(frame[CK_OFFSET:CK_OFFSET + 2], 'big')
+        old_seq = datagram.seq
+        datagram.seq = rnd.getrandbits(32)
+
+        assert checksum_update(old_ck, old_seq, datagram.seq) == int.from_bytes(datagram.encode()[CK_OFFSET:CK_OFFSET + 2], 'big')
+
+def test_patch_ack_seq():
+    """Testing de parcheo de ack/seq sobre un frame ya codificado"""
+
+    frame = bytearray(make_ack(acknum=1, ver=VER_SR).encode())
+    patch_ack_seq(frame, ack=70000, seq=5)
+    datagram = Datagram.decode(bytes(frame))
+
+    assert datagram.typ == MsgType.ACK and datagram.ack == 70000 and datagram.seq == 5
@@ -0,0 +1,56 @@
+from lib.chunk_cache import ENTRY_OVERHEAD, ChunkCache
+from lib.file_handler import FileHandler
+from lib.gbn import GoBackN
+from lib.protocolo_amcgf import *
+
+class FakeSocket:
+    def sendto(self, data, addr):
+        pass
+
+def test_lru_evicts_within_budget():
+    """Testing del LRU: con el presupuesto lleno se descarta el chunk usado hace mas tiempo"""
+
+    cache = ChunkCache(budget=3 * (100 + ENTRY_OVERHEAD))
+    for seq in range(3):
+        cache.put(('f', seq), (bytes(100), False, 100))
+
+    assert cache.get(('f', 0))
+    cache.put(('f', 3), (bytes(100), False, 100))
+
+    assert cache.get(('f', 1)) is None and cache.get(('f', 0)) and cache.get(('f', 3))
+    assert cache.counters() == {'cache_hits': 3, 'cache_misses': 1, 'cache_evictions': 1, 'cache_bytes': cache.budget}
+
+def test_second_download_hits_compressed_chunks(tmp_path):
+    """Testing de dos descargas del mismo archivo: la segunda sale del cache ya comprimida y con las mismas metricas"""
+
+    (tmp_path / 'log.txt').write_bytes(b'linea de log repetida\n' * 200)
+    handler = FileHandler(str(tmp_path), cache=ChunkCache())
+
+    sent = []
+    for _ in range(2):
+        engine = GoBackN(sock=FakeSocket(), peer=('127.0.0.1', 0), zip='zlib')
+        with handler.get_file_chunks('log.txt', 1024) as chunks:
+            sent.append([(d.encode(), n) for d, n in chunks.frames(engine)])
+
+    assert sent[0] == sent[1] and sum(n for _, n in sent[1]) == 4400
+    assert Datagram.decode(sent[1][0][0]).flags & FLAG_ZIP and engine.codec.raw_bytes == 4400
+    assert handler.cache.counters()['cache_hits'] == len(sent[1])
+
+def test_upload_commit_invalidates_file(tmp_path):
+    """Testing de invalidacion: al sobrescribir el archivo con un upload se liberan sus chunks y se sirve el nuevo"""
+
+    (tmp_path / 'f.bin').write_bytes(b'viejo')
+    handler = FileHandler(str(tmp_path), cache=ChunkCache())
+    engine = GoBackN(sock=FakeSocket(), peer=('127.0.0.1', 0))
+
+    with handler.get_file_chunks('f.bin', 1024) as chunks:
+        list(chunks.frames(engine))
+    assert handler.cache.counters()['cache_bytes'] > 0
+
+    writer = handler.open_writer('f.bin')
+    writer.write(b'nuevo contenido')
+    writer.commit()
+    assert handler.cache.counters()['cache_bytes'] == 0
+
+    with handler.get_file_chunks('f.bin', 1024) as chunks:
+        assert [d.payload for d, _ in chunks.frames(engine)] == [b'nuevo contenido']
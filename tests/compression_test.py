@@ -0,0 +1,54 @@
+import os
+import zlib
+
+from lib.compression import CODECS, ChunkCodec, pick_codec
+from lib.gbn import GoBackN
+from lib.protocolo_amcgf import *
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+
+    def sendto(self, data, addr):
+        self.sent.append(data)
+
+def test_pick_codec():
+    """Testing de la negociacion: se elige el primer codec ofrecido que se soporta"""
+
+    assert pick_codec("brotli,zlib") == 'zlib'
+    assert pick_codec("brotli") is None and pick_codec(None) is None
+
+def test_incompressible_chunk_goes_raw():
+    """Testing de compresion: un chunk que no achica viaja crudo y cuenta igual en el ratio"""
+
+    codec = ChunkCodec(CODECS[0])
+    chunk = os.urandom(MSS)
+
+    payload, zipped = codec.compress(chunk)
+    assert not zipped and payload == chunk and codec.ratio == 1.0
+
+def test_engine_compresses_and_restores_chunks():
+    """Testing de compresion en el motor: el DATA viaja con FLAG_ZIP y el receptor entrega el chunk original"""
+
+    sender = GoBackN(sock=FakeSocket(), peer=('127.0.0.1', 0), zip='zlib')
+    receiver = GoBackN(sock=FakeSocket(), peer=('127.0.0.1', 0), zip='zlib')
+    chunk = b'linea de log repetida\n' * 40
+
+    datagram = sender.data_frame(0, chunk, mf=False)
+    assert datagram.flags & FLAG_ZIP and len(datagram.payload) < len(chunk)
+
+    delivered = receiver.deliver(Datagram.decode(datagram.encode()))
+    assert [d.payload for d in delivered] == [chunk] and receiver.complete
+    assert receiver.codec.ratio == sender.codec.ratio > 1
+
+def test_invalid_or_oversized_payloads_are_dropped():
+    """Testing de descompresion: un payload corrupto o que se infla mas alla del MSS se descarta sin ACK"""
+
+    receiver = GoBackN(sock=FakeSocket(), peer=('127.0.0.1', 0), zip='zlib')
+    bomb = zlib.compress(bytes(1_000_000))
+
+    for payload in (b'no es zlib', bomb, zlib.compress(bytes(MSS + 1))):
+        datagram = make_data(seq=0, chunk=payload, ver=VER_GBN, zipped=True)
+        assert receiver.deliver(Datagram.decode(datagram.encode())) == []
+
+    assert receiver.sock.sent == [] and receiver.expected_seq == 0 and receiver.codec.raw_bytes == 0
@@ -0,0 +1,39 @@
+from lib.congestion import NewReno, make_congestion_control
+
+def test_slow_start_then_avoidance():
+    """Testing de slow start (crecimiento exponencial) y congestion avoidance (lineal)"""
+
+    cc = NewReno(cwnd=1, ssthresh=8)
+    for ack in range(1, 8):
+        cc.on_ack(acked=1, ack=ack)
+
+    assert cc.cwnd == 8
+
+    for ack in range(8, 16):
+        cc.on_ack(acked=1, ack=ack)
+
+    assert 8.9 < cc.cwnd < 9.1
+
+def test_fast_retransmit_and_recovery():
+    """Testing de fast retransmit con 3 ACK duplicados, ACK parcial y salida de fast recovery"""
+
+    cc = NewReno(cwnd=16, ssthresh=64)
+
+    assert not cc.on_dup_ack(in_flight=16, next_seq=116)
+    assert not cc.on_dup_ack(in_flight=16, next_seq=116)
+    assert cc.on_dup_ack(in_flight=16, next_seq=116)
+    assert cc.in_recovery and cc.ssthresh == 8 and cc.cwnd == 11
+
+    assert cc.on_ack(acked=4, ack=105)
+    assert not cc.on_ack(acked=11, ack=116)
+    assert not cc.in_recovery and cc.cwnd == 8
+
+def test_timeout_resets_window():
+    """Testing de decremento multiplicativo ante timeout"""
+
+    cc = make_congestion_control('newreno', window=32)
+    cc.cwnd = 20
+    cc.on_timeout(in_flight=20)
+
+    assert cc.cwnd == 1 and cc.ssthresh == 10 and cc.window() == 1
+    assert make_congestion_control(None) is None
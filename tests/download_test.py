@@ -3,25 +3,78 @@ import subprocess
 from pathlib import Path
 from time import sleep
 
-def test_download_file():
+# Los procesos corren en tmp_path: lo descargado y los logs de metricas no quedan en el repo
+ROOT = Path(__file__).resolve().parent.parent
+
+def script(name):
+    return str(ROOT / 'src' / name)
+
+def test_download_file(tmp_path):
     server = subprocess.Popen([
-        'python3', 'src/start-server.py', '-H', '127.0.0.1', '-p', '2223', '-s', './'
-    ])
+        'python3', script('start-server.py'), '-H', '127.0.0.1', '-p', '2223', '-s', str(ROOT)
+    ], cwd=tmp_path)
 
     sleep(1)
 
     subprocess.run([
-        'python3', 'src/download.py', '-H', '127.0.0.1', '-p', '2223', '-d', 'tests/data/', '-n', 'net.py', '-r', 'SW'
-    ])
+        'python3', script('download.py'), '-H', '127.0.0.1', '-p', '2223', '-d', 'downloads/', '-n', 'net.py', '-r', 'SW'
+    ], cwd=tmp_path)
 
-    assert Path('tests/data/').is_dir() and Path('tests/data/net.py').is_file()
+    assert (tmp_path / 'downloads').is_dir() and (tmp_path / 'downloads' / 'net.py').is_file()
 
-    with open('tests/data/net.py') as file:
+    with open(tmp_path / 'downloads' / 'net.py') as file:
         got = file.read()
 
-        with open('net.py') as file:
+        with open(ROOT / 'net.py') as file:
             expected = file.read()
 
             assert got == expected
 
-    server.kill()
\ No newline at end of file
+    server.kill()
+
+def test_download_file_impaired_link(tmp_path):
+    server = subprocess.Popen([
+        'python3', script('start-server.py'), '-H', '127.0.0.1', '-p', '2229', '-s', str(ROOT / 'data')
+    ], cwd=tmp_path)
+    # Rafagas de perdida (Gilbert-Elliott) y un tope de ancho de banda como el de net.py
+    proxy = subprocess.Popen([
+        'python3', script('proxy.py'), '-p', '2230', '--server-port', '2229', '--ge', '0.02', '0.3', '--rate', '5', '--seed', '5'
+    ], cwd=tmp_path)
+
+    sleep(1)
+
+    result = subprocess.run([
+        'python3', script('download.py'), '-H', '127.0.0.1', '-p', '2230', '-d', 'downloads/', '-n', 'file.bin', '-r', 'GBN'
+    ], cwd=tmp_path)
+
+    with open(tmp_path / 'downloads' / 'file.bin', 'rb') as file:
+        got = file.read()
+
+        with open(ROOT / 'data' / 'file.bin', 'rb') as file:
+            expected = file.read()
+
+            assert result.returncode == 0 and got == expected
+
+    proxy.kill()
+    server.kill()
+
+def test_download_file_event_loop(tmp_path):
+    server = subprocess.Popen([
+        'python3', script('start-server.py'), '-H', '127.0.0.1', '-p', '2231', '-s', str(ROOT / 'data'), '-e', 'event'
+    ], cwd=tmp_path)
+
+    sleep(1)
+
+    result = subprocess.run([
+        'python3', script('download.py'), '-H', '127.0.0.1', '-p', '2231', '-d', 'downloads/', '-n', 'elultimoguardian.bin', '-r', 'SR'
+    ], cwd=tmp_path)
+
+    with open(tmp_path / 'downloads' / 'elultimoguardian.bin', 'rb') as file:
+        got = file.read()
+
+        with open(ROOT / 'data' / 'elultimoguardian.bin', 'rb') as file:
+            expected = file.read()
+
+            assert result.returncode == 0 and got == expected
+
+    server.kill()
@@ -0,0 +1,80 @@
+import os
+import threading
+import time
+
+from lib.event_server import EventServer, State
+from lib.file_handler import FileHandler
+from lib.protocolo_amcgf import *
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+
+    def sendto(self, data, addr):
+        self.sent.append(bytes(data))
+        return len(data)
+
+def test_session_error_drops_only_that_session(tmp_path):
+    """Testing del loop de eventos: una excepcion en una sesion la cierra a ella y el servidor sigue atendiendo"""
+
+    (tmp_path / 'f.bin').write_bytes(os.urandom(4096))
+    server = EventServer()
+    server.file_handler = FileHandler(str(tmp_path))
+    sock = FakeSocket()
+
+    bad, good = ('127.0.0.1', 1), ('127.0.0.1', 2)
+    for addr in (bad, good):
+        server._on_packet(sock, make_req_download('f.bin', VER_GBN).encode(), addr)
+    session = server.queues[bad]
+
+    def boom(datagram, now):
+        raise RuntimeError("boom")
+    session.on_datagram = boom
+
+    server._on_packet(sock, make_ack(acknum=1, ver=VER_GBN).encode(), bad)
+
+    assert session.state == State.CLOSED and bad not in server.queues and good in server.queues
+    assert server.metrics.errors == 1 and session.timer is None
+
+def test_malformed_requests_get_err(tmp_path):
+    """Testing de REQUESTs mal formados: TLV truncado, campos faltantes o de otro tipo se contestan con ERR sin abrir sesion"""
+
+    server = EventServer()
+    server.file_handler = FileHandler(str(tmp_path))
+    sock = FakeSocket()
+
+    truncated = make_req_upload('f.bin', VER_SR, 4096)
+    truncated.payload = truncated.payload[:-2]
+    requests = [
+        truncated,
+        Datagram(VER_SR, MsgType.REQUEST_UPLOAD, payload=b'filename=f.bin'),
+        Datagram(VER_SR, MsgType.REQUEST_UPLOAD, payload=b'filename=f.bin\nfile_size=mucho'),
+        Datagram(VER_SR, MsgType.REQUEST_DOWNLOAD, payload=b'filename=\xff'),
+    ]
+    for port, request in enumerate(requests, start=1):
+        server._on_packet(sock, request.encode(), ('127.0.0.1', port))
+
+    replies = [Datagram.decode(data) for data in sock.sent]
+    assert [reply.typ for reply in replies] == [MsgType.ERR] * len(requests)
+    assert all('mal formado' in control_decode(reply)[PAYLOAD_ERR_MSG_KEY] for reply in replies)
+    assert not server.queues and not list(tmp_path.iterdir()) and server.metrics.errors == len(requests)
+
+def test_missing_streams_expire_on_the_wheel(tmp_path):
+    """Testing de streams que no llegan: la espera vence en la rueda del loop, sin hilos, y descarta el archivo"""
+
+    server = EventServer()
+    server.file_handler = FileHandler(str(tmp_path))
+    server.idle_timeout = 0.05
+    threads = threading.active_count()
+
+    extra = {PAYLOAD_STREAMS_KEY: 2, PAYLOAD_STREAM_KEY: 0, PAYLOAD_TRANSFER_ID_KEY: 7}
+    server._on_packet(FakeSocket(), make_req_upload('f.bin', VER_GBN, 8192, extra=extra).encode(), ('127.0.0.1', 1))
+    transfer = server.queues[('127.0.0.1', 1)].transfer
+    assert transfer.streams == 2 and threading.active_count() == threads
+
+    time.sleep(0.1)
+    server._fire_timers()
+
+    # Vencen la espera de los streams y la sesion del stream 0, que tampoco recibio nada
+    assert transfer.failed and not server.transfers and not server.queues and server.metrics.expired == 2
+    assert not [p for p in tmp_path.iterdir() if p.name.endswith('.part')]
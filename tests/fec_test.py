@@ -0,0 +1,45 @@
+import os
+
+from lib.fec import FecDecoder, FecEncoder
+from lib.protocolo_amcgf import *
+
+def _group(n: int, last: bool = False) -> list[Datagram]:
+    return [make_data(seq=i, chunk=os.urandom(100 + 37 * i), ver=VER_GBN, mf=not (last and i == n - 1)) for i in range(n)]
+
+def _recover(packets: list[Datagram], lost: set[int], group: int, parity: int) -> dict[int, Datagram]:
+    encoder, decoder = FecEncoder(group, parity), FecDecoder(group)
+
+    parities = []
+    for datagram in packets:
+        parities += encoder.add(datagram)
+        if datagram.seq not in lost:
+            decoder.on_data(datagram)
+
+    recovered = {}
+    for datagram in parities:
+        for data in decoder.on_parity(Datagram.decode(datagram.encode())):
+            recovered[data.seq] = data
+    return recovered
+
+def test_xor_recovers_one_loss():
+    """Testing de FEC con una paridad (XOR): reconstruye el paquete perdido con su largo original"""
+
+    packets = _group(4)
+    recovered = _recover(packets, {2}, group=4, parity=1)
+
+    assert list(recovered) == [2] and recovered[2].payload == packets[2].payload
+
+def test_reed_solomon_recovers_two_losses():
+    """Testing de FEC con dos paridades: reconstruye dos perdidas del grupo, incluido el ultimo fragmento"""
+
+    packets = _group(6, last=True)
+    recovered = _recover(packets, {1, 5}, group=8, parity=2)
+
+    assert sorted(recovered) == [1, 5]
+    assert recovered[1].payload == packets[1].payload and recovered[5].payload == packets[5].payload
+    assert not recovered[5].flags & FLAG_MF
+
+def test_fec_gives_up_with_too_many_losses():
+    """Testing de FEC: con mas perdidas que paridades no inventa paquetes"""
+
+    assert not _recover(_group(4), {0, 1}, group=4, parity=1)
@@ -0,0 +1,85 @@
+from lib.file_handler import FileHandler, MmapChunkSource
+from lib.transfer import Transfer
+
+def test_chunk_source_mf_and_reslice(tmp_path):
+    """Testing de la fuente de chunks: MF por offset y re-corte de cualquier seq"""
+
+    path = tmp_path / 'file.bin'
+    path.write_bytes(bytes(range(10)))
+
+    with MmapChunkSource(str(path), 4) as chunks:
+        got = [(bytes(payload), mf) for payload, mf in chunks]
+        assert got == [(bytes(range(4)), True), (bytes(range(4, 8)), True), (bytes([8, 9]), False)]
+        assert bytes(chunks.chunk(1)[0]) == bytes(range(4, 8))
+
+def test_chunk_source_empty_file(tmp_path):
+    """Testing de un archivo vacio: un unico chunk vacio sin MF"""
+
+    path = tmp_path / 'empty.bin'
+    path.write_bytes(b'')
+
+    with MmapChunkSource(str(path), 4) as chunks:
+        assert [(bytes(payload), mf) for payload, mf in chunks] == [(b'', False)]
+
+def test_writer_publishes_on_commit(tmp_path):
+    """Testing del escritor: el archivo final aparece recien en commit y abort no deja rastros"""
+
+    handler = FileHandler(str(tmp_path))
+
+    writer = handler.open_writer('out.bin')
+    writer.write(b'hola')
+    assert not (tmp_path / 'out.bin').exists()
+    writer.commit()
+    assert (tmp_path / 'out.bin').read_bytes() == b'hola'
+
+    writer = handler.open_writer('out.bin')
+    writer.write(b'otro')
+    writer.abort()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['out.bin']
+
+def test_writer_out_of_order_chunks(tmp_path):
+    """Testing de escritura por offset: chunks fuera de orden y preasignacion recortada al cerrar"""
+
+    handler = FileHandler(str(tmp_path))
+
+    writer = handler.open_writer('out.bin', size=64, chunk_size=4)
+    writer.write_chunk(2, b'ij')
+    writer.write_chunk(0, b'abcd')
+    writer.write_chunk(1, b'efgh')
+    writer.commit()
+
+    assert (tmp_path / 'out.bin').read_bytes() == b'abcdefghij'
+
+def test_writer_resume_from_journal(tmp_path):
+    """Testing de reanudacion: suspend deja el journal y un nuevo escritor conserva lo recibido"""
+
+    handler = FileHandler(str(tmp_path))
+
+    writer = handler.open_writer('out.bin', size=10, chunk_size=4)
+    writer.write_chunk(0, b'abcd')
+    writer.write_chunk(1, b'efgh')
+    writer.suspend(2)
+
+    assert handler.resume_offset('out.bin', 10, 4) == 8
+    assert handler.resume_offset('out.bin', 11, 4) == 0
+
+    writer = handler.open_writer('out.bin', size=10, chunk_size=4, offset=8)
+    assert writer.offset == 8
+    writer.write_chunk(2, b'ij')
+    writer.commit()
+
+    assert (tmp_path / 'out.bin').read_bytes() == b'abcdefghij'
+    assert handler.read_journal('out.bin') is None
+
+def test_transfer_discarded_when_a_stream_never_joins(tmp_path):
+    """Testing de un upload en varios streams al que le falta uno: se descarta sin publicar ni dejar temporales"""
+
+    handler = FileHandler(str(tmp_path))
+    transfer = Transfer(writer=handler.open_writer('out.bin', size=8, chunk_size=4, resumable=False), streams=2)
+
+    transfer.join()
+    transfer.write_chunk(0, b'hola')
+    assert transfer.expire_missing()
+
+    assert not transfer.end_stream(1) and transfer.write_chunk(1, b'chau') == 0
+    assert list(tmp_path.iterdir()) == []
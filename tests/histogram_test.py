@@ -0,0 +1,43 @@
+from lib.histogram import Histogram, Series
+from lib.logger import Logger
+
+def test_histogram_percentiles_within_error():
+    """Testing de percentiles: sobre 1..100000 quedan a menos del 1.6% del valor exacto"""
+
+    hist = Histogram()
+    for value in range(1, 100_001):
+        hist.record(value)
+
+    for p in (50, 90, 99):
+        exact = p * 1000
+        assert abs(hist.percentile(p) - exact) <= exact * 0.016
+
+    assert hist.max == 100_000 and hist.percentile(100) == 100_000 and abs(hist.mean - 50_000.5) < 1e-6
+
+def test_series_memory_is_bounded():
+    """Testing del historial: nunca supera el limite y cubre desde el primer punto hasta el final"""
+
+    series = Series(limit=64)
+    for i in range(100_000):
+        series.append((i, i))
+
+    points = list(series)
+    assert len(series) < 64 and points[0] == (0, 0) and points[-1][0] > 90_000 and series.last == (99_999, 99_999)
+
+def test_logger_merges_stream_histograms(tmp_path):
+    """Testing del logger: los RTT de cada stream se suman al histograma principal, con memoria fija"""
+
+    logger = Logger(output_dir=str(tmp_path))
+    child = logger.stream_logger()
+    size = len(logger.rtt_hist.counts)
+
+    for _ in range(10_000):
+        logger.log_rtt(2.0)
+        child.log_rtt(8.0)
+    logger.merge_stream(0, child)
+    logger.log_final()
+
+    assert logger.rtt_hist.count == 20_000 and len(logger.rtt_hist.counts) == size \
+        and abs(logger.rtt_hist.percentile(50) / 1000 - 2.0) < 0.05 \
+        and abs(logger.rtt_hist.percentile(99) / 1000 - 8.0) < 0.1 \
+        and "RTT p50/p90/p99/max" in (tmp_path / "metrics.txt").read_text()
@@ -0,0 +1,48 @@
+import random
+
+from lib.impair import Impairment, Link
+from lib.protocolo_amcgf import *
+
+def _decisions(seed: int, spec: Impairment) -> list:
+    link = Link(spec, random.Random(seed))
+    return [link.process(bytes([i % 256]) * 64, i * 0.001) for i in range(500)]
+
+def test_same_seed_same_decisions():
+    """Testing de reproducibilidad: con la misma semilla el enlace toma las mismas decisiones"""
+
+    spec = Impairment(loss=0.1, delay=0.002, jitter=0.001, reorder=0.05, duplicate=0.05, corrupt=0.05)
+
+    assert _decisions(7, spec) == _decisions(7, spec) and _decisions(7, spec) != _decisions(8, spec)
+
+def test_gilbert_elliott_losses_come_in_bursts():
+    """Testing de Gilbert-Elliott: misma perdida media que la aleatoria pero en rafagas mas largas"""
+
+    def bursts(spec: Impairment) -> tuple[float, float]:
+        link = Link(spec, random.Random(1))
+        lost = [not link.process(b'x', 0) for _ in range(20_000)]
+        runs = [len(run) for run in ''.join('L' if l else '.' for l in lost).split('.') if run]
+        return sum(lost) / len(lost), sum(runs) / len(runs)
+
+    # Estado malo el 10% del tiempo (p / (p + r)), perdiendo todo
+    ge_rate, ge_burst = bursts(Impairment(ge_p=0.02, ge_r=0.18))
+    random_rate, random_burst = bursts(Impairment(loss=0.1))
+
+    assert abs(ge_rate - 0.1) < 0.03 and abs(random_rate - 0.1) < 0.01 and ge_burst > 3 * random_burst
+
+def test_rate_cap_and_corruption():
+    """Testing del tope de ancho de banda (los paquetes salen espaciados y la cola descarta) y de la corrupcion (BadChecksum)"""
+
+    link = Link(Impairment(rate=8_000_000, queue=4000, corrupt=1.0), random.Random(0))
+    frame = make_data(seq=1, chunk=b'a' * 984, ver=VER_SR).encode()
+
+    out = [link.process(frame, 0.0) for _ in range(6)]
+    times = [round(deliveries[0][0], 6) for deliveries in out if deliveries]
+
+    assert times == [0.001, 0.002, 0.003, 0.004, 0.005] and link.stats['queue_drops'] == 1
+
+    try:
+        Datagram.decode(out[0][0][1])
+    except BadChecksum:
+        pass
+    else:
+        assert False
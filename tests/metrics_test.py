@@ -0,0 +1,69 @@
+from queue import Queue
+
+from lib.metrics import MetricsExporter, SharedCounters, to_prometheus
+from lib.protocolo_amcgf import *
+from lib.server import Server
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+
+    def sendto(self, data, addr):
+        self.sent.append(data)
+
+def test_stats_request_answers_server_counters():
+    """Testing de STATS: el servidor contesta con sesiones activas, colas, contadores y percentiles de RTT"""
+
+    server = Server()
+    queue = Queue()
+    queue.put(b'x')
+    server.queues[('127.0.0.1', 1)] = queue
+    server.metrics.add(uploads=2, bytes_in=4096)
+    for rtt in (0.001, 0.002, 0.010):
+        server.metrics.record_rtt(rtt)
+
+    sock = FakeSocket()
+    assert server._answer_stats(sock, ('127.0.0.1', 2), make_stats().encode())
+    assert not server._answer_stats(sock, ('127.0.0.1', 2), make_bye(VER_SW).encode())
+
+    reply = Datagram.decode(sock.sent[0])
+    stats = payload_decode(reply.payload)
+    assert reply.typ == MsgType.STATS and reply.flags & FLAG_ACK and len(sock.sent) == 1 \
+        and stats['active_sessions'] == 1 and stats['queue_depth'] == 1 \
+        and stats['uploads'] == 2 and stats['bytes_in'] == 4096 \
+        and stats['rtt_samples'] == 3 and stats['rtt_max_us'] == 10_000
+
+def test_stats_adds_up_all_workers():
+    """Testing de STATS con varios workers: cualquier worker contesta los contadores sumados de todos"""
+
+    shared = SharedCounters(2)
+    workers = [Server(), Server()]
+    for row, server in enumerate(workers):
+        server.metrics.share(shared, row)
+
+    workers[0].metrics.add(uploads=1, bytes_in=100)
+    workers[1].metrics.add(uploads=2, bytes_in=50, errors=1)
+
+    sock = FakeSocket()
+    workers[1]._answer_stats(sock, ('127.0.0.1', 2), make_stats().encode())
+    stats = payload_decode(Datagram.decode(sock.sent[0]).payload)
+
+    assert stats['workers'] == 2 and stats['uploads'] == 3 and stats['bytes_in'] == 150 and stats['errors'] == 1
+    assert shared.total() == {**workers[0].metrics.to_dict(), 'workers': 2, 'uploads': 3, 'bytes_in': 150, 'errors': 1}
+
+def test_exporter_writes_prometheus_text(tmp_path):
+    """Testing del exportador: contadores con _total, gauges y el RTT como summary en segundos"""
+
+    server = Server()
+    server.metrics.add(downloads=1)
+    server.metrics.record_rtt(0.004)
+
+    path = tmp_path / "amcgf.prom"
+    MetricsExporter(str(path), server.stats).write()
+    text = path.read_text()
+
+    assert text == to_prometheus(server.stats()) \
+        and "amcgf_downloads_total 1\n" in text \
+        and "# TYPE amcgf_active_sessions gauge\namcgf_active_sessions 0\n" in text \
+        and 'amcgf_rtt_seconds{quantile="0.99"} 0.004' in text \
+        and "amcgf_rtt_seconds_count 1\n" in text
@@ -0,0 +1,26 @@
+from lib.protocolo_amcgf import *
+from lib.server import Server
+
+def test_server_clamps_mss_and_window():
+    """Testing del handshake: MSS y ventana pedidos se acotan a los topes del servidor"""
+
+    server = Server(mss=1200, window=16)
+    features = server._accept_features(VER_GBN, {PAYLOAD_MSS_KEY: MSS_MAX, PAYLOAD_WINDOW_KEY: 64})
+
+    assert features[PAYLOAD_MSS_KEY] == 1200 and features[PAYLOAD_WINDOW_KEY] == 16
+
+def test_old_client_keeps_default_mss():
+    """Testing del handshake: un cliente que no pide MSS usa el MSS por defecto"""
+
+    features = Server(mss=MSS_MAX)._accept_features(VER_SW, {})
+
+    assert features[PAYLOAD_MSS_KEY] == MSS and features[PAYLOAD_FEATURES_KEY] == 0
+
+def test_server_accepts_only_applicable_features():
+    """Testing del mapa de features: SACK solo con SR, FEC solo con ventana"""
+
+    offered = {PAYLOAD_FEATURES_KEY: FEATURE_SACK | FEATURE_FEC | FEATURE_ZIP, PAYLOAD_FEC_GROUP_KEY: 8, PAYLOAD_ZIP_KEY: 'zlib'}
+
+    assert Server()._accept_features(VER_SR, offered)[PAYLOAD_FEATURES_KEY] == FEATURE_SACK | FEATURE_FEC | FEATURE_ZIP
+    assert Server()._accept_features(VER_GBN, offered)[PAYLOAD_FEATURES_KEY] == FEATURE_FEC | FEATURE_ZIP
+    assert Server()._accept_features(VER_SW, offered)[PAYLOAD_FEATURES_KEY] == FEATURE_ZIP
@@ -0,0 +1,196 @@
+from lib.protocolo_amcgf import *
+from lib.sw import StopAndWait
+from lib.gbn import GoBackN
+from lib.sr import SelectiveRepeat
+
+class FakeSocket:
+    """Socket falso que guarda lo enviado para inspeccionarlo"""
+
+    def __init__(self):
+        self.sent = []
+
+    def sendto(self, data, addr):
+        self.sent.append(Datagram.decode(bytes(data)))
+
+def test_gbn_receiver_discards_out_of_order():
+    """Testing del receptor acumulativo: descarta fuera de orden y repite el ACK esperado"""
+
+    sock = FakeSocket()
+    gbn = GoBackN(sock=sock, peer=('127.0.0.1', 0))
+
+    assert not gbn.accept_data(make_data(seq=1, chunk=b'b', ver=VER_GBN, mf=True))
+    assert sock.sent[-1].ack == 0
+
+    assert gbn.accept_data(make_data(seq=0, chunk=b'a', ver=VER_GBN, mf=True))
+    assert sock.sent[-1].ack == 1 and not gbn.complete
+
+def test_gbn_sender_slides_window():
+    """Testing del emisor Go-Back-N: llena la ventana, el ACK acumulativo la desliza y sin nada en vuelo se apaga el timer"""
+
+    sock = FakeSocket()
+    gbn = GoBackN(sock=sock, peer=('127.0.0.1', 0), window=4, congestion=None)
+
+    for seq in range(4):
+        gbn.transmit(make_data(seq=seq, chunk=b'x', ver=VER_GBN, mf=True))
+    assert not gbn.can_send() and gbn.in_flight() == 4 and gbn.deadline is not None
+
+    gbn.on_ack(make_ack(acknum=2, ver=VER_GBN))
+    assert gbn.base == 2 and gbn.can_send() and gbn.deadline is not None
+
+    gbn.on_ack(make_ack(acknum=4, ver=VER_GBN))
+    assert gbn.in_flight() == 0 and gbn.deadline is None
+    assert [d.seq for d in sock.sent] == [0, 1, 2, 3] and gbn.retransmissions == 0
+
+def test_gbn_sender_goes_back_within_cwnd():
+    """Testing del timeout en Go-Back-N: vuelve a base y reenvia solo lo que permite la ventana de congestion"""
+
+    sock = FakeSocket()
+    gbn = GoBackN(sock=sock, peer=('127.0.0.1', 0), window=8)
+
+    for seq in range(4):
+        gbn.transmit(make_data(seq=seq, chunk=b'x', ver=VER_GBN, mf=True))
+    sock.sent.clear()
+
+    gbn.on_timeout()
+    assert gbn.cc.window() == 1 and [d.seq for d in sock.sent] == [0] and gbn.send_ptr == 1
+
+    # Slow start: el ACK de base abre la ventana a 2 y sigue el go-back
+    gbn.on_ack(make_ack(acknum=1, ver=VER_GBN))
+    assert [d.seq for d in sock.sent] == [0, 1, 2] and gbn.retransmissions == 3
+
+def test_gbn_sender_fast_retransmit():
+    """Testing de fast retransmit: al tercer ACK duplicado se reenvia desde base una sola vez"""
+
+    sock = FakeSocket()
+    gbn = GoBackN(sock=sock, peer=('127.0.0.1', 0), window=8)
+
+    for seq in range(4):
+        gbn.transmit(make_data(seq=seq, chunk=b'x', ver=VER_GBN, mf=True))
+    sock.sent.clear()
+
+    for _ in range(2):
+        gbn.on_ack(make_ack(acknum=0, ver=VER_GBN))
+    assert not sock.sent
+
+    gbn.on_ack(make_ack(acknum=0, ver=VER_GBN))
+    assert [d.seq for d in sock.sent] == [0, 1, 2, 3] and gbn.cc.in_recovery
+
+    gbn.on_ack(make_ack(acknum=0, ver=VER_GBN))
+    assert len(sock.sent) == 4
+
+def test_gbn_receiver_delays_in_order_acks():
+    """Testing del ACK retardado: con ventana se confirma de a dos; Stop-and-Wait confirma cada paquete"""
+
+    sock = FakeSocket()
+    gbn = GoBackN(sock=sock, peer=('127.0.0.1', 0), ack_every=2)
+
+    gbn.accept_data(make_data(seq=0, chunk=b'a', ver=VER_GBN, mf=True))
+    assert not sock.sent
+
+    gbn.accept_data(make_data(seq=1, chunk=b'b', ver=VER_GBN, mf=True))
+    assert len(sock.sent) == 1 and sock.sent[-1].ack == 2
+
+    sw = StopAndWait(sock=sock, peer=('127.0.0.1', 0), ack_every=2)
+    sw.accept_data(make_data(seq=0, chunk=b'a', ver=VER_SW, mf=True))
+    assert len(sock.sent) == 2
+
+def test_sr_receiver_reorders():
+    """Testing del receptor de Selective Repeat: acepta fuera de orden una sola vez y avanza el acumulado"""
+
+    sock = FakeSocket()
+    sr = SelectiveRepeat(sock=sock, peer=('127.0.0.1', 0), window=4)
+
+    assert sr.accept_data(make_data(seq=2, chunk=b'c', ver=VER_SR, mf=False))
+    assert sr.accept_data(make_data(seq=1, chunk=b'b', ver=VER_SR, mf=True))
+    assert not sr.accept_data(make_data(seq=1, chunk=b'b', ver=VER_SR, mf=True))
+    assert sock.sent[-1].ack == 0 and sock.sent[-1].seq == 2 and not sr.complete
+
+    assert sr.accept_data(make_data(seq=0, chunk=b'a', ver=VER_SR, mf=True))
+    assert sock.sent[-1].ack == 3 and sr.complete and not sr.received
+
+def test_sr_sender_resends_only_unacked():
+    """Testing de reenvio selectivo: solo vuelve a enviar los paquetes sin ACK"""
+
+    sock = FakeSocket()
+    sr = SelectiveRepeat(sock=sock, peer=('127.0.0.1', 0), window=4)
+
+    for seq in range(3):
+        sr.transmit(make_data(seq=seq, chunk=b'x', ver=VER_SR, mf=True))
+
+    sr.on_ack(make_ack(acknum=0, ver=VER_SR, seq=2))
+    sock.sent.clear()
+
+    for seq in sr.timers:
+        sr.timers[seq] = 0
+    sr.timer_heap = [(0, seq) for seq in sr.timers]
+    sr.on_timeout()
+
+    assert sorted(d.seq for d in sock.sent) == [0, 2] and sr.retransmissions == 2
+
+def test_sr_sack_receiver_reports_blocks():
+    """Testing de SACK en el receptor: el ACK lleva los bloques recibidos por encima del acumulado"""
+
+    sock = FakeSocket()
+    sr = SelectiveRepeat(sock=sock, peer=('127.0.0.1', 0), window=8, sack=True)
+
+    for seq in (2, 3, 5):
+        sr.accept_data(make_data(seq=seq, chunk=b'x', ver=VER_SR, mf=True))
+
+    assert sock.sent[-1].ack == 0 and sack_decode(sock.sent[-1].payload) == [(2, 4), (5, 6)]
+
+def test_sr_sack_sender_resends_holes():
+    """Testing de SACK en el emisor: confirma los bloques y reenvia el hueco sin esperar el timer"""
+
+    sock = FakeSocket()
+    sr = SelectiveRepeat(sock=sock, peer=('127.0.0.1', 0), window=8, sack=True, congestion=None)
+
+    for seq in range(5):
+        sr.transmit(make_data(seq=seq, chunk=b'x', ver=VER_SR, mf=True))
+    sock.sent.clear()
+
+    sr.on_ack(make_ack(acknum=1, ver=VER_SR, seq=5, sack=[(2, 5)]))
+
+    assert sr.base == 1 and sorted(sr.timers) == [1]
+    assert [d.seq for d in sock.sent] == [1] and sr.retransmissions == 1
+
+def test_gbn_fec_receiver_recovers_and_acks():
+    """Testing de FEC en el receptor acumulativo: el PARITY cubre el hueco y acepta lo que seguia en orden"""
+
+    sender = GoBackN(sock=FakeSocket(), peer=('127.0.0.1', 0), window=8, congestion=None, fec_group=4)
+    for seq in range(4):
+        sender.transmit(make_data(seq=seq, chunk=bytes([seq]) * 10, ver=VER_GBN, mf=True))
+    frames = sender.sock.sent
+    assert [d.typ for d in frames].count(MsgType.PARITY) == 1 and sender.parity_sent == 1
+
+    sock = FakeSocket()
+    gbn = GoBackN(sock=sock, peer=('127.0.0.1', 0), fec_group=4)
+    delivered = [d.seq for frame in frames if frame.seq != 1 for d in gbn.deliver(frame)]
+
+    assert delivered == [0, 1, 2, 3] and gbn.expected_seq == 4 and gbn.recovered == 1
+    assert sock.sent[-1].ack == 4
+
+def test_fec_receiver_keeps_only_open_groups():
+    """Testing de memoria del FEC: en una transferencia sin perdidas el receptor solo guarda el grupo en curso"""
+
+    for engine in (GoBackN, SelectiveRepeat):
+        sender = engine(sock=FakeSocket(), peer=('127.0.0.1', 0), window=2000, congestion=None, fec_group=4)
+        receiver = engine(sock=FakeSocket(), peer=('127.0.0.1', 0), window=2000, fec_group=4)
+        for seq in range(2000):
+            sender.transmit(make_data(seq=seq, chunk=bytes(100), ver=sender.ver, mf=seq < 1999))
+
+        for frame in sender.sock.sent:
+            receiver.deliver(frame)
+
+        units = sum(len(g.units) for g in receiver.fec_rx.groups.values())
+        assert receiver.expected_seq == 2000 and units < 4 and receiver.fec_rx.max_groups == 502
+
+    # Un seq mas alla de la ventana o de un grupo ya entregado no se guarda
+    receiver.fec_rx.on_data(make_data(seq=10**6, chunk=b'x', ver=VER_SR))
+    receiver.fec_rx.on_data(make_data(seq=0, chunk=b'x', ver=VER_SR))
+    assert sum(len(g.units) for g in receiver.fec_rx.groups.values()) == units
+
+def test_unknown_type_is_dropped():
+    """Testing de recepcion: un datagrama con un tipo desconocido se descarta como uno corrupto"""
+
+    sw = StopAndWait(sock=FakeSocket(), peer=('127.0.0.1', 0))
+    assert sw._safe_decode(Datagram(ver=VER_SW, typ=99).encode()) is None
@@ -0,0 +1,44 @@
+from lib.rtt import RttEstimator
+
+def test_first_sample():
+    """Testing de la primera muestra: SRTT = R, RTTVAR = R/2, RTO = SRTT + 4 * RTTVAR"""
+
+    rtt = RttEstimator(rto=0.025, min_rto=0.001, max_rto=1.0)
+    rtt.sample(0.010)
+
+    assert abs(rtt.srtt - 0.010) < 1e-9 and abs(rtt.rttvar - 0.005) < 1e-9 and abs(rtt.rto - 0.030) < 1e-9
+
+def test_converges_to_stable_rtt():
+    """Testing de convergencia del RTO con muestras estables"""
+
+    rtt = RttEstimator(rto=0.025, min_rto=0.001, max_rto=1.0)
+    for _ in range(100):
+        rtt.sample(0.020)
+
+    assert abs(rtt.srtt - 0.020) < 1e-6 and rtt.rto < 0.022
+
+def test_backoff_is_capped_and_reset():
+    """Testing del backoff exponencial con tope y su reinicio"""
+
+    rtt = RttEstimator(rto=0.025, min_rto=0.001, max_rto=0.2)
+    rtt.sample(0.010)
+    base = rtt.rto
+
+    for _ in range(10):
+        rtt.backoff()
+
+    assert rtt.rto == 0.2 and rtt.backoffs == 10
+
+    rtt.reset_backoff()
+
+    assert rtt.rto == base and rtt.backoffs == 0
+
+def test_reset_backoff_without_samples():
+    """Testing del reinicio sin muestras: tras timeouts hasta el tope se vuelve al RTO inicial, no a RTO / 2^n"""
+
+    rtt = RttEstimator(rto=0.025, min_rto=0.005, max_rto=1.0)
+    for _ in range(8):
+        rtt.backoff()
+    assert rtt.rto == 1.0
+
+    assert rtt.reset_backoff() == 0.025 and rtt.backoffs == 0
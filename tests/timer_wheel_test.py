@@ -0,0 +1,111 @@
+import os
+import time
+
+import pytest
+
+from queue import Queue
+
+from lib.event_server import EventServer
+from lib.file_handler import FileHandler
+from lib.protocolo_amcgf import *
+from lib.server import Server
+from lib.timer_wheel import TimerWheel
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+
+    def sendto(self, data, addr):
+        self.sent.append(data)
+        return len(data)
+
+def test_wheel_fires_in_order_and_cancels():
+    """Testing de la rueda: vence por orden, nunca antes de tiempo, cancela y maneja timers de mas de una vuelta"""
+
+    wheel = TimerWheel(tick=0.01, slots=8, start=100.0)
+    late = wheel.schedule(100.5, 'late')          # Varias vueltas despues, mismo casillero que 'b'
+    wheel.schedule(100.03, 'a')
+    wheel.schedule(100.02, 'b')
+    dropped = wheel.schedule(100.04, 'dropped')
+    wheel.cancel(dropped)
+
+    assert len(wheel) == 3 and wheel.advance(100.015) == [] and wheel.next_expiry() == pytest.approx(100.02)
+
+    wheel.schedule(0, 'now')    # Ya vencido: sale en el proximo tick
+    assert wheel.advance(100.2) == ['now', 'b', 'a'] and late.slot is not None
+    assert wheel.next_expiry() == pytest.approx(100.28)     # Nada dentro de la vuelta: se avanza al final
+    assert wheel.advance(101.0) == ['late'] and len(wheel) == 0 and wheel.next_expiry() is None
+
+def test_threaded_session_expires_and_frees_queue(tmp_path):
+    """Testing del servidor con hilos: un upload abandonado se corta por inactividad, libera la cola y queda reanudable"""
+
+    server = Server()
+    server.file_handler = FileHandler(str(tmp_path))
+    server.idle_timeout = 0.2
+
+    addr = ('127.0.0.1', 1)
+    queue = Queue()
+    queue.put(make_req_upload('up.bin', VER_GBN, 4096, resume=True).encode())
+    server.queues[addr] = queue
+
+    server.process_client(addr, FakeSocket(), queue)
+
+    assert addr not in server.queues and server.metrics.expired == 1 and server.metrics.uploads == 0
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['.up.bin.journal', '.up.bin.part']
+
+def test_event_download_expires_on_silent_client(tmp_path):
+    """Testing del servidor de eventos: un download sin ACKs se corta al vencer la inactividad y sale de la rueda"""
+
+    (tmp_path / 'f.bin').write_bytes(os.urandom(8192))
+    server = EventServer()
+    server.file_handler = FileHandler(str(tmp_path))
+    server.idle_timeout = 0.2
+
+    addr = ('127.0.0.1', 1)
+    sock = FakeSocket()
+    server._open_session(sock, addr, make_req_download('f.bin', VER_SR).encode())
+    assert addr in server.queues and len(server.wheel) == 1
+
+    deadline = time.time() + 5
+    while addr in server.queues and time.time() < deadline:
+        time.sleep(0.01)
+        server._fire_timers()
+
+    assert addr not in server.queues and server.metrics.expired == 1 and len(server.wheel) == 0
+    assert len(sock.sent) > 1    # OK, la ventana y sus retransmisiones
+
+def test_reap_partials_spares_live_writers(tmp_path):
+    """Testing de limpieza: se borran temporales y journals viejos, salvo los de un escritor abierto"""
+
+    handler = FileHandler(str(tmp_path))
+    live = handler.open_writer('live.bin', size=10)
+    live.write(b'x')
+    for name in ('.old.bin.part', '.old.bin.journal', '.old.bin.123.0.part'):
+        (tmp_path / name).write_bytes(b'x')
+
+    old = time.time() - 3600
+    for path in tmp_path.iterdir():
+        os.utime(path, (old, old))
+
+    assert handler.reap_partials(60) == 3
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['.live.bin.journal', '.live.bin.part']
+    live.abort()
+
+def test_next_expiry_tracks_rearmed_timers():
+    """Testing de next_expiry: sigue al timer mas cercano mientras se rearman y cancelan, sin acumular ticks vaciados"""
+
+    wheel = TimerWheel(tick=0.01, slots=8, start=100.0)
+    timers = [wheel.schedule(100.05 + i, i) for i in range(50)]
+    assert wheel.next_expiry() == pytest.approx(100.05)
+
+    for _ in range(20):
+        for i, timer in enumerate(timers):
+            wheel.cancel(timer)
+            timers[i] = wheel.schedule(timer.deadline + 0.01, timer.item)
+
+    near = wheel.schedule(100.03, 'near')
+    assert wheel.next_expiry() == pytest.approx(100.03) and len(wheel.ticks) <= 2 * len(wheel.pending) + wheel.slots
+
+    wheel.cancel(near)
+    assert wheel.next_expiry() == pytest.approx(100.08)     # Lo proximo es al final de la vuelta
+    assert wheel.advance(100.3) == [0] and wheel.next_expiry() == pytest.approx(100.38)
@@ -1,31 +1,138 @@
 import os
+import signal
 import subprocess
 
 from pathlib import Path
 from time import sleep
 
-def test_upload_file():
-    if os.path.exists('tests/data/24LeMans.txt'):
-        os.remove('tests/data/24LeMans.txt')
+# Los procesos corren en tmp_path: lo subido y los logs de metricas no quedan en el repo
+ROOT = Path(__file__).resolve().parent.parent
 
+def script(name):
+    return str(ROOT / 'src' / name)
+
+def test_upload_file(tmp_path):
+    server = subprocess.Popen([
+        'python3', script('start-server.py'), '-H', '127.0.0.1', '-p', '2223', '-s', 'storage'
+    ], cwd=tmp_path)
+
+    sleep(1)
+
+    subprocess.run([
+        'python3', script('upload.py'), '-H', '127.0.0.1', '-p', '2223', '-s', str(ROOT / 'data' / 'file.bin'), '-n', '24LeMans.txt', '-r', 'SW'
+    ], cwd=tmp_path)
+
+    assert (tmp_path / 'storage').is_dir() and (tmp_path / 'storage' / '24LeMans.txt').is_file()
+
+    with open(tmp_path / 'storage' / '24LeMans.txt') as file:
+        got = file.read()
+
+        with open(ROOT / 'data' / 'file.bin') as file:
+            expected = file.read()
+
+            assert got == expected
+
+    server.kill()
+
+def test_upload_file_event_loop(tmp_path):
+    server = subprocess.Popen([
+        'python3', script('start-server.py'), '-H', '127.0.0.1', '-p', '2224', '-s', 'storage', '-e', 'event'
+    ], cwd=tmp_path)
+
+    sleep(1)
+
+    subprocess.run([
+        'python3', script('upload.py'), '-H', '127.0.0.1', '-p', '2224', '-s', str(ROOT / 'data' / 'elultimoguardian.bin'), '-n', 'LeMansGBN.txt', '-r', 'GBN'
+    ], cwd=tmp_path)
+
+    assert (tmp_path / 'storage' / 'LeMansGBN.txt').is_file()
+
+    with open(tmp_path / 'storage' / 'LeMansGBN.txt', 'rb') as file:
+        got = file.read()
+
+        with open(ROOT / 'data' / 'elultimoguardian.bin', 'rb') as file:
+            expected = file.read()
+
+            assert got == expected
+
+    server.kill()
+
+def test_upload_file_workers(tmp_path):
     server = subprocess.Popen([
-        'python3', 'src/start-server.py', '-H', '127.0.0.1', '-p', '2223', '-s', 'tests/data'
-    ])
+        'python3', script('start-server.py'), '-H', '127.0.0.1', '-p', '2225', '-s', 'storage', '-w', '2'
+    ], cwd=tmp_path)
 
     sleep(1)
 
     subprocess.run([
-        'python3', 'src/upload.py', '-H', '127.0.0.1', '-p', '2223', '-s', 'data/file.bin', '-n', '24LeMans.txt', '-r', 'SW'
-    ])
+        'python3', script('upload.py'), '-H', '127.0.0.1', '-p', '2225', '-s', str(ROOT / 'data' / 'elultimoguardian.bin'), '-n', 'LeMansWorkers.txt', '-r', 'SR'
+    ], cwd=tmp_path)
 
-    assert Path('tests/data/').is_dir() and Path('tests/data/24LeMans.txt').is_file()
+    with open(tmp_path / 'storage' / 'LeMansWorkers.txt', 'rb') as file:
+        got = file.read()
+
+        with open(ROOT / 'data' / 'elultimoguardian.bin', 'rb') as file:
+            expected = file.read()
+
+            assert got == expected
+
+    # Sin temporales a medio escribir
+    assert not [name for name in os.listdir(tmp_path / 'storage') if name.endswith('.part')]
+
+    # Los streams caerian en distintos workers: el servidor lo rechaza y el cliente falla
+    result = subprocess.run([
+        'python3', script('upload.py'), '-H', '127.0.0.1', '-p', '2225', '-s', str(ROOT / 'data' / 'elultimoguardian.bin'), '-n', 'LeMansWorkersStreams.txt', '-r', 'SR', '--streams', '4'
+    ], cwd=tmp_path)
+
+    assert result.returncode == 1 and not (tmp_path / 'storage' / 'LeMansWorkersStreams.txt').exists()
+
+    server.send_signal(signal.SIGINT)
+    server.wait(timeout=10)
+
+def test_upload_file_streams(tmp_path):
+    server = subprocess.Popen([
+        'python3', script('start-server.py'), '-H', '127.0.0.1', '-p', '2226', '-s', 'storage'
+    ], cwd=tmp_path)
+
+    sleep(1)
+
+    subprocess.run([
+        'python3', script('upload.py'), '-H', '127.0.0.1', '-p', '2226', '-s', str(ROOT / 'data' / 'elultimoguardian.bin'), '-n', 'LeMansStreams.txt', '-r', 'GBN', '--streams', '3'
+    ], cwd=tmp_path)
+
+    with open(tmp_path / 'storage' / 'LeMansStreams.txt', 'rb') as file:
+        got = file.read()
+
+        with open(ROOT / 'data' / 'elultimoguardian.bin', 'rb') as file:
+            expected = file.read()
+
+            assert got == expected
+
+    server.kill()
+
+def test_upload_file_impaired_link(tmp_path):
+    server = subprocess.Popen([
+        'python3', script('start-server.py'), '-H', '127.0.0.1', '-p', '2227', '-s', 'storage'
+    ], cwd=tmp_path)
+    # Enlace con perdida, corrupcion, duplicados y reordenamiento entre cliente y servidor
+    proxy = subprocess.Popen([
+        'python3', script('proxy.py'), '-p', '2228', '--server-port', '2227', '--loss', '0.1', '--corrupt', '0.02',
+        '--duplicate', '0.02', '--reorder', '0.05', '--delay', '1', '--jitter', '0.5', '--seed', '3'
+    ], cwd=tmp_path)
+
+    sleep(1)
+
+    subprocess.run([
+        'python3', script('upload.py'), '-H', '127.0.0.1', '-p', '2228', '-s', str(ROOT / 'data' / 'elultimoguardian.bin'), '-n', 'LeMansLossy.txt', '-r', 'SR'
+    ], cwd=tmp_path)
 
-    with open('tests/data/24LeMans.txt') as file:
+    with open(tmp_path / 'storage' / 'LeMansLossy.txt', 'rb') as file:
         got = file.read()
 
-        with open('data/file.bin') as file:
+        with open(ROOT / 'data' / 'elultimoguardian.bin', 'rb') as file:
             expected = file.read()
 
             assert got == expected
 
-    server.kill()
\ No newline at end of file
+    proxy.kill()
+    server.kill()